@@ -2,6 +2,7 @@ import asyncio
 from functools import partial
 
 from agent.llm.creation import initialize_agent
+from agent.router import IntentRouter
 from agent.tools.asset.library import clear_database, delete_asset
 from agent.tools.pipeline.image_generation import generate_image
 from agent.tools.pipeline.td_object_generation import generate_3d_object
@@ -9,6 +10,7 @@ from agent.tools.pipeline.td_scene_generation import generate_3d_scene
 from agent.tools.pipeline.td_scene_modification import modify_3d_scene
 from lib import load_config
 from library.api import LibraryAPI
+from model.backends import backend
 from server.data.redis import Redis
 
 
@@ -140,8 +142,22 @@ You have analyzed the user's request and the available workflows. Now, you must
         ]
 
         agent_model_name = config.get("agent_model")
-        self.executor = initialize_agent(agent_model_name, self.tools, self.preprompt)
-        self.executor.max_iterations = 30
+        agent_config = config.get("agent", {})
+        self.executor = initialize_agent(
+            agent_model_name,
+            self.tools,
+            self.preprompt,
+            terminal_tools=agent_config.get("terminal_tools", []),
+            max_steps=agent_config.get("max_steps", 6),
+        )
+
+        # Clear requests skip the agent model and go straight to their tool
+        self.tools_by_name = {tool.name: tool for tool in self.tools}
+        self.router = None
+        if agent_config.get("router", {}).get("enabled", False):
+            self.router = IntentRouter.from_config(
+                config, backend("embeddings").get_embedding_function()
+            )
 
 
 # Usage
@@ -3,6 +3,8 @@ from agent.agent import Agent
 from agent.llm.interaction import chat, achat, ask, aask
 from asyncio import Queue
 from beartype import beartype
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from lib import CancellationToken, JobLimit, Trace
 from library.api import LibraryAPI
 from server.data.redis import Redis
 
@@ -33,5 +35,67 @@ class AgentAPI:
     def ask(self, query: str, thread_id: str) -> dict:
         return ask(self.agent, query, thread_id)
 
-    def aask(self, query: str, thread_id: str):
-        return aask(self.agent, query, thread_id)
+    def aask(
+        self,
+        query: str,
+        thread_id: str,
+        cancellation: CancellationToken | None = None,
+        trace: Trace | None = None,
+        job_limit: JobLimit | None = None,
+        conversation: str | None = None,
+    ):
+        return aask(
+            self.agent, query, thread_id, cancellation, trace, job_limit, conversation
+        )
+
+    def forget(self, thread_id: str):
+        """Drop the agent's memory of a conversation thread."""
+        self.agent.executor.checkpointer.delete_thread(thread_id)
+
+    async def fork(self, thread_id: str, conversation: str) -> int:
+        """Copy the memory of a thread into the `conversation` thread.
+
+        The exchange of a run still in progress on the thread is left out: its
+        tool calls are not answered yet. Return the number of messages copied,
+        where the exchanges of `conversation` to merge back start.
+        """
+        messages = settled(await self._messages(thread_id))
+        if messages:
+            await self._append(conversation, messages)
+        return len(messages)
+
+    async def merge(self, conversation: str, thread_id: str, start: int):
+        """Append the messages of a forked `conversation`, from `start`, to a thread."""
+        messages = (await self._messages(conversation))[start:]
+        if messages:
+            await self._append(thread_id, messages)
+
+    # Subfunctions
+    async def _messages(self, thread_id: str) -> list:
+        config = {"configurable": {"thread_id": thread_id}}
+        state = await self.agent.executor.aget_state(config)
+        return list(state.values.get("messages", []))
+
+    async def _append(self, thread_id: str, messages: list):
+        # Written like a routed tool's exchange (see `dispatch`)
+        config = {"configurable": {"thread_id": thread_id}}
+        await self.agent.executor.aupdate_state(
+            config, {"messages": messages}, as_node="tools"
+        )
+
+
+def settled(messages: list) -> list:
+    """The messages of a thread up to its last finished exchange."""
+    answered = {
+        message.tool_call_id for message in messages if isinstance(message, ToolMessage)
+    }
+    end = len(messages)
+    for index, message in enumerate(messages):
+        if isinstance(message, AIMessage) and any(
+            call["id"] not in answered for call in message.tool_calls
+        ):
+            end = index
+            break
+    while end and isinstance(messages[end - 1], HumanMessage):
+        end -= 1
+    return messages[:end]
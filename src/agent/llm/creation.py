@@ -1,27 +1,155 @@
+import json
+
 from beartype import beartype
+from collections.abc import Callable, Collection
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
 from langchain_core.tools import BaseTool
+from typing import Any
 from langgraph.checkpoint.memory import InMemorySaver
-from langchain_ollama import ChatOllama
 from langgraph.prebuilt import create_react_agent
 
+from lib import logger
+from model.backends import backend
+from model.llm_cache import LLMCache, llm_cache
+
+# Answer of a run stopped because the agent model went round in circles
+LOOP_ANSWER = "I could not complete this request, could you rephrase it?"
+
+
+def initialize_model(model_name: str, temperature: int | float = 0):
+    """Initialize the model from its name, with the configured LLM backend.
+
+    The Ollama backend shares one model per (model, temperature): do not mutate it.
+    """
+    return backend("llm").initialize_model(model_name, temperature)
 
-def initialize_model(model_name: str, temperature: int = 0):
-    """Initialize the model from its name"""
-    return ChatOllama(
-        model=model_name, temperature=temperature, streaming=True, keep_alive=0
-    )
+
+def cached(
+    runnable: Runnable,
+    stage: str,
+    template: str,
+    model_name: str,
+    temperature: int | float = 0,
+    dump: Callable[[Any], str] = lambda text: text,
+    load: Callable[[str], Any] = lambda text: text,
+    validate: Callable[[Any], Any] | None = None,
+) -> Runnable:
+    """`runnable` (a model and the parsers of its output) answering from the LLM cache.
+
+    Only deterministic calls are cached: at temperature 0, for the stages enabled
+    in the `llm_cache` section of config.json. The cached completion of a prompt
+    is the parsed output turned to text by `dump`, and back by `load`. An output is
+    only stored once `validate` accepted it, so that a malformed completion is not
+    replayed; runs with `skip_llm_cache` in their configurable (e.g. retries) do
+    not use the cache. The entries of the stage are dropped when its prompt
+    `template` changes.
+    """
+    cache = llm_cache()
+    if temperature != 0 or not cache.enabled(stage):
+        return runnable
+    cache.register_template(stage, template)
+    params = {"stage": stage, "temperature": temperature}
+
+    def invoke(prompt: PromptValue, config: RunnableConfig):
+        if config.get("configurable", {}).get("skip_llm_cache"):
+            return runnable.invoke(prompt, config)
+        key = LLMCache.key(model_name, prompt.to_string(), params)
+        completion = cache.get(stage, key)
+        if completion is not None:
+            return load(completion)
+        output = runnable.invoke(prompt, config)
+        try:
+            if validate is not None:
+                validate(output)
+        except Exception as e:
+            # Returned all the same: the caller handles its own errors
+            logger.warning(f"Not caching an invalid {stage} output: {e}")
+            return output
+        cache.put(stage, key, dump(output))
+        return output
+
+    return RunnableLambda(invoke, name=f"{stage}_cache")
 
 
 @beartype
-def initialize_agent(model_name: str, tools: list[BaseTool], base_prompt: str):
-    """Initialize the agent with the specified tools and prompt."""
+def initialize_agent(
+    model_name: str,
+    tools: list[BaseTool],
+    base_prompt: str,
+    terminal_tools: Collection[str] = (),
+    max_steps: int = 6,
+):
+    """Initialize the agent with the specified tools and prompt.
+
+    The run ends as soon as one of the `terminal_tools` returns: their output goes
+    straight to the client, the agent model is not asked to comment on it. The loop
+    guard stops runs where the model repeats a tool call or takes more than
+    `max_steps` steps for one message.
+    """
     llm = initialize_model(model_name)
     memory = InMemorySaver()
 
+    tools = [
+        tool.model_copy(update={"return_direct": True})
+        if tool.name in terminal_tools
+        else tool
+        for tool in tools
+    ]
+
     agent = create_react_agent(
         tools=tools,
         model=llm,
         prompt=base_prompt,
         checkpointer=memory,
+        post_model_hook=loop_guard(max_steps),
+        version="v2",
     )
     return agent
+
+
+def loop_guard(max_steps: int):
+    """Post model hook replacing the model's tool calls by an answer on a loop."""
+
+    def guard(state: dict) -> dict:
+        messages = state["messages"]
+        last = messages[-1]
+        if not isinstance(last, AIMessage) or not last.tool_calls:
+            return {}
+
+        reason = detect_loop(messages, max_steps)
+        if reason is None:
+            return {}
+
+        logger.warning(f"Agent loop stopped ({reason}): {last.tool_calls}")
+        # Same id: the answer replaces the tool calls in the conversation
+        return {"messages": [AIMessage(id=last.id, content=LOOP_ANSWER)]}
+
+    return guard
+
+
+def detect_loop(messages: list[BaseMessage], max_steps: int) -> str | None:
+    """Why the run answering the last human message is looping, None if it is not."""
+    start = max(
+        (
+            index
+            for index, message in enumerate(messages)
+            if isinstance(message, HumanMessage)
+        ),
+        default=-1,
+    )
+    steps = [
+        message for message in messages[start + 1 :] if isinstance(message, AIMessage)
+    ]
+    if len(steps) > max_steps:
+        return f"more than {max_steps} steps"
+
+    seen = {call_key(call) for step in steps[:-1] for call in step.tool_calls}
+    if all(call_key(call) in seen for call in steps[-1].tool_calls):
+        return "repeated tool call"
+    return None
+
+
+def call_key(call: dict) -> str:
+    return f"{call['name']}:{json.dumps(call['args'], sort_keys=True)}"
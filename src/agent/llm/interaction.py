@@ -1,3 +1,5 @@
+import asyncio
+
 from functools import partial
 from agent.agent import Agent
 from agent.llm.tooling import Tool_callback
@@ -5,11 +7,21 @@ from asyncio import Queue
 from agent.tools.pipeline.td_scene_modification import modify_3d_scene
 from beartype import beartype
 from colorama import Fore
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
-from lib import logger
+from langchain_core.messages import HumanMessage, AIMessage, ToolCall, ToolMessage
+from lib import (
+    CancellationToken,
+    JobLimit,
+    OperationCancelled,
+    ToolResults,
+    Trace,
+    executors,
+    logger,
+    span,
+)
 from sdk.messages import *
 from agent.tools.pipeline.image_generation import GenerateImageOutput
 import json
+import uuid
 
 
 @beartype
@@ -96,18 +108,78 @@ def ask(agent: Agent, query: str, thread_id: str = 0):
 
 
 @beartype
-async def aask(agent: Agent, query: str, thread_id: str = 0):
-    """Send a prompt to the LLM and receive a structured response."""
-    callback = Tool_callback()
+async def aask(
+    agent: Agent,
+    query: str,
+    thread_id: str = 0,
+    cancellation: CancellationToken | None = None,
+    trace: Trace | None = None,
+    job_limit: JobLimit | None = None,
+    conversation: str | None = None,
+):
+    """Send a prompt to the LLM and receive a structured response.
+
+    Messages that tools push while running (e.g. scene objects as they are
+    generated) are yielded as they arrive, before the final response.
+    Cancelling `cancellation` stops the run: the token reaches the tools through
+    the run config, and they stop their model calls at the next step.
+    `trace` travels the same way, so that tools and model calls record their spans in it.
+    Generation tools wait for a slot of `job_limit`, shared by the session's requests.
+    The agent's memory is the `conversation` thread, the session's one by default.
+    Tools store their structured output in the run's `tool_results`, read back by
+    the callback: the agent model and its memory only get a short summary.
+    Requests the agent's router finds clear go straight to their tool.
+    """
+    loop = asyncio.get_running_loop()
+    progress = Queue()
+    tool_results = ToolResults()
+    callback = Tool_callback(
+        emit=lambda message: loop.call_soon_threadsafe(progress.put_nowait, message),
+        trace=trace,
+        tool_results=tool_results,
+    )
     agent_input = {"messages": [HumanMessage(content=query)]}
     logger.info(f"Session thread ID: {thread_id}")
     config = {
-        "configurable": {"thread_id": thread_id},
+        "configurable": {
+            "thread_id": conversation or thread_id,
+            "session_id": thread_id,
+            "cancellation_token": cancellation,
+            "trace": trace,
+            "job_limit": job_limit,
+            "tool_results": tool_results,
+        },
         "callbacks": [callback],
     }
 
+    route = None
+    if agent.router is not None:
+        with span("route"):
+            route = await executors["compute"].run(agent.router.route, query)
+    if route is not None and route.direct:
+        work = dispatch(agent, route.intent, query, config)
+    else:
+        work = agent.executor.ainvoke(agent_input, config=config)
+
+    run = asyncio.create_task(work)
+    if cancellation is not None:
+        cancellation.on_cancel(lambda: loop.call_soon_threadsafe(run.cancel))
     try:
-        response = await agent.executor.ainvoke(agent_input, config=config)
+        while not run.done():
+            next_message = asyncio.create_task(progress.get())
+            await asyncio.wait(
+                {run, next_message}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if next_message.done():
+                yield next_message.result()
+            else:
+                next_message.cancel()
+        while not progress.empty():
+            yield progress.get_nowait()
+
+        if cancellation is not None:
+            cancellation.raise_if_cancelled()
+        response = run.result()
 
         # Extract last AIMessage
 
@@ -121,10 +193,46 @@ async def aask(agent: Agent, query: str, thread_id: str = 0):
                 yield OutgoingUnrelatedMessage(text=ai_messages[-1].content)
             else:
                 print("No AIMessage found.")
+    except OperationCancelled:
+        logger.info(f"Agent run cancelled for thread {thread_id}")
+        raise
     except Exception as e:
         logger.error(f"\nAgent error occurred: {e}")
         OutgoingErrorMessage(status=500, text=f"Error during agent execution:: {e}")
         raise ValueError(f"Error during agent execution: {e}")
+    finally:
+        if not run.done():
+            run.cancel()
+
+
+async def dispatch(agent: Agent, tool_name: str, query: str, config: dict) -> dict:
+    """Run the tool of a routed request, as if the agent model had called it.
+
+    The exchange is written to the agent's memory like an agent run ending on the
+    tool, so that later requests of the conversation still see it.
+    """
+    call = ToolCall(
+        name=tool_name,
+        args={"user_input": query},
+        id=f"route_{uuid.uuid4().hex}",
+        type="tool_call",
+    )
+    try:
+        tool_message = await agent.tools_by_name[tool_name].ainvoke(call, config=config)
+    except OperationCancelled:
+        raise
+    except Exception as e:
+        # The callback already turned the error into the response
+        logger.error(f"Routed tool '{tool_name}' failed: {e}")
+        return {"messages": []}
+
+    messages = [
+        HumanMessage(content=query),
+        AIMessage(content="", tool_calls=[call]),
+        tool_message,
+    ]
+    await agent.executor.aupdate_state(config, {"messages": messages}, as_node="tools")
+    return {"messages": messages}
 
 
 @beartype
@@ -1,14 +1,24 @@
 import json
 
+from collections.abc import Callable
 from colorama import Fore
 from langchain.callbacks.base import BaseCallbackHandler
 from langchain_core.messages import ToolMessage
+from lib import OperationCancelled, ToolResults, Trace, executors, use_trace
 from loguru import logger
+from typing import Any
 
 
-from agent.tools.pipeline.image_generation import GenerateImageOutput
-from agent.tools.pipeline.td_object_generation import Generate3DObjectOutput
-from agent.tools.pipeline.td_scene_generation import Generate3DSceneOutput
+from agent.tools.pipeline.image_generation import GenerateImageOutput, ImageMetaData
+from agent.tools.pipeline.td_object_generation import (
+    Generate3DObjectOutput,
+    TDObjectMetaData,
+)
+from agent.tools.pipeline.td_scene_generation import (
+    Generate3DSceneOutput,
+    SceneLayoutEvent,
+    SceneObjectEvent,
+)
 from agent.tools.pipeline.td_scene_modification import Modify3DSceneOutput
 from sdk.messages import (
     OutgoingUnrelatedMessage,
@@ -18,16 +28,48 @@ from sdk.messages import (
     OutgoingGenerated3DSceneMessage,
     OutgoingModified3DSceneMessage,
     OutgoingErrorMessage,
+    OutgoingSceneLayoutMessage,
+    OutgoingSceneObjectMessage,
     AppMediaAsset,
+    IOutgoingMessage,
+    content_hash,
 )
-from model.trellis import read_glb
+from model.artifacts import artifacts, encode_png
+from model.glb import read_glb
+
+
+def read_hashed_asset(asset: TDObjectMetaData | ImageMetaData) -> tuple[bytes, str]:
+    """Asset bytes and content hash, so the client can be sent a reference instead.
+
+    Generated assets are still in memory: only assets found in the library, or
+    read from a tool's JSON output, are read back from disk.
+    """
+    if isinstance(asset, TDObjectMetaData) and asset.data is not None:
+        data = asset.data
+    elif isinstance(asset, ImageMetaData) and asset.image is not None:
+        data = encode_png(asset.image)
+    else:
+        artifacts.wait(asset.path)
+        data = read_glb(str(asset.path))
+    return data, content_hash(data)
 
 
 """ Custom tool tracker for functionnal tests """
 
 
 class Tool_callback(BaseCallbackHandler):
-    def __init__(self):
+    def __init__(
+        self,
+        emit: Callable[[IOutgoingMessage], None] | None = None,
+        trace: Trace | None = None,
+        tool_results: ToolResults | None = None,
+    ):
+        # Receives the messages tools push while still running (progressive scene delivery)
+        self.emit = emit
+        # Request trace the reading of generated assets is recorded in
+        self.trace = trace
+        # Payloads the tools stored aside, the agent model only saw their summary
+        self.tool_results = tool_results
         self.used_tools = []
         self.structured_response: (
             OutgoingConvertedSpeechMessage
@@ -54,6 +96,11 @@ class Tool_callback(BaseCallbackHandler):
 
     def on_tool_end(self, output: ToolMessage, **kwargs) -> None:
         """Starts when a tool finishes, puts the result in the queue for further processing."""
+        with use_trace(self.trace):
+            self.build_response(output, **kwargs)
+
+    def build_response(self, output: ToolMessage, **kwargs) -> None:
+        """Convert a tool output to the message sent to the client."""
         tool_name = kwargs.get("name")
 
         if tool_name == "clear_database" or tool_name == "delete_asset":
@@ -61,52 +108,91 @@ class Tool_callback(BaseCallbackHandler):
             self.structured_response = OutgoingUnrelatedMessage(text=output.content)
             return
 
-        tool_output = json.loads(output.content)
+        tool_output = self.take_tool_output(output)
 
         match tool_name:
+            case "generate_image":
+                payload = GenerateImageOutput.model_validate(tool_output)
+                self.structured_response = OutgoingGeneratedImagesMessage(
+                    text=payload.text,
+                    assets=self.read_assets([payload.data]),
+                )
             case "generate_3d_object":
-                payload = Generate3DObjectOutput(**tool_output)
+                payload = Generate3DObjectOutput.model_validate(tool_output)
                 self.structured_response = OutgoingGenerated3DObjectsMessage(
                     text=payload.text,
-                    assets=[
-                        AppMediaAsset(
-                            id=payload.data.id,
-                            filename=payload.data.filename,
-                            data=read_glb(payload.data.path),
-                        )
-                    ],
+                    assets=self.read_assets([payload.data]),
                 )
             case "generate_3d_scene":
-                payload = Generate3DSceneOutput(**tool_output)
+                payload = Generate3DSceneOutput.model_validate(tool_output)
                 self.structured_response = OutgoingGenerated3DSceneMessage(
                     text=payload.text,
                     json_scene=payload.final_decomposition.model_dump(),
-                    assets=[
-                        AppMediaAsset(
-                            id=asset_meta_data.id,
-                            filename=asset_meta_data.filename,
-                            data=read_glb(asset_meta_data.path),
-                        )
-                        for asset_meta_data in payload.objects_to_send
-                    ],
+                    assets=self.read_assets(payload.objects_to_send),
                 )
             case "modify_3d_scene":
-                payload = Modify3DSceneOutput(**tool_output)
+                payload = Modify3DSceneOutput.model_validate(tool_output)
                 self.structured_response = OutgoingModified3DSceneMessage(
                     text=payload.text,
                     modified_scene=payload.modified_scene.model_dump(),
-                    assets=[
-                        AppMediaAsset(
-                            id=asset_meta_data.id,
-                            filename=asset_meta_data.filename,
-                            data=read_glb(asset_meta_data.path),
-                        )
-                        for asset_meta_data in payload.objects_to_send
-                    ],
+                    assets=self.read_assets(payload.objects_to_send),
+                )
+
+    def take_tool_output(self, output: ToolMessage):
+        """The payload the tool call stored aside, or the JSON it returned inline."""
+        if self.tool_results is not None:
+            stored = self.tool_results.pop(output.tool_call_id)
+            if stored is not None:
+                return stored
+        return json.loads(output.content)
+
+    def read_assets(
+        self, assets: list[TDObjectMetaData | ImageMetaData]
+    ) -> list[AppMediaAsset]:
+        """Read generated assets and hash them in the I/O pool, all at once."""
+        # Scene objects are sent from task graph steps running in the I/O pool
+        results = executors["io"].map(read_hashed_asset, assets)
+        return [
+            AppMediaAsset(id=asset.id, filename=asset.filename, data=data, hash=digest)
+            for asset, (data, digest) in zip(assets, results)
+        ]
+
+    def on_custom_event(self, name: str, data: Any, **kwargs) -> None:
+        """Forward the partial results a tool dispatches before it returns."""
+        if self.emit is None:
+            return
+
+        with use_trace(self.trace):
+            self.emit_event(name, data)
+
+    def emit_event(self, name: str, data: Any) -> None:
+        # Events are models, dispatched in process, or their dicts
+        match name:
+            case "scene_layout":
+                payload = SceneLayoutEvent.model_validate(data)
+                self.emit(
+                    OutgoingSceneLayoutMessage(
+                        text=payload.text,
+                        json_scene=payload.layout.model_dump(),
+                        placeholders=payload.placeholders,
+                    )
+                )
+            case "scene_object":
+                payload = SceneObjectEvent.model_validate(data)
+                self.emit(
+                    OutgoingSceneObjectMessage(
+                        text=f"Generated object {payload.data.id}",
+                        placeholder_id=payload.placeholder_id,
+                        asset=self.read_assets([payload.data])[0],
+                    )
                 )
 
     def on_tool_error(self, error: BaseException, **kwargs) -> None:
         tool_name = kwargs.get("name")
+        if isinstance(error, OperationCancelled):
+            # Reported as a cancellation by the request, not as an error
+            logger.info(f"Tool '{tool_name}' {error}")
+            return
         logger.error(f"Tool '{tool_name}' encountered an error: {error}")
         self.structured_response = OutgoingErrorMessage(
             status=500, text=f"Internal error, please try again."
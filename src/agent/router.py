@@ -0,0 +1,159 @@
+import numpy as np
+
+from beartype import beartype
+from dataclasses import dataclass
+from typing import Any
+
+from lib import logger
+from lib.metrics import router_confidence, router_decisions
+
+# Requests answered by the agent itself, without a tool
+CHAT = "chat"
+
+# Example requests of each intent, the router picks the intent of the nearest one
+ROUTE_EXAMPLES = {
+    "generate_image": [
+        "Generate an image of a sunset over the sea",
+        "Draw a picture of a cat",
+        "Make an illustration of a castle in the mountains",
+        "I want a photo of a red sports car",
+        "Create a 2D artwork of a dragon",
+    ],
+    "generate_3d_object": [
+        "Create a 3D model of a magic sword",
+        "I want a 3D object of a wooden chair",
+        "Generate a 3D model of a cat",
+        "Make me a 3D mesh of a vintage lamp",
+        "Model a single 3D tree",
+    ],
+    "generate_3d_scene": [
+        "Create a 3D scene with two men sitting on a couch",
+        "Generate a 3D environment of a forest with a river and a cabin",
+        "Build a 3D living room with a sofa, a table and a lamp",
+        "I want a whole 3D scene of a medieval village",
+        "Make a 3D setting of a beach with palm trees and a boat",
+    ],
+    "modify_3d_scene": [
+        "Add a tree to my scene",
+        "Remove the table from the scene",
+        "Move the dog outside of the house",
+        "Change the color of the car to blue",
+        "Put the lamp in the corner of the room",
+    ],
+    "delete_asset": [
+        "Delete the asset with the id 1234",
+        "Remove asset 5f2c from the library",
+        "Delete this asset from the database",
+    ],
+    "clear_database": [
+        "Clear the asset database",
+        "Reset all assets in the database",
+        "Remove all entries from the asset database",
+    ],
+    CHAT: [
+        "Hello",
+        "Hi, who are you?",
+        "What can you do?",
+        "Thank you!",
+        "How does this work?",
+    ],
+}
+
+# Tools that only take the user's request, and can run without the agent choosing
+DIRECT_INTENTS = (
+    "generate_image",
+    "generate_3d_object",
+    "generate_3d_scene",
+    "modify_3d_scene",
+)
+
+
+@dataclass(frozen=True)
+class Route:
+    """Intent of a request, and whether it is clear enough to skip the agent."""
+
+    intent: str
+    confidence: float  # similarity to the nearest example
+    margin: float  # lead over the nearest example of another intent
+    direct: bool
+
+
+@beartype
+class IntentRouter:
+    """Nearest neighbour classifier of requests, on sentence embeddings.
+
+    A request goes straight to the tool of its intent when its nearest example is
+    at least `threshold` similar to it and `margin` more similar than the examples
+    of any other intent. Anything else (chat, database management, ambiguous
+    requests) is left to the agent, which asks for precisions when needed.
+    """
+
+    def __init__(
+        self,
+        embeddings: Any,
+        examples: dict[str, list[str]] | None = None,
+        threshold: int | float = 0.6,
+        margin: int | float = 0.1,
+        direct_intents: tuple[str, ...] | list[str] = DIRECT_INTENTS,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.margin = margin
+        self.direct_intents = set(direct_intents)
+
+        examples = examples or ROUTE_EXAMPLES
+        self.intents = [intent for intent, texts in examples.items() for _ in texts]
+        texts = [text for texts in examples.values() for text in texts]
+        self.vectors = self.normalize(np.array(embeddings.embed_documents(texts)))
+
+    @classmethod
+    def from_config(cls, config: dict, embeddings: Any) -> "IntentRouter":
+        """Build a router from the `agent.router` section of config.json."""
+        section = config.get("agent", {}).get("router", {})
+        examples = {
+            intent: ROUTE_EXAMPLES.get(intent, []) + texts
+            for intent, texts in section.get("examples", {}).items()
+        }
+        return cls(
+            embeddings,
+            {**ROUTE_EXAMPLES, **examples},
+            threshold=section.get("threshold", 0.6),
+            margin=section.get("margin", 0.1),
+            direct_intents=section.get("direct_intents", DIRECT_INTENTS),
+        )
+
+    def route(self, request: str) -> Route:
+        query = self.normalize(np.array(self.embeddings.embed_query(request)))
+        similarities = self.vectors @ query
+
+        best = {}
+        for intent, similarity in zip(self.intents, similarities):
+            best[intent] = max(best.get(intent, -1.0), float(similarity))
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        intent, confidence = ranked[0]
+        margin = confidence - ranked[1][1] if len(ranked) > 1 else confidence
+
+        direct = (
+            intent in self.direct_intents
+            and confidence >= self.threshold
+            and margin >= self.margin
+        )
+        route = Route(intent, confidence, margin, direct)
+        self.record(request, route)
+        return route
+
+    @staticmethod
+    def record(request: str, route: Route):
+        """Log and count the decision, to tune the threshold and the examples on."""
+        target = "tool" if route.direct else "agent"
+        router_decisions.inc(intent=route.intent, route=target)
+        router_confidence.observe(route.confidence, intent=route.intent)
+        logger.info(
+            f"Routed '{request[:60]}' to {target}: {route.intent} "
+            f"(confidence {route.confidence:.2f}, margin {route.margin:.2f})"
+        )
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
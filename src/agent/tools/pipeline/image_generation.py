@@ -1,29 +1,51 @@
 from beartype import beartype
-from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import InjectedToolCallId, tool
 from pathlib import Path
-from pydantic import BaseModel, Field
+from PIL import Image
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Annotated
 from uuid import uuid4
 
 from agent.tools.scene.improver import improve_prompt
-from lib import logger
-from model import stable_diffusers
+from lib import (
+    OperationCancelled,
+    job_lane,
+    logger,
+    session_id,
+    tool_result,
+    traced_tool,
+)
+from model.artifacts import artifacts
+from model.backends import backend
+from model.scheduler import Priority, gpu_scheduler
+from lib.metrics import stage
 
 
 class ImageMetaData(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     id: str
     prompt: str
     filename: str
     path: Path
     error: str | None
+    # The generated image, handed to the next stage in memory while `path` is written
+    image: Image.Image | None = Field(default=None, exclude=True, repr=False)
 
 
 class GenerateImageOutput(BaseModel):
     text: str
     data: ImageMetaData
 
+    def summary(self) -> str:
+        """What the agent model is told, the image itself goes to the client only."""
+        return f"{self.text}: image {self.data.id}"
+
 
 class GenerateImageToolInput(BaseModel):
     user_input: str = Field(description="The raw user's description prompt.")
+    tool_call_id: Annotated[str, InjectedToolCallId]
 
 
 @beartype
@@ -38,7 +60,9 @@ def generate_image_from_prompt(prompt: str, id: str | None = None) -> ImageMetaD
     output_path = output_dir / f"{id}.png"
 
     try:
-        stable_diffusers.generate(prompt, str(output_path))
+        with stage("image_generation"):
+            image = gpu_scheduler.submit(backend("image").render, prompt)
+        artifacts.save(output_path, image)
 
         return ImageMetaData(
             id=str(id),
@@ -46,7 +70,10 @@ def generate_image_from_prompt(prompt: str, id: str | None = None) -> ImageMetaD
             filename=output_path.name,
             path=output_path,
             error=None,
+            image=image,
         )
+    except OperationCancelled:
+        raise
     except Exception as e:
         logger.error(f"Failed to generate image: {e}")
         raise ValueError(f"Failed to generate image: {e}")
@@ -54,20 +81,28 @@ def generate_image_from_prompt(prompt: str, id: str | None = None) -> ImageMetaD
 
 @tool(args_schema=GenerateImageToolInput)
 @beartype
-def generate_image(user_input: str):
+def generate_image(
+    user_input: str, tool_call_id: str, *, config: RunnableConfig
+) -> str:
     """Generates an image from user's prompt"""
-    try:
-        improved_prompt = improve_prompt(user_input)
-    except Exception:
-        raise
-
-    try:
-        data = generate_image_from_prompt(improved_prompt)
-        return GenerateImageOutput(
-            text=f"Generated image for {user_input}", data=data
-        ).model_dump()
-    except Exception:
-        raise
+    thread_id = session_id(config)
+    token = config.get("configurable", {}).get("cancellation_token")
+    with traced_tool(config, "generate_image"), job_lane(config):
+        try:
+            with stage("improve_prompt"):
+                improved_prompt = improve_prompt(user_input)
+        except Exception:
+            raise
+
+        try:
+            with gpu_scheduler.context(str(thread_id), Priority.INTERACTIVE, token):
+                data = generate_image_from_prompt(improved_prompt)
+            output = GenerateImageOutput(
+                text=f"Generated image for {user_input}", data=data
+            )
+            return tool_result(config, tool_call_id, output, output.summary())
+        except Exception:
+            raise
 
 
 if __name__ == "__main__":
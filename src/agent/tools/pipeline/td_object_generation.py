@@ -1,14 +1,39 @@
+import re
+
 from beartype import beartype
-from langchain_core.tools import tool
+from collections.abc import Iterator
+from contextlib import contextmanager
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import InjectedToolCallId, tool
 from pydantic import BaseModel, Field
+from typing import Annotated, Any
 
 from agent.tools.scene.improver import improve_prompt
-from agent.tools.pipeline.image_generation import generate_image_from_prompt
-from lib import logger
+from agent.tools.pipeline.image_generation import (
+    ImageMetaData,
+    generate_image_from_prompt,
+)
+from lib import (
+    OperationCancelled,
+    TaskGraph,
+    executors,
+    job_lane,
+    load_config,
+    logger,
+    session_id,
+    tool_result,
+    traced_tool,
+)
 from library.api import LibraryAPI
-from model import trellis
+from model.artifacts import artifacts
+from model.backends import backend
+from model.scheduler import Priority, checkpoint, gpu_scheduler
+from lib.metrics import instanced_objects, stage
+
+# TODO: add field descriptions for pydantic models
 
-# TODO: modify the tool so that it doesn't reload model on every new request (do we want to do that? cuz it's heavy); add field descriptions for pydantic models
+# Objects a generation stage takes at once, outputs waiting for the next included
+DEFAULT_STAGE_LIMITS = {"image": 2, "image_to_3d": 2, "glb_export": 2}
 
 
 class TDObjectMetaData(BaseModel):
@@ -16,81 +41,277 @@ class TDObjectMetaData(BaseModel):
     filename: str
     path: str
     error: str | None
+    # The generated GLB, sent from memory while `path` is written
+    data: bytes | None = Field(default=None, exclude=True, repr=False)
 
 
 class Generate3DObjectOutput(BaseModel):
     text: str
     data: TDObjectMetaData
 
+    def summary(self) -> str:
+        """What the agent model is told, the asset itself goes to the client only."""
+        return f"{self.text}: asset {self.data.id}"
+
 
 class Generate3DObjectToolInput(BaseModel):
     user_input: str = Field(description="The raw user's description prompt.")
+    tool_call_id: Annotated[str, InjectedToolCallId]
+
+
+class PreparedObject(BaseModel):
+    improved_prompt: str
+    existing: TDObjectMetaData | None
 
 
 @beartype
-def generate_3d_object_from_prompt(
-    library_api: LibraryAPI, prompt: str, id: str | None = None
-) -> TDObjectMetaData:
+def prepare_3d_object(library_api: LibraryAPI, prompt: str) -> PreparedObject:
+    """Improve the prompt and look for an existing asset matching it."""
     logger.info(f"Generating 3D object from prompt: {prompt[:10]}...")
 
     try:
-        improved_prompt = improve_prompt(prompt)
+        with stage("improve_prompt"):
+            improved_prompt = improve_prompt(prompt)
     except Exception as e:
         raise
 
+    checkpoint()
     logger.info("Searching for already existing assets...")
 
-    asset = library_api.find_asset_by_description(improved_prompt)
+    with stage("asset_search"):
+        asset = library_api.find_asset_by_description(improved_prompt)
     if asset.data:
         logger.info(f"Found already existing asset: {asset.data}.")
-        return TDObjectMetaData(
+        existing = TDObjectMetaData(
             id=asset.data.name,
             filename=f"{asset.data.name}.glb",
             path=asset.data.mesh,
             error=None,
         )
-    else:
-        logger.info("No existing assets found, generating 3D object.")
+        return PreparedObject(improved_prompt=improved_prompt, existing=existing)
+    return PreparedObject(improved_prompt=improved_prompt, existing=None)
 
-        try:
-            image_meta_data = generate_image_from_prompt(improved_prompt, id)
 
-            trellis.generate(image_meta_data.path, image_meta_data.id)
+@beartype
+def generate_prepared_image(
+    id: str | None, prepared: PreparedObject
+) -> ImageMetaData | None:
+    """First generation stage: the image of the object, unless an asset matched."""
+    if prepared.existing is not None:
+        return None
 
-            library_api.add_asset(
-                image_meta_data.id,
-                str(image_meta_data.path),
-                str(image_meta_data.path.parent / f"{image_meta_data.id}.glb"),
-                description=improved_prompt,
-            )
+    logger.info("No existing assets found, generating 3D object.")
+    checkpoint()
+    with generation_failure(prepared):
+        return generate_image_from_prompt(prepared.improved_prompt, id)
 
-            return TDObjectMetaData(
-                id=image_meta_data.id,
-                filename=f"{image_meta_data.id}.glb",
-                path=str(image_meta_data.path.parent / f"{image_meta_data.id}.glb"),
-                error=None,
-            )
 
-        except Exception as e:
-            logger.error(
-                f"Failed to generate 3D object for '{image_meta_data.id}': {e}"
-            )
-            raise ValueError(
-                f"Failed to generate 3D object for '{image_meta_data.id}': {e}"
-            )
+@beartype
+def sample_3d_object(prepared: PreparedObject, image: ImageMetaData | None) -> Any:
+    """Second stage: the object sampled from its image, on the GPU."""
+    if image is None:
+        return None
+
+    checkpoint()
+    with generation_failure(prepared), stage("image_to_3d"):
+        return gpu_scheduler.submit(
+            backend("image_to_3d").sample, image.image, image.id
+        )
 
 
-@tool(args_schema=Generate3DObjectToolInput)
 @beartype
-def generate_3d_object(library_api: LibraryAPI, user_input: str) -> dict:
-    """Generates 3D object from user's prompt"""
+def export_3d_object(
+    library_api: LibraryAPI,
+    prepared: PreparedObject,
+    image: ImageMetaData | None,
+    samples: Any,
+) -> TDObjectMetaData:
+    """Last stage: the GLB of the samples, added to the library once written.
+
+    The export (mesh simplification, texture baking) runs in the executor pool
+    of the backend, off the GPU scheduler slot: inline when the step is scheduled
+    on that pool, see `export_pool`. The GLB is handed over in memory: writing it
+    and registering the asset happen in the background.
+    """
+    if prepared.existing is not None:
+        return prepared.existing
+
+    checkpoint()
+    glb_path = image.path.parent / f"{image.id}.glb"
+    image_to_3d = backend("image_to_3d")
+    with generation_failure(prepared), stage("glb_export"):
+        glb = executors[image_to_3d.EXPORT_POOL].call(image_to_3d.export, samples)
+
+    artifacts.save(glb_path, glb)
+    artifacts.after(
+        [image.path, glb_path],
+        library_api.add_asset,
+        image.id,
+        str(image.path),
+        str(glb_path),
+        description=prepared.improved_prompt,
+    )
+
+    return TDObjectMetaData(
+        id=image.id,
+        filename=glb_path.name,
+        path=str(glb_path),
+        error=None,
+        data=glb,
+    )
+
+
+@beartype
+def generate_prepared_3d_object(
+    library_api: LibraryAPI, id: str | None, prepared: PreparedObject
+) -> TDObjectMetaData:
+    """Generate the object of a prepared prompt, unless an existing asset matched."""
+    image = generate_prepared_image(id, prepared)
+    samples = sample_3d_object(prepared, image)
+    return export_3d_object(library_api, prepared, image, samples)
+
+
+@beartype
+def generate_3d_object_from_prompt(
+    library_api: LibraryAPI, prompt: str, id: str | None = None
+) -> TDObjectMetaData:
+    prepared = prepare_3d_object(library_api, prompt)
+    return generate_prepared_3d_object(library_api, id, prepared)
+
+
+def object_graph() -> TaskGraph:
+    """Task graph of a pipeline generating several objects.
+
+    Each generation stage takes at most `pipeline.stages[stage]` objects at once,
+    counting the outputs waiting for the next stage: the image of an object is
+    diffused while the previous one is sampled, and so on, with bounded queues.
+    """
+    stages = load_config().get("pipeline", {}).get("stages", {})
+    return TaskGraph(limits={**DEFAULT_STAGE_LIMITS, **stages})
+
+
+@beartype
+def export_pool() -> str:
+    """Pool of the export step: the export pool of the backend itself.
+
+    A process pool takes picklable calls only, so the step then runs in the `io`
+    pool and waits there for the worker process.
+    """
+    pool = backend("image_to_3d").EXPORT_POOL
+    return "io" if executors[pool].kind == "process" else pool
+
+
+@beartype
+def add_3d_object_steps(
+    graph: TaskGraph, library_api: LibraryAPI, prompt: str, id: str
+) -> str:
+    """Add the steps generating object `id` to `graph`, return the name of the last.
+
+    Improving the prompt and searching the library are LLM and I/O work, started
+    right away for every object; the generation stages follow one another. The
+    stages waiting for the GPU scheduler run in the `gpu` pool, leaving the
+    `compute` workers to the short calls of other requests, and the export runs
+    directly in the export pool of the backend.
+    """
+    prepare = graph.add(
+        f"prepare_3d_object:{id}",
+        prepare_3d_object,
+        library_api,
+        prompt,
+        pool="io",
+        resource="prepare",
+    )
+    image = graph.add(
+        f"image:{id}",
+        generate_prepared_image,
+        id,
+        after=[prepare],
+        pool="gpu",
+        resource="image",
+        hold=True,
+    )
+    samples = graph.add(
+        f"image_to_3d:{id}",
+        sample_3d_object,
+        after=[prepare, image],
+        pool="gpu",
+        resource="image_to_3d",
+        hold=True,
+    )
+    return graph.add(
+        f"glb_export:{id}",
+        export_3d_object,
+        library_api,
+        after=[prepare, image, samples],
+        pool=export_pool(),
+        resource="glb_export",
+    )
+
+
+@beartype
+def normalize_prompt(prompt: str) -> str:
+    """Prompts normalizing to the same text describe the same asset."""
+    return " ".join(re.sub(r"[^\w\s]", " ", prompt.lower()).split())
+
+
+@beartype
+def add_instanced_3d_object_steps(
+    graph: TaskGraph, library_api: LibraryAPI, objects: list[tuple[str, str]]
+) -> dict[str, str]:
+    """Add the steps generating `objects` (id, prompt) to `graph`, each asset once.
+
+    Objects whose prompts normalize to the same text (e.g. "a couple of chairs"
+    decomposed in two chairs) are instances of one asset, generated under the id
+    of the first of them. Return the name of the last step of each object.
+    """
+    steps = {}
+    generated = {}
+    for id, prompt in objects:
+        key = normalize_prompt(prompt)
+        if key in generated:
+            instanced_objects.inc()
+            logger.info(f"Object {id} is an instance of {generated[key]}: '{prompt}'")
+        else:
+            generated[key] = add_3d_object_steps(graph, library_api, prompt, id)
+        steps[id] = generated[key]
+    return steps
+
+
+@contextmanager
+def generation_failure(prepared: PreparedObject) -> Iterator[None]:
+    """Report a failed generation stage as a failure to generate the object."""
     try:
-        data = generate_3d_object_from_prompt(library_api, user_input)
-        return Generate3DObjectOutput(
-            text=f"Generated 3D object for '{user_input}'", data=data
-        ).model_dump()
-    except Exception:
+        yield
+    except OperationCancelled:
         raise
+    except Exception as e:
+        prompt = prepared.improved_prompt
+        logger.error(f"Failed to generate 3D object for '{prompt}': {e}")
+        raise ValueError(f"Failed to generate 3D object for '{prompt}': {e}")
+
+
+@tool(args_schema=Generate3DObjectToolInput)
+@beartype
+def generate_3d_object(
+    library_api: LibraryAPI,
+    user_input: str,
+    tool_call_id: str,
+    *,
+    config: RunnableConfig,
+) -> str:
+    """Generates 3D object from user's prompt"""
+    thread_id = session_id(config)
+    token = config.get("configurable", {}).get("cancellation_token")
+    with traced_tool(config, "generate_3d_object"), job_lane(config):
+        try:
+            with gpu_scheduler.context(str(thread_id), Priority.INTERACTIVE, token):
+                data = generate_3d_object_from_prompt(library_api, user_input)
+            output = Generate3DObjectOutput(
+                text=f"Generated 3D object for '{user_input}'", data=data
+            )
+            return tool_result(config, tool_call_id, output, output.summary())
+        except Exception:
+            raise
 
 
 if __name__ == "__main__":
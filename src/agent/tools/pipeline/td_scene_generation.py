@@ -1,22 +1,38 @@
 from beartype import beartype
-from langchain_core.tools import tool
+from langchain_core.callbacks.manager import dispatch_custom_event
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import InjectedToolCallId, tool
 from library.api import LibraryAPI
 from pydantic import BaseModel, Field
+from typing import Annotated
 
 from agent.tools.scene.decomposer import (
+    DecompositionOutput,
     final_decomposition,
     initial_decomposition,
 )
 from agent.tools.pipeline.td_object_generation import (
     TDObjectMetaData,
-    generate_3d_object_from_prompt,
+    add_instanced_3d_object_steps,
+    object_graph,
 )
-from lib import logger
-from sdk.scene import Scene
+from lib import (
+    CancellationToken,
+    job_lane,
+    load_config,
+    logger,
+    session_id,
+    tool_result,
+    traced_tool,
+)
+from model.scheduler import Priority, gpu_scheduler
+from lib.metrics import stage
+from sdk.scene import FinalDecompositionOutput, Scene
 
 
 class Generate3DSceneToolInput(BaseModel):
     user_input: str = Field(description="The raw user's description prompt.")
+    tool_call_id: Annotated[str, InjectedToolCallId]
 
 
 class Generate3DSceneOutput(BaseModel):
@@ -24,40 +40,195 @@ class Generate3DSceneOutput(BaseModel):
     final_decomposition: Scene
     objects_to_send: list[TDObjectMetaData]
 
+    def summary(self) -> str:
+        """What the agent model is told, the scene itself goes to the client only."""
+        return (
+            f"{self.text}: {len(self.final_decomposition.graph)} objects, "
+            f"{len(self.objects_to_send)} new assets"
+        )
+
+
+class SceneLayoutEvent(BaseModel):
+    text: str
+    layout: Scene
+    placeholders: list[str]
+
+
+class SceneObjectEvent(BaseModel):
+    placeholder_id: str
+    data: TDObjectMetaData
+
 
 @tool(args_schema=Generate3DSceneToolInput)
 @beartype
-def generate_3d_scene(library_api: LibraryAPI, user_input: str) -> dict:
+def generate_3d_scene(
+    library_api: LibraryAPI,
+    user_input: str,
+    tool_call_id: str,
+    *,
+    config: RunnableConfig,
+) -> str:
     """Creates a complete 3D environment or scene with multiple objects or a background."""
-    logger.info(f"Generating 3D scene from prompt: {user_input[:10]}...")
+    thread_id = session_id(config)
+    token = config.get("configurable", {}).get("cancellation_token")
+    with traced_tool(config, "generate_3d_scene"), job_lane(config):
+        logger.info(f"Generating 3D scene from prompt: {user_input[:10]}...")
 
-    try:
-        initial_decomposition_output = initial_decomposition(user_input)
-    except Exception:
-        raise
+        try:
+            with stage("initial_decomposition"):
+                initial_decomposition_output = initial_decomposition(user_input)
+        except Exception:
+            raise
 
-    objects_to_send = []
+        if load_config().get("pipeline", {}).get("progressive_scene_delivery", False):
+            output = generate_3d_scene_progressively(
+                library_api,
+                user_input,
+                initial_decomposition_output,
+                thread_id,
+                token,
+                config,
+            )
+            return tool_result(config, tool_call_id, output, output.summary())
 
-    try:
-        for object in initial_decomposition_output.scene.objects:
-            if object.type == "dynamic":
-                generated_object_meta_data = generate_3d_object_from_prompt(
-                    library_api, object.prompt, object.id
-                )
-                object.id = generated_object_meta_data.id
-                objects_to_send.append(generated_object_meta_data)
-    except Exception:
-        raise
+        dynamic_objects = [
+            object
+            for object in initial_decomposition_output.scene.objects
+            if object.type == "dynamic"
+        ]
 
-    try:
-        final_decomposition_output = final_decomposition(
-            user_input, initial_decomposition_output
+        # The decomposition ids are the objects' ids from the start: the final
+        # decomposition runs while the objects are generated, then gets their asset ids
+        graph = object_graph()
+        steps = add_instanced_3d_object_steps(
+            graph,
+            library_api,
+            [(object.id, object.prompt) for object in dynamic_objects],
+        )
+        graph.add(
+            "final_decomposition",
+            run_final_decomposition,
+            user_input,
+            initial_decomposition_output,
+            pool="io",
+        )
+
+        try:
+            # A whole scene is bulk work: single-object requests from other sessions go first
+            with gpu_scheduler.context(str(thread_id), Priority.BULK, token):
+                results = graph.run()
+        except Exception:
+            raise
+
+        # Instances share their asset: it is sent once
+        objects_to_send = [results[step] for step in dict.fromkeys(steps.values())]
+        scene = results["final_decomposition"].scene
+        scene.replace_dynamic_ids(
+            {id: results[step].id for id, step in steps.items()}
         )
 
-        return Generate3DSceneOutput(
+        output = Generate3DSceneOutput(
             text=f"Generated 3D scene for {user_input}",
-            final_decomposition=final_decomposition_output.scene,
+            final_decomposition=scene,
             objects_to_send=objects_to_send,
-        ).model_dump()
+        )
+        return tool_result(config, tool_call_id, output, output.summary())
+
+
+def run_final_decomposition(
+    user_input: str, initial_decomposition_output: DecompositionOutput
+) -> FinalDecompositionOutput:
+    with stage("final_decomposition"):
+        return final_decomposition(user_input, initial_decomposition_output)
+
+
+@beartype
+def generate_3d_scene_progressively(
+    library_api: LibraryAPI,
+    user_input: str,
+    initial_decomposition_output: DecompositionOutput,
+    thread_id: str | None,
+    token: CancellationToken | None,
+    config: RunnableConfig,
+) -> Generate3DSceneOutput:
+    """Lay the scene out first with the decomposition ids as placeholders, then push each object as it is generated.
+
+    The layout and the objects are dispatched as custom callback events; the final
+    output carries the layout with real asset ids and no assets, as they were already sent.
+    """
+    dynamic_objects = [
+        object
+        for object in initial_decomposition_output.scene.objects
+        if object.type == "dynamic"
+    ]
+
+    def send_layout(final_decomposition_output: FinalDecompositionOutput) -> Scene:
+        scene = final_decomposition_output.scene
+        dispatch_custom_event(
+            "scene_layout",
+            SceneLayoutEvent(
+                text=f"Generating 3D scene for {user_input}",
+                layout=scene,
+                placeholders=[object.id for object in dynamic_objects],
+            ),
+            config=config,
+        )
+        return scene
+
+    def send_object(
+        placeholder_id: str, data: TDObjectMetaData, layout: Scene
+    ) -> TDObjectMetaData:
+        dispatch_custom_event(
+            "scene_object",
+            # The model itself: its GLB bytes are not part of its dump
+            SceneObjectEvent(placeholder_id=placeholder_id, data=data),
+            config=config,
+        )
+        return data
+
+    # Objects are generated while the layout is decomposed; an object is pushed
+    # once both it and the layout its placeholder belongs to have been sent
+    graph = object_graph()
+    decomposition = graph.add(
+        "final_decomposition",
+        run_final_decomposition,
+        user_input,
+        initial_decomposition_output,
+        pool="io",
+    )
+    layout = graph.add("scene_layout", send_layout, after=[decomposition], pool="io")
+    steps = add_instanced_3d_object_steps(
+        graph,
+        library_api,
+        [(object.id, object.prompt) for object in dynamic_objects],
+    )
+    # Every placeholder gets its object; the client is sent the bytes of an asset
+    # shared by instances once, then references to it
+    for object in dynamic_objects:
+        graph.add(
+            f"scene_object:{object.id}",
+            send_object,
+            object.id,
+            after=[steps[object.id], layout],
+            pool="io",
+        )
+
+    try:
+        with gpu_scheduler.context(str(thread_id), Priority.BULK, token):
+            results = graph.run()
     except Exception:
         raise
+
+    scene = results[layout]
+    scene.replace_dynamic_ids(
+        {
+            object.id: results[f"scene_object:{object.id}"].id
+            for object in dynamic_objects
+        }
+    )
+
+    return Generate3DSceneOutput(
+        text=f"Generated 3D scene for {user_input}",
+        final_decomposition=scene,
+        objects_to_send=[],
+    )
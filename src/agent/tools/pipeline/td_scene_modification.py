@@ -1,23 +1,38 @@
 import asyncio
+import concurrent.futures
 import uuid
 from beartype import beartype
 from langchain_core.runnables import RunnableConfig
-from langchain_core.tools import tool
+from langchain_core.tools import InjectedToolCallId, tool
 from library.api import LibraryAPI
 from pydantic import BaseModel, Field
+from typing import Annotated
 
 from agent.tools.scene.analyzer import SceneUpdate, analyze
 from agent.tools.pipeline.td_object_generation import (
     TDObjectMetaData,
-    generate_3d_object_from_prompt,
+    add_instanced_3d_object_steps,
+    object_graph,
 )
-from lib import logger
+from lib import (
+    CancellationToken,
+    OperationCancelled,
+    executors,
+    job_lane,
+    logger,
+    session_id,
+    tool_result,
+    traced_tool,
+)
+from model.scheduler import Priority, gpu_scheduler
+from lib.metrics import stage
 from sdk.scene import Scene
 from server.data.redis import Redis
 
 
 class Modify3DSceneToolInput(BaseModel):
     user_input: str = Field(description="The raw user's modification request.")
+    tool_call_id: Annotated[str, InjectedToolCallId]
 
 
 class Modify3DSceneOutput(BaseModel):
@@ -25,6 +40,16 @@ class Modify3DSceneOutput(BaseModel):
     modified_scene: SceneUpdate
     objects_to_send: list[TDObjectMetaData]
 
+    def summary(self) -> str:
+        """What the agent model is told, the update itself goes to the client only."""
+        update = self.modified_scene
+        return (
+            f"{self.text}: {len(update.objects_to_add)} added, "
+            f"{len(update.objects_to_update)} updated, "
+            f"{len(update.objects_to_delete)} deleted, "
+            f"{len(update.objects_to_regenerate)} regenerated"
+        )
+
 
 @beartype
 async def modify_3d_scene_async(
@@ -32,7 +57,8 @@ async def modify_3d_scene_async(
     library_api: LibraryAPI,
     user_input: str,
     thread_id: str,
-) -> dict:
+    token: CancellationToken | None = None,
+) -> Modify3DSceneOutput:
     """Creates a complete 3D environment or scene with multiple objects or a background."""
     logger.info(f"Modifying 3D scene from prompt: {user_input}...")
 
@@ -40,13 +66,17 @@ async def modify_3d_scene_async(
     validated_current_scene = Scene.model_validate_json(current_scene_json)
     logger.info(f"Current scene JSON: {validated_current_scene}...")
 
+    # This coroutine runs on the server loop: blocking work goes to the compute pool
     try:
-        analysis_output = analyze(user_input, validated_current_scene)
+        with stage("scene_analysis"):
+            analysis_output = await executors["compute"].run(
+                analyze, user_input, validated_current_scene
+            )
     except Exception:
         raise
 
-    objects_to_send = []
-
+    # Ids are assigned up front so that every object is generated at once
+    dynamic = []
     for object in analysis_output.objects_to_add:
         new_id = str(uuid.uuid4())
         object.scene_object.id = new_id
@@ -59,34 +89,50 @@ async def modify_3d_scene_async(
             component.component_type == "dynamic"
             for component in object.scene_object.components
         ):
-            try:
-                generated_object_meta_data = generate_3d_object_from_prompt(
-                    library_api, object.prompt, object.scene_object.id
-                )
-                object.scene_object.id = generated_object_meta_data.id
-                for component in object.scene_object.components:
-                    if component.component_type == "dynamic":
-                        component.id = generated_object_meta_data.id
-                objects_to_send.append(generated_object_meta_data)
-            except Exception:
-                raise
+            dynamic.append((new_id, object.prompt))
+
+    regenerated = [str(uuid.uuid4()) for _ in analysis_output.objects_to_regenerate]
+    dynamic.extend(
+        (id, object.prompt)
+        for id, object in zip(regenerated, analysis_output.objects_to_regenerate)
+    )
+
+    # Objects asking for the same asset share it
+    graph = object_graph()
+    steps = add_instanced_3d_object_steps(graph, library_api, dynamic)
 
     try:
-        for object in analysis_output.objects_to_regenerate:
-            id = uuid.uuid4()
-            generated_object_meta_data = generate_3d_object_from_prompt(
-                library_api, object.prompt, str(id)
-            )
-            object.new_id = generated_object_meta_data.id
-            objects_to_send.append(generated_object_meta_data)
+        with gpu_scheduler.context(thread_id, Priority.INTERACTIVE, token):
+            results = await graph.arun()
     except Exception:
         raise
 
+    # Each asset is sent once; the object that generated it is named after it,
+    # its instances keep their own id
+    sent = {}
+    for object in analysis_output.objects_to_add:
+        step = steps.get(object.scene_object.id)
+        if step is None:
+            continue
+        generated_object_meta_data = results[step]
+        for component in object.scene_object.components:
+            if component.component_type == "dynamic":
+                component.id = generated_object_meta_data.id
+        if step not in sent:
+            object.scene_object.id = generated_object_meta_data.id
+        sent.setdefault(step, generated_object_meta_data)
+
+    for id, object in zip(regenerated, analysis_output.objects_to_regenerate):
+        object.new_id = results[steps[id]].id
+        sent.setdefault(steps[id], results[steps[id]])
+
+    objects_to_send = list(sent.values())
+
     return Modify3DSceneOutput(
         text=f"Scene modification for {user_input}",
         modified_scene=analysis_output,
         objects_to_send=objects_to_send,
-    ).model_dump()
+    )
 
 
 @tool(args_schema=Modify3DSceneToolInput)
@@ -96,23 +142,32 @@ def modify_3d_scene(
     library_api: LibraryAPI,
     main_loop: asyncio.AbstractEventLoop,
     user_input: str,
+    tool_call_id: str,
     *,
     config: RunnableConfig,
-) -> dict:
+) -> str:
     """Creates a complete 3D environment or scene with multiple objects or a background."""
-    thread_id = config.get("configurable", {}).get("thread_id")
-
-    coro = modify_3d_scene_async(
-        redis_api=redis_api,
-        library_api=library_api,
-        user_input=user_input,
-        thread_id=thread_id,
-    )
-
-    future = asyncio.run_coroutine_threadsafe(coro, main_loop)
-
-    try:
-        result = future.result()
-        return result
-    except Exception:
-        raise
+    thread_id = session_id(config)
+    token = config.get("configurable", {}).get("cancellation_token")
+
+    with traced_tool(config, "modify_3d_scene"), job_lane(config):
+        coro = modify_3d_scene_async(
+            redis_api=redis_api,
+            library_api=library_api,
+            user_input=user_input,
+            thread_id=thread_id,
+            token=token,
+        )
+
+        # The coroutine's task is created with this thread's context, trace included
+        future = asyncio.run_coroutine_threadsafe(coro, main_loop)
+        if token is not None:
+            token.on_cancel(future.cancel)
+
+        try:
+            output = future.result()
+            return tool_result(config, tool_call_id, output, output.summary())
+        except concurrent.futures.CancelledError:
+            raise OperationCancelled(token.reason if token else "cancelled")
+        except Exception:
+            raise
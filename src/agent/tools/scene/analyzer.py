@@ -1,15 +1,15 @@
 import ast
+import functools
 import json
 
 from beartype import beartype
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import AIMessage, HumanMessage
 from pydantic import BaseModel, ValidationError
 from typing import Optional
 
-from agent.llm.creation import initialize_model
+from agent.llm.creation import cached, initialize_model
 from lib import extract_json_blob, load_config, logger
 from sdk.patch import SceneObjectUpdate
 from sdk.scene import Scene, SceneObject, Skybox
@@ -69,13 +69,7 @@ def _validate_llm_output(raw_output: str) -> SceneUpdate:
         raise AnalysisValidationError(f"Invalid JSON or missing blob. Details: {e}")
 
 
-@beartype
-def analyze(user_input: str, json_scene: Scene, temperature: int = 0) -> SceneUpdate:
-    """
-    Analyzes a user's request to modify a 3D scene. It identifies relevant objects
-    and determines if 'dynamic' objects require regeneration based on the nature of the request.
-    """
-    system_prompt = """You are a highly specialized, technical JSON transformation engine. Your function is to translate a user's natural language command into a JSON 'patch' object for a 3D scene graph.
+SYSTEM_PROMPT = """You are a highly specialized, technical JSON transformation engine. Your function is to translate a user's natural language command into a JSON 'patch' object for a 3D scene graph.
 
 **PRIMARY DIRECTIVE:**
 Return a single JSON object that strictly conforms to the `SceneUpdate` schema below. This object represents only the *delta* between the current scene and the desired state described in the user’s request.
@@ -203,7 +197,7 @@ All examples below are based on this simple **Sample Scene** (do not use this sc
       ]
     }}
 """
-    user_prompt = """
+USER_PROMPT = """
 <current_scene>
 {json_scene}
 </current_scene>
@@ -214,19 +208,37 @@ All examples below are based on this simple **Sample Scene** (do not use this sc
 
 Based on the rules provided, generate the `SceneUpdate` JSON patch object now.
 """
+
+
+@functools.cache
+def analyzer_chain(temperature: int | float = 0):
+    """Prompt, model and parser of the scene analyzer, built on first use only."""
     prompt = ChatPromptTemplate.from_messages(
         [
-            ("system", system_prompt),
-            ("user", user_prompt),
+            ("system", SYSTEM_PROMPT),
+            ("user", USER_PROMPT),
             MessagesPlaceholder(variable_name="history", optional=True),
         ]
     )
+    model_name = load_config().get("scene_analyzer_model")
+    model = cached(
+        initialize_model(model_name, temperature=temperature) | StrOutputParser(),
+        "scene_analysis",
+        SYSTEM_PROMPT + USER_PROMPT,
+        model_name,
+        temperature,
+        validate=_validate_llm_output,
+    )
+    return prompt | model
 
-    config = load_config()
-    scene_analyzer_model_name = config.get("scene_analyzer_model")
-    model = initialize_model(scene_analyzer_model_name, temperature=temperature)
 
-    chain = prompt | model | StrOutputParser()
+@beartype
+def analyze(user_input: str, json_scene: Scene, temperature: int = 0) -> SceneUpdate:
+    """
+    Analyzes a user's request to modify a 3D scene. It identifies relevant objects
+    and determines if 'dynamic' objects require regeneration based on the nature of the request.
+    """
+    chain = analyzer_chain(temperature)
     logger.info(f"Analyzing current scene for modifications: {user_input}")
 
     messages = []
@@ -240,7 +252,9 @@ Based on the rules provided, generate the `SceneUpdate` JSON patch object now.
                     "json_scene": json_scene.model_dump_json(),
                     "user_input": user_input,
                     "history": messages,
-                }
+                },
+                # Retries answer the validation errors: nothing to reuse
+                config={"configurable": {"skip_llm_cache": attempt > 0}},
             )
 
             validated_result = _validate_llm_output(raw_output)
@@ -1,3 +1,5 @@
+import functools
+import json
 import uuid
 
 from beartype import beartype
@@ -7,7 +9,7 @@ from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from pydantic import BaseModel
 from typing import Literal
 
-from agent.llm.creation import initialize_model
+from agent.llm.creation import cached, initialize_model
 from lib import extract_json_blob, load_config, logger
 from sdk.scene import Scene, FinalDecompositionOutput
 
@@ -29,9 +31,7 @@ class DecompositionOutput(BaseModel):
     scene: DecompositionData
 
 
-@beartype
-def initial_decomposition(user_input: str, temperature: int = 0) -> DecompositionOutput:
-    system_prompt = """
+INITIAL_SYSTEM_PROMPT = """
 You are a highly specialized and precise Scene Decomposer for a 3D rendering workflow. Your sole task is to accurately convert a scene description string into structured JSON, adhering to strict rules. The output must always extract **verbatim zero-shot prompts** for each object in the scene, following the format provided below.
 
 YOUR CRITICAL TASK:
@@ -96,54 +96,9 @@ RULES FOR OBJECT SELECTION:
 
 STRICT ADHERENCE TO THIS FORMAT AND OBJECT INCLUSION IS ESSENTIAL FOR SUCCESSFUL RENDERING. Ensure all main physical objects described and the required room object are included. The 'prompt' field must be the exact, verbatim text from the input that *identifies or describes* that specific object, not its relationship to others.
 """
-    user_prompt = "User: {user_input}"
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            ("user", user_prompt),
-        ]
-    )
-
-    parser = JsonOutputParser(pydantic_object=DecompositionOutput)
-
-    prompt_with_instructions = prompt.partial(
-        format_instructions=parser.get_format_instructions()
-    )
+INITIAL_USER_PROMPT = "User: {user_input}"
 
-    config = load_config()
-    initial_decomposer_model_name = config.get("initial_decomposer_model")
-
-    model = initialize_model(initial_decomposer_model_name, temperature=temperature)
-
-    chain = prompt_with_instructions | model.with_structured_output(
-        schema=DecompositionOutput
-    )
-
-    try:
-        logger.info(f"Decomposing input: {user_input}")
-        result: DecompositionOutput = chain.invoke({"user_input": user_input})
-
-        # validated_result = DecompositionOutput(**result)
-
-        # Not relying on the llm to provide unique id for every object
-        for obj_dict in result.scene.objects:
-            obj_dict.id = str(uuid.uuid4())
-
-        logger.info(f"Decomposition result: {result}")
-
-        return result
-    except Exception as e:
-        logger.error(f"Failed to do initial decomposition: {str(e)}")
-        raise
-
-
-@beartype
-def final_decomposition(
-    user_input: str,
-    improved_decomposition: DecompositionOutput,
-    temperature: int = 0,
-) -> FinalDecompositionOutput:
-    system_prompt = """
+FINAL_SYSTEM_PROMPT = """
 You are a world-class 3D scene architect AI. Your primary function is to interpret a user's description and translate it into a highly structured, hierarchical 3D scene in a strict JSON format. Your ability to correctly infer relationships between objects (like containment and relative scale) is paramount.
 
 Your ONLY task is to create this JSON. Your entire response MUST be only the JSON object.
@@ -350,7 +305,7 @@ SCHEMA REFERENCE - YOU MUST FOLLOW THIS STRICTLY
 ### FINAL CHECK
 Remember, your entire output must be one JSON object  `{{"name": ..., "skybox":..., "graph":...}}`. Do not add any other wrappers.
 """
-    user_prompt = """
+FINAL_USER_PROMPT = """
 <INPUT_DATA>
     <ORIGINAL_REQUEST>
     {user_input}
@@ -367,44 +322,123 @@ Your output must be a single JSON object with the root keys `name`, `skybox`, an
 Do NOT copy the structure from `<OBJECT_LIST>`. That is input data only. You must keep the `id` and `type` values from `<OBJECT_LIST>` exactly as they are for each object.
 </YOUR_TASK>
 """
+
+
+@functools.cache
+def initial_decomposition_chain(temperature: int | float = 0):
+    """Prompt and structured output model of the initial decomposition, built once."""
     prompt = ChatPromptTemplate.from_messages(
         [
-            ("system", system_prompt),
-            ("user", user_prompt),
+            ("system", INITIAL_SYSTEM_PROMPT),
+            ("user", INITIAL_USER_PROMPT),
         ]
     )
 
-    parser = JsonOutputParser(pydantic_object=Scene)
+    parser = JsonOutputParser(pydantic_object=DecompositionOutput)
 
     prompt_with_instructions = prompt.partial(
         format_instructions=parser.get_format_instructions()
     )
 
-    config = load_config()
-    final_decomposer_model_name = config.get("final_decomposer_model")
+    model_name = load_config().get("initial_decomposer_model")
+    model = initialize_model(model_name, temperature=temperature)
+    structured_model = cached(
+        model.with_structured_output(schema=DecompositionOutput),
+        "initial_decomposition",
+        INITIAL_SYSTEM_PROMPT + INITIAL_USER_PROMPT,
+        model_name,
+        temperature,
+        dump=lambda output: output.model_dump_json(),
+        load=DecompositionOutput.model_validate_json,
+    )
+
+    return prompt_with_instructions | structured_model
+
+
+@functools.cache
+def final_decomposition_chain(temperature: int | float = 0):
+    """Prompt, model and parsers of the final decomposition, built once."""
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", FINAL_SYSTEM_PROMPT),
+            ("user", FINAL_USER_PROMPT),
+        ]
+    )
+
+    parser = JsonOutputParser(pydantic_object=Scene)
 
-    model = initialize_model(final_decomposer_model_name, temperature=temperature)
+    prompt_with_instructions = prompt.partial(
+        format_instructions=parser.get_format_instructions()
+    )
 
-    chain = (
-        prompt_with_instructions
-        | model
+    model_name = load_config().get("final_decomposer_model")
+    model = cached(
+        initialize_model(model_name, temperature=temperature)
         | StrOutputParser()
         | RunnableLambda(extract_json_blob)
-        | parser
+        | parser,
+        "final_decomposition",
+        FINAL_SYSTEM_PROMPT + FINAL_USER_PROMPT,
+        model_name,
+        temperature,
+        dump=json.dumps,
+        load=json.loads,
+        validate=lambda output: Scene(**output),
     )
 
+    return prompt_with_instructions | model
+
+
+@beartype
+def initial_decomposition(user_input: str, temperature: int = 0) -> DecompositionOutput:
+    chain = initial_decomposition_chain(temperature)
+
+    try:
+        logger.info(f"Decomposing input: {user_input}")
+        result: DecompositionOutput = chain.invoke({"user_input": user_input})
+
+        # validated_result = DecompositionOutput(**result)
+
+        # Not relying on the llm to provide unique id for every object
+        for obj_dict in result.scene.objects:
+            obj_dict.id = str(uuid.uuid4())
+
+        logger.info(f"Decomposition result: {result}")
+
+        return result
+    except Exception as e:
+        logger.error(f"Failed to do initial decomposition: {str(e)}")
+        raise
+
+
+@beartype
+def final_decomposition(
+    user_input: str,
+    improved_decomposition: DecompositionOutput,
+    temperature: int = 0,
+) -> FinalDecompositionOutput:
+    chain = final_decomposition_chain(temperature)
+
     try:
         logger.info(
             f"Final decomposition with input: original_prompt='{user_input}', improved_decomposition: {improved_decomposition.scene}."
         )
+        # The object ids are fresh uuids: the prompt gets stable ones instead, so
+        # that the cached answer of a scene asked again is found
+        canonical = improved_decomposition.model_copy(deep=True)
+        ids = {}
+        for index, obj in enumerate(canonical.scene.objects):
+            ids[f"object_{index}"], obj.id = obj.id, f"object_{index}"
+
         result: Scene = Scene(
             **chain.invoke(
                 {
                     "user_input": user_input,
-                    "improved_decomposition": improved_decomposition,
+                    "improved_decomposition": canonical,
                 }
             )
         )
+        _restore_ids(result, ids)
 
         for obj in result.graph:
             obj.id = str(uuid.uuid4())
@@ -419,6 +453,16 @@ Do NOT copy the structure from `<OBJECT_LIST>`. That is input data only. You mus
         raise
 
 
+def _restore_ids(scene: Scene, ids: dict[str, str]):
+    """Give the nodes and dynamic components of a scene their objects' real ids."""
+    nodes = list(scene.graph)
+    while nodes:
+        node = nodes.pop()
+        node.id = ids.get(node.id, node.id)
+        nodes.extend(node.children)
+    scene.replace_dynamic_ids(ids)
+
+
 if __name__ == "__main__":
     # decomposer = initial_decomposition("llama3.1")
     # user_input = "A plush, cream-colored couch with a low back and rolled arms sits against a wall in a cozy living room. A sleek, gray cat with bright green eyes is curled up in the center of the couch, its fur fluffed out slightly as it sleeps, surrounded by a few scattered cushions and a worn throw blanket in a soft blue pattern."
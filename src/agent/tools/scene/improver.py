@@ -1,16 +1,14 @@
+import functools
+
 from beartype import beartype
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
-from agent.llm.creation import initialize_model
+from agent.llm.creation import cached, initialize_model
 from lib import load_config, logger
 
-
-@beartype
-def improve_prompt(user_input: str, temperature: int = 0) -> str:
-    # TODO: mandatory room? if other type of background?
-    try:
-        system_prompt = """
+# TODO: mandatory room? if other type of background?
+SYSTEM_PROMPT = """
                 You are a specialized Prompt Engineer for 3D object generation.
 
                 YOUR TASK:
@@ -43,20 +41,33 @@ def improve_prompt(user_input: str, temperature: int = 0) -> str:
                 Original: "a kitchen"
                 Improved: "A modern, minimalist kitchen with sleek white cabinetry, stainless steel appliances including a double-door refrigerator and a built-in oven, a central island with a quartz countertop and induction cooktop, and light gray porcelain tile flooring. Squared room view from the outside with a distant 3/4 top-down perspective. Placed on a white and empty background. Completely detached from surroundings."
                 """
-        user_prompt = "User: {user_input}"
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", system_prompt),
-                ("user", user_prompt),
-            ]
-        )
-        parser = StrOutputParser()
-
-        config = load_config()
-        improver_model_name = config.get("improver_model")
-        model = initialize_model(improver_model_name, temperature=temperature)
-
-        chain = prompt | model | parser
+USER_PROMPT = "User: {user_input}"
+
+
+@functools.cache
+def improver_chain(temperature: int | float = 0):
+    """Prompt, model and parser of the improver, built on first use only."""
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", SYSTEM_PROMPT),
+            ("user", USER_PROMPT),
+        ]
+    )
+    model_name = load_config().get("improver_model")
+    model = cached(
+        initialize_model(model_name, temperature) | StrOutputParser(),
+        "improver",
+        SYSTEM_PROMPT + USER_PROMPT,
+        model_name,
+        temperature,
+    )
+    return prompt | model
+
+
+@beartype
+def improve_prompt(user_input: str, temperature: int = 0) -> str:
+    try:
+        chain = improver_chain(temperature)
 
         logger.info(f"Improving user's input: {user_input}")
         result: str = chain.invoke({"user_input": user_input})
@@ -1,17 +1,26 @@
 import json
-import os
-import sys
-import torch
 
 from colorama import Fore
-from loguru import logger
-from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
 
+# Helpers of the submodules, imported from `lib` by the rest of the code
+from lib.cancellation import CancellationToken, OperationCancelled
+from lib.config import CONFIG_PATH, PROJECT_ROOT, load_config, logger
+from lib.executor import Executors, ManagedExecutor, executors
+from lib.jobs import JobLimit, job_lane, session_id
+from lib.task_graph import StageStats, TaskGraph, TaskStep, stage_stats
+from lib.tool_results import ToolResults, tool_result
+from lib.tracing import (
+    Span,
+    Trace,
+    current_span,
+    log_trace,
+    span,
+    start_span,
+    traced_tool,
+    use_trace,
+)
 from sdk.scene import Scene
 
-PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-CONFIG_PATH = os.path.join(PROJECT_ROOT, "config.json")
-
 
 def extract_json_blob(raw_response: str) -> str:
     """
@@ -27,57 +36,14 @@ def extract_json_blob(raw_response: str) -> str:
         return raw_response
 
 
-def load_config():
-    """Load the configuration from the JSON file."""
-    if not os.path.exists(CONFIG_PATH):
-        raise FileNotFoundError(f"Configuration file '{CONFIG_PATH}' not found.")
-
-    with open(CONFIG_PATH, "r") as f:
-        return json.load(f)
-
-
-logger.remove()
-logger.add(
-    sys.stderr,
-    format="<green>{time:HH:mm:ss}</green> | <level>{level}</level> | <cyan>{module}</cyan>:<cyan>{function}</cyan> | {message}",
-    backtrace=True,
-)
-
-
-def speech_to_text(path: str) -> str:
-    """Convert a vocal speech to text."""
-    logger.info(
-        f"{Fore.YELLOW}Speech to text conversion started for file: {path}{Fore.RESET}"
-    )
-
-    device = "cuda:0" if torch.cuda.is_available() else "cpu"
-    dtype = torch.float16 if torch.cuda.is_available() else torch.float32
-
-    model_id = "openai/whisper-large-v3-turbo"
-
-    model = AutoModelForSpeechSeq2Seq.from_pretrained(
-        model_id, dtype=dtype, low_cpu_mem_usage=True, use_safetensors=True
-    )
-    model.to(device)
-
-    processor = AutoProcessor.from_pretrained(model_id)
-
-    pipe = pipeline(
-        "automatic-speech-recognition",
-        model=model,
-        tokenizer=processor.tokenizer,
-        feature_extractor=processor.feature_extractor,
-        torch_dtype=torch_dtype,
-        device=device,
-    )
-
-    result = pipe(path, return_timestamps=True)
+def speech_samples_to_text(samples, sample_rate: int) -> str:
+    """Convert vocal speech held in memory (mono float samples) to text."""
+    from model.backends import backend
 
-    logger.info(
-        f"{Fore.GREEN}Speech to text conversion completed: {result['text']}{Fore.RESET}"
-    )
+    text = backend("asr").transcribe_samples(samples, sample_rate)
+    logger.info(f"{Fore.GREEN}Speech to text conversion completed: {text}{Fore.RESET}")
 
-    return result["text"]
+    return text
 
 
 def deserialize_scene_json(scene_json: str) -> Scene:
@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+from loguru import logger
+
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+CONFIG_PATH = os.path.join(PROJECT_ROOT, "config.json")
+
+
+def load_config():
+    """Load the configuration from the JSON file."""
+    if not os.path.exists(CONFIG_PATH):
+        raise FileNotFoundError(f"Configuration file '{CONFIG_PATH}' not found.")
+
+    with open(CONFIG_PATH, "r") as f:
+        return json.load(f)
+
+
+logger.remove()
+logger.add(
+    sys.stderr,
+    format="<green>{time:HH:mm:ss}</green> | <level>{level}</level> | <cyan>{module}</cyan>:<cyan>{function}</cyan> | {message}",
+    backtrace=True,
+    filter=lambda record: "trace" not in record["extra"],
+)
+# Request traces are written as one JSON object per line
+if load_config().get("tracing", {}).get("log_file"):
+    logger.add(
+        os.path.join(PROJECT_ROOT, load_config()["tracing"]["log_file"]),
+        format="{message}",
+        filter=lambda record: "trace" in record["extra"],
+        delay=True,
+    )
@@ -0,0 +1,197 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import multiprocessing
+import threading
+import time
+
+from collections.abc import Callable
+from typing import Any, Optional
+
+from lib.config import load_config
+
+
+class ManagedExecutor:
+    """Pool of workers for one kind of blocking work, with saturation statistics.
+
+    Thread pools run their tasks in a copy of the caller's context, so spans and
+    job contexts follow the work. Process pools only take picklable work.
+    """
+
+    def __init__(self, name: str, kind: str = "thread", workers: int = 4):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind '{kind}' for pool '{name}'")
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self._pool: Optional[concurrent.futures.Executor] = None
+        self._lock = threading.Lock()
+        self._thread_prefix = f"{name}-pool"
+
+        self.pending = 0  # submitted and not finished yet
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+        self.wait_max = 0.0
+        self.busy_seconds = 0.0
+
+    @property
+    def in_worker(self) -> bool:
+        """Whether the calling thread is one of this pool's workers."""
+        return threading.current_thread().name.startswith(self._thread_prefix)
+
+    def submit(
+        self, fn: Callable[..., Any], *args, **kwargs
+    ) -> concurrent.futures.Future:
+        submitted = time.monotonic()
+        if self.kind == "thread":
+            context = contextvars.copy_context()
+            task = functools.partial(
+                context.run, self._run, fn, submitted, *args, **kwargs
+            )
+        else:
+            task = functools.partial(fn, *args, **kwargs)
+
+        with self._lock:
+            self.pending += 1
+        future = self._get_pool().submit(task)
+        future.add_done_callback(functools.partial(self._done, submitted))
+        return future
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run `fn` in the pool and wait for its result, from a synchronous caller.
+
+        A worker of the pool calling it again runs `fn` right away instead of
+        waiting for a free worker of its own pool.
+        """
+        if self.kind == "thread" and self.in_worker:
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    def map(self, fn: Callable[[Any], Any], items: list[Any]) -> list[Any]:
+        """`fn` of every item, run at once in the pool, from a synchronous caller.
+
+        A worker of the pool runs them itself, one after the other: workers
+        waiting on their own pool deadlock once they all wait.
+        """
+        if self.kind == "thread" and self.in_worker:
+            return [fn(item) for item in items]
+        futures = [self.submit(fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run `fn` in the pool without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = self.running
+            if self.kind == "process":
+                # Worker processes do not report back when a task starts
+                running = min(self.pending, self.workers)
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "running": running,
+                "queued": self.pending - running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "wait_seconds": self.wait_seconds,
+                "wait_max": self.wait_max,
+                "busy_seconds": self.busy_seconds,
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    # Subfunctions
+    def _get_pool(self) -> concurrent.futures.Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "thread":
+                    self._pool = concurrent.futures.ThreadPoolExecutor(
+                        self.workers, thread_name_prefix=self._thread_prefix
+                    )
+                else:
+                    # Forking a process that holds CUDA state is not safe
+                    self._pool = concurrent.futures.ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+            return self._pool
+
+    def _run(self, fn: Callable[..., Any], submitted: float, *args, **kwargs) -> Any:
+        started = time.monotonic()
+        with self._lock:
+            self.running += 1
+            self.wait_seconds += started - submitted
+            self.wait_max = max(self.wait_max, started - submitted)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.busy_seconds += time.monotonic() - started
+
+    def _done(self, submitted: float, future: concurrent.futures.Future):
+        with self._lock:
+            self.pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+            if self.kind == "process":
+                self.busy_seconds += time.monotonic() - submitted
+
+
+class Executors:
+    """Named pools that blocking work is sent to, so that it stays off the event loop.
+
+    - `io`: file reads and writes, vector store queries, remote model calls
+    - `database`: SQLite, one worker so that its connection stays in one thread
+    - `compute`: CPU bound work and short model calls (routing, ASR...)
+    - `gpu`: pipeline steps waiting for a GPU scheduler slot then running on it,
+      so that they never hold the workers of short `compute` calls
+    - `process`: picklable CPU bound work, away from the GIL
+    """
+
+    DEFAULTS = {
+        "io": {"kind": "thread", "workers": 8},
+        "database": {"kind": "thread", "workers": 1},
+        "compute": {"kind": "thread", "workers": 4},
+        "gpu": {"kind": "thread", "workers": 8},
+        "process": {"kind": "process", "workers": 2},
+    }
+
+    def __init__(self, pools: dict[str, dict]):
+        self.pools = {
+            name: ManagedExecutor(name, **settings) for name, settings in pools.items()
+        }
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Executors":
+        """Build the pools from the `executors` section of config.json."""
+        section = config.get("executors", {})
+        return cls(
+            {
+                name: {**cls.DEFAULTS.get(name, {}), **section.get(name, {})}
+                for name in {**cls.DEFAULTS, **section}
+            }
+        )
+
+    def __getitem__(self, name: str) -> ManagedExecutor:
+        return self.pools[name]
+
+    def stats(self) -> dict:
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def shutdown(self, wait: bool = True):
+        for pool in self.pools.values():
+            pool.shutdown(wait)
+
+
+executors = Executors.from_config(load_config())
@@ -0,0 +1,74 @@
+import threading
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Optional
+
+from lib.cancellation import CancellationToken
+from lib.tracing import span
+
+
+class JobLimit:
+    """Cap on the long jobs (generations) that the requests of one session run at once."""
+
+    # How often a job waiting for a slot checks its cancellation token
+    POLL_INTERVAL = 0.2
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit  # 0 means unlimited
+        self.running = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    @property
+    def busy(self) -> int:
+        """Jobs running or waiting for a slot."""
+        with self._condition:
+            return self.running + self.waiting
+
+    def acquire(self, token: Optional[CancellationToken] = None):
+        """Wait for a free slot; a cancelled request stops waiting."""
+        with self._condition:
+            self.waiting += 1
+            try:
+                while self.limit and self.running >= self.limit:
+                    if token is not None:
+                        token.raise_if_cancelled()
+                    self._condition.wait(self.POLL_INTERVAL)
+                if token is not None:
+                    token.raise_if_cancelled()
+            finally:
+                self.waiting -= 1
+            self.running += 1
+
+    def release(self):
+        with self._condition:
+            self.running -= 1
+            self._condition.notify()
+
+
+def session_id(config: dict) -> Optional[str]:
+    """Client session a LangGraph run belongs to, which may differ from its memory thread."""
+    configurable = config.get("configurable", {})
+    return configurable.get("session_id", configurable.get("thread_id"))
+
+
+@contextmanager
+def job_lane(config: dict) -> Iterator[None]:
+    """Run a long job in its session's job lane, once one of the session's slots is free.
+
+    The session's conversational requests are not held back meanwhile, only its
+    other jobs are. Runs without a `job_limit` in their config are not limited.
+    """
+    configurable = config.get("configurable", {})
+    limit = configurable.get("job_limit")
+    if limit is None:
+        yield
+        return
+
+    with span("job_wait"):
+        limit.acquire(configurable.get("cancellation_token"))
+    try:
+        yield
+    finally:
+        limit.release()
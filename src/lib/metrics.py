@@ -0,0 +1,268 @@
+import threading
+import time
+
+from beartype import beartype
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from lib.tracing import span
+
+# Seconds, from a quick LLM call up to a full scene generation
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Bytes, from a short compressed utterance up to a long uncompressed recording
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# Seconds, from a healthy event loop up to a call blocking it for a long time
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Cosine similarities, from an unrelated request up to a near copy of an example
+SCORE_BUCKETS = (0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95)
+
+# A sample as returned by collectors: (metric name, labels, value)
+Sample = tuple[str, dict[str, str], int | float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = (
+        f'{key}="{_escape(str(value))}"' for key, value in sorted(labels.items())
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: int | float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+@beartype
+class Counter:
+    """Monotonic counter, one value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int | float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in values.items():
+            yield self.name, dict(key), value
+
+
+@beartype
+class Histogram:
+    """Cumulative histogram of observations, one set of buckets per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[tuple, list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: int | float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            state = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Observe the duration of the block, whether it succeeds or not."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = {key: list(state) for key, state in self._values.items()}
+        for key, state in values.items():
+            labels = dict(key)
+            for bound, count in zip(self.buckets, state):
+                bucket_labels = {**labels, "le": _format_value(bound)}
+                yield f"{self.name}_bucket", bucket_labels, count
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, state[-1]
+            yield f"{self.name}_sum", labels, state[-2]
+            yield f"{self.name}_count", labels, state[-1]
+
+
+@beartype
+class Collector:
+    """Metric read from other components' state when the endpoint is scraped."""
+
+    def __init__(
+        self, name: str, help: str, kind: str, collect: Callable[[], list[Sample]]
+    ):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self) -> Iterator[Sample]:
+        yield from self.collect()
+
+
+@beartype
+class MetricsRegistry:
+    """Named metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram | Collector] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._register(Counter(name, help))
+
+    def histogram(
+        self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, buckets))
+
+    def collector(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], list[Sample]],
+        kind: str = "gauge",
+    ) -> Collector:
+        """Register (or replace) a metric computed on each scrape by `collect`."""
+        collector = Collector(name, help, kind, collect)
+        with self._lock:
+            self._metrics[name] = collector
+        return collector
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                # A failing collector must not break the whole scrape
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in samples:
+                lines.append(
+                    f"{name}{_format_labels(labels)} {_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+    # Subfunctions
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+metrics = MetricsRegistry()
+
+messages_received = metrics.counter(
+    "scener_messages_received_total", "Messages received from clients, by type."
+)
+messages_sent = metrics.counter(
+    "scener_messages_sent_total", "Messages sent to clients, by type."
+)
+bytes_sent = metrics.counter(
+    "scener_websocket_bytes_sent_total", "Bytes written to client websockets."
+)
+agent_run_seconds = metrics.histogram(
+    "scener_agent_run_seconds", "Duration of agent runs, by outcome."
+)
+router_decisions = metrics.counter(
+    "scener_router_decisions_total",
+    "Requests routed by intent, straight to a tool or to the agent.",
+)
+router_confidence = metrics.histogram(
+    "scener_router_confidence",
+    "Similarity of requests to the nearest example of their intent.",
+    SCORE_BUCKETS,
+)
+event_loop_lag = metrics.histogram(
+    "scener_event_loop_lag_seconds",
+    "How late the event loop runs a task that is ready.",
+    LAG_BUCKETS,
+)
+event_loop_stalls = metrics.counter(
+    "scener_event_loop_stalls_total",
+    "Calls that blocked the event loop, by client and message handled.",
+)
+event_loop_stall_seconds = metrics.histogram(
+    "scener_event_loop_stall_seconds",
+    "Duration of event loop stalls, by message handled.",
+    LAG_BUCKETS,
+)
+assets_sent = metrics.counter(
+    "scener_assets_sent_total",
+    "Assets sent to clients, in full or as a reference to a copy they hold.",
+)
+asset_bytes_saved = metrics.counter(
+    "scener_asset_bytes_saved_total",
+    "Asset bytes not sent because the client already held the asset.",
+)
+audio_upload_bytes = metrics.histogram(
+    "scener_audio_upload_bytes", "Size of audio uploads, by codec.", SIZE_BUCKETS
+)
+audio_decode_seconds = metrics.histogram(
+    "scener_audio_decode_seconds",
+    "Time spent decoding audio uploads, by codec.",
+    LAG_BUCKETS,
+)
+audio_duration_seconds = metrics.histogram(
+    "scener_audio_duration_seconds", "Duration of the audio uploaded, by codec."
+)
+llm_load_seconds = metrics.histogram(
+    "scener_llm_load_seconds",
+    "Time LLM calls spent waiting for their model to load, by model.",
+)
+llm_inference_seconds = metrics.histogram(
+    "scener_llm_inference_seconds",
+    "Time LLM calls spent on prompt evaluation and generation, by model.",
+)
+llm_cache_requests = metrics.counter(
+    "scener_llm_cache_requests_total",
+    "Lookups of LLM completions in the response cache, by stage and result.",
+)
+instanced_objects = metrics.counter(
+    "scener_instanced_objects_total",
+    "Scene objects sharing the asset of an object with the same prompt.",
+)
+pipeline_stage_seconds = metrics.histogram(
+    "scener_pipeline_stage_seconds", "Duration of generation pipeline stages."
+)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage, in the stage histogram and in the current request trace."""
+    with span(name), pipeline_stage_seconds.time(stage=name):
+        yield
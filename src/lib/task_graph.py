@@ -0,0 +1,225 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from lib.executor import executors
+from lib.tracing import span
+
+
+@dataclass
+class TaskStep:
+    name: str
+    fn: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    after: tuple[str, ...]
+    pool: str
+    resource: Optional[str]
+    hold: bool
+
+
+class StageStats:
+    """Steps of every task graph by resource: running, waiting and busy time.
+
+    Busy seconds over wall time, divided by the resource's limit, is how much of
+    the time a stage is working; stages whose busy time grows at once overlap.
+    """
+
+    STATES = ("running", "waiting", "held")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: dict[str, dict] = {}
+
+    def add(self, resource: str, state: str, count: int = 1):
+        with self._lock:
+            self._stage(resource)[state] += count
+
+    def finished(self, resource: str, seconds: float):
+        with self._lock:
+            stage = self._stage(resource)
+            stage["running"] -= 1
+            stage["completed"] += 1
+            stage["busy_seconds"] += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: dict(stage) for name, stage in self._stages.items()}
+
+    # Subfunctions
+    def _stage(self, resource: str) -> dict:
+        if resource not in self._stages:
+            self._stages[resource] = dict.fromkeys(self.STATES, 0)
+            self._stages[resource].update(completed=0, busy_seconds=0.0)
+        return self._stages[resource]
+
+
+class TaskGraph:
+    """Steps of a pipeline, each run as soon as the steps it depends on are done.
+
+    A step runs in an executor pool with the results of the steps it comes after,
+    in order, as its last positional arguments. Steps holding a limited resource
+    (e.g. a model) are started a few at a time, the others wait their turn in the
+    order they were added. A step that `hold`s its resource keeps it until a step
+    coming after it starts: its output waits in a bounded queue, and the stage
+    stops producing while the next one is behind. When a step fails, no new step
+    starts and the error is raised once the running ones are done.
+    """
+
+    def __init__(self, limits: Optional[dict[str, int]] = None):
+        self.limits = limits or {}
+        self.steps: dict[str, TaskStep] = {}
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        *args,
+        after: tuple[str, ...] | list[str] = (),
+        pool: str = "compute",
+        resource: Optional[str] = None,
+        hold: bool = False,
+        **kwargs,
+    ) -> str:
+        """Add a step after steps already added, so that the graph has no cycle."""
+        if name in self.steps:
+            raise ValueError(f"Step '{name}' already added")
+        unknown = [step for step in after if step not in self.steps]
+        if unknown:
+            raise ValueError(f"Step '{name}' comes after unknown steps {unknown}")
+        self.steps[name] = TaskStep(
+            name, fn, args, kwargs, tuple(after), pool, resource, hold
+        )
+        return name
+
+    def run(self) -> dict[str, Any]:
+        """Run every step, from a synchronous caller; results by step name."""
+        state = _GraphRun(self)
+        try:
+            while state.start():
+                done, _ = concurrent.futures.wait(
+                    state.running, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                state.finish(done)
+        finally:
+            state.close()
+        return state.results()
+
+    async def arun(self) -> dict[str, Any]:
+        """Run every step without blocking the event loop."""
+        state = _GraphRun(self)
+        try:
+            while state.start():
+                await asyncio.wait(
+                    [asyncio.wrap_future(future) for future in state.running],
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                state.finish([future for future in state.running if future.done()])
+        finally:
+            state.close()
+        return state.results()
+
+
+class _GraphRun:
+    """Progress of one run of a task graph."""
+
+    def __init__(self, graph: TaskGraph):
+        self.graph = graph
+        self.pending = list(graph.steps)
+        self.running: dict[concurrent.futures.Future, tuple[TaskStep, float]] = {}
+        self.held: dict[str, int] = {}
+        self.holding: set[str] = set()  # finished steps still holding their resource
+        self.waiting: set[str] = set()  # ready steps waiting for their resource
+        self.done: dict[str, Any] = {}
+        self.error: Optional[BaseException] = None
+        self.followed = {dep for step in graph.steps.values() for dep in step.after}
+
+    def start(self) -> bool:
+        """Start the steps that can run; False once there is nothing left to wait."""
+        if self.error is not None:
+            self.pending.clear()
+        # A step starting can free the resource held by the one before it
+        while any([self._start(name) for name in list(self.pending)]):
+            pass
+        return bool(self.running)
+
+    def finish(self, futures):
+        for future in futures:
+            step, started = self.running.pop(future)
+            if step.resource is not None:
+                stage_stats.finished(step.resource, time.monotonic() - started)
+            try:
+                self.done[step.name] = future.result()
+            except BaseException as e:
+                if self.error is None:
+                    self.error = e
+            if step.resource is None:
+                continue
+            if step.hold and step.name in self.followed and step.name in self.done:
+                self.holding.add(step.name)
+                stage_stats.add(step.resource, "held")
+            else:
+                self.held[step.resource] -= 1
+
+    def close(self):
+        """Give back what an interrupted or failed run still holds."""
+        for name in list(self.holding):
+            self._release_held(name)
+        for name in list(self.waiting):
+            self._unwait(self.graph.steps[name])
+
+    def results(self) -> dict[str, Any]:
+        if self.error is not None:
+            raise self.error
+        return self.done
+
+    @staticmethod
+    def call(step: TaskStep, inputs: list[Any]) -> Any:
+        with span(step.name):
+            return step.fn(*step.args, *inputs, **step.kwargs)
+
+    # Subfunctions
+    def _start(self, name: str) -> bool:
+        step = self.graph.steps[name]
+        if not all(dep in self.done for dep in step.after):
+            return False
+        if step.resource is not None:
+            limit = self.graph.limits.get(step.resource)
+            if limit is not None and self.held.get(step.resource, 0) >= limit:
+                self._wait(step)
+                return False
+            self.held[step.resource] = self.held.get(step.resource, 0) + 1
+            self._unwait(step)
+            stage_stats.add(step.resource, "running")
+        self.pending.remove(name)
+        for dep in step.after:
+            self._release_held(dep)
+        inputs = [self.done[dep] for dep in step.after]
+        future = executors[step.pool].submit(self.call, step, inputs)
+        self.running[future] = (step, time.monotonic())
+        return True
+
+    def _release_held(self, name: str):
+        if name in self.holding:
+            self.holding.remove(name)
+            resource = self.graph.steps[name].resource
+            self.held[resource] -= 1
+            stage_stats.add(resource, "held", -1)
+
+    def _wait(self, step: TaskStep):
+        if step.name not in self.waiting:
+            self.waiting.add(step.name)
+            stage_stats.add(step.resource, "waiting")
+
+    def _unwait(self, step: TaskStep):
+        if step.name in self.waiting:
+            self.waiting.remove(step.name)
+            stage_stats.add(step.resource, "waiting", -1)
+
+
+stage_stats = StageStats()
@@ -0,0 +1,43 @@
+import threading
+
+from typing import Any
+
+
+class ToolResults:
+    """Structured outputs of one request's tools, kept out of the agent's messages.
+
+    A tool stores its whole payload (scene graph, asset paths...) under its tool
+    call id, and returns a short summary: only the summary is fed back to the agent
+    model and kept in its memory. The request's Tool_callback takes the payload back
+    when the tool ends.
+    """
+
+    def __init__(self):
+        self._results: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._results)
+
+    def put(self, tool_call_id: str, payload: Any):
+        with self._lock:
+            self._results[tool_call_id] = payload
+
+    def pop(self, tool_call_id: str) -> Any:
+        """The payload a tool call stored, once; None if it stored nothing."""
+        with self._lock:
+            return self._results.pop(tool_call_id, None)
+
+
+def tool_result(config: dict, tool_call_id: str, payload: Any, summary: str) -> str:
+    """Store a tool's pydantic payload in its request's results, return the summary.
+
+    Runs without a result store (e.g. the command line chat) get the whole payload
+    as JSON, as the agent model used to.
+    """
+    results = config.get("configurable", {}).get("tool_results")
+    if results is None:
+        return payload.model_dump_json()
+    results.put(tool_call_id, payload)
+    return summary
@@ -0,0 +1,147 @@
+import contextvars
+import json
+import threading
+import time
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from lib.config import logger
+
+
+class Span:
+    """Timed step of a request, with the steps it ran as children."""
+
+    def __init__(self, trace: "Trace", name: str, attributes: dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: list[Span] = []
+
+    def child(self, name: str, **attributes) -> "Span":
+        span = Span(self.trace, name, attributes)
+        self.trace._opened(self, span)
+        return span
+
+    def finish(self, **attributes):
+        if self.end is not None:
+            return
+        self.attributes.update(attributes)
+        self.end = time.perf_counter()
+        self.trace._closed()
+
+    def to_dict(self) -> dict:
+        end = self.end if self.end is not None else time.perf_counter()
+        with self.trace._lock:
+            children = list(self.children)
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - self.trace.root.start) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "running": self.end is None,
+            **({"attributes": self.attributes} if self.attributes else {}),
+            "children": [child.to_dict() for child in children],
+        }
+
+
+class Trace:
+    """Timing tree of one client request.
+
+    It is reported once the root span and every span started under it are
+    finished, so work that outlives the root (e.g. sending assets) is included.
+    """
+
+    def __init__(
+        self,
+        request_id: str,
+        name: str = "request",
+        on_complete: Optional[Callable[["Trace"], None]] = None,
+        **attributes,
+    ):
+        self.request_id = request_id
+        self.on_complete = on_complete
+        self._lock = threading.Lock()
+        self._open = 1
+        self.root = Span(self, name, attributes)
+
+    @property
+    def done(self) -> bool:
+        return self._open == 0
+
+    def to_dict(self) -> dict:
+        return {"request_id": self.request_id, **self.root.to_dict()}
+
+    # Subfunctions
+    def _opened(self, parent: Span, span: Span):
+        with self._lock:
+            parent.children.append(span)
+            self._open += 1
+
+    def _closed(self):
+        with self._lock:
+            self._open -= 1
+            complete = self._open == 0
+        if complete and self.on_complete is not None:
+            self.on_complete(self)
+
+
+current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+@contextmanager
+def use_trace(trace: Optional[Trace]) -> Iterator[None]:
+    """Make `trace` the one spans are recorded into, e.g. in a tool reading it from its config."""
+    if trace is None or current_span.get() is not None:
+        yield
+        return
+    token = current_span.set(trace.root)
+    try:
+        yield
+    finally:
+        current_span.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Time the block as a child of the current span. Does nothing outside a trace."""
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = parent.child(name, **attributes)
+    token = current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        current_span.reset(token)
+        child.finish()
+
+
+@contextmanager
+def traced_tool(config: dict, name: str) -> Iterator[Optional[Span]]:
+    """Record a tool run in the trace its LangGraph config carries."""
+    trace = config.get("configurable", {}).get("trace")
+    with use_trace(trace), span(name) as tool_span:
+        yield tool_span
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """Open a child of the current span that is finished elsewhere with `finish()`."""
+    parent = current_span.get()
+    return parent.child(name, **attributes) if parent is not None else None
+
+
+def log_trace(trace: Trace):
+    """Write a finished trace to the trace log, and a one line summary to the main log."""
+    tree = trace.to_dict()
+    logger.bind(trace=trace.request_id).info(json.dumps(tree))
+    logger.info(f"Request {trace.request_id} traced: {tree['duration_ms']:.0f} ms")
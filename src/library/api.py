@@ -1,5 +1,5 @@
 from beartype import beartype
-from lib import logger
+from lib import executors, logger
 from library import db
 
 from library.manager.asset import Asset
@@ -9,6 +9,8 @@ from library.manager.library import Library
 
 @beartype
 class LibraryAPI:
+    """Asset library: SQLite calls run in the `database` pool, Chroma ones in `io`."""
+
     def __init__(self):
         self.db = db
         self.library = Library(db)
@@ -18,7 +20,7 @@ class LibraryAPI:
     def fill(self, path):
         """Fill the database with assets from the specified directory."""
         try:
-            self.library.fill(path)
+            executors["database"].call(self.library.fill, path)
         except Exception as e:
             logger.error(f"Failed to fill the database: {e}")
             raise
@@ -26,7 +28,7 @@ class LibraryAPI:
     def read(self):
         """Print out all the assets in the database."""
         try:
-            return self.library.read()
+            return executors["database"].call(self.library.read)
         except Exception as e:
             logger.error(f"Failed to read the database: {e}")
             raise
@@ -34,7 +36,7 @@ class LibraryAPI:
     def get_list(self):
         """Return a list of all assets as dictionaries."""
         try:
-            return self.library.get_list()
+            return executors["database"].call(self.library.get_list)
         except Exception as e:
             logger.error(f"Failed to get the list of assets: {e}")
             raise
@@ -42,7 +44,9 @@ class LibraryAPI:
     def add_asset(self, name, image=None, mesh=None, description=None):
         """Add a new asset to the database."""
         try:
-            self.asset.add(name, image, mesh, description)
+            executors["database"].call(
+                self.asset.add, name, image, mesh, description
+            )
         except Exception as e:
             logger.error(f"Failed to add asset: {e}")
             raise
@@ -50,7 +54,9 @@ class LibraryAPI:
     def update_asset(self, name, image=None, mesh=None, description=None):
         """Update an existing asset."""
         try:
-            self.asset.update(name, image, mesh, description)
+            executors["database"].call(
+                self.asset.update, name, image, mesh, description
+            )
         except Exception as e:
             logger.error(f"Failed to update asset: {e}")
             raise
@@ -58,8 +64,8 @@ class LibraryAPI:
     def delete_asset(self, name):
         """Delete an asset by its name."""
         try:
-            self.asset.delete(name)
-            self.asset_finder.delete_asset(name)
+            executors["database"].call(self.asset.delete, name)
+            executors["io"].call(self.asset_finder.delete_asset, name)
             return f"Asset '{name}' deleted successfully."
         except Exception as e:
             logger.error(f"Failed to delete asset: {e}")
@@ -68,7 +74,7 @@ class LibraryAPI:
     def get_asset(self, name):
         """Get an asset by its name"""
         try:
-            self.library.get_asset(name)
+            return executors["database"].call(self.library.get_asset, name)
         except Exception as e:
             logger.error(f"Failed to get asset: {e}")
             raise
@@ -76,15 +82,17 @@ class LibraryAPI:
     def find_asset_by_description(self, description: str) -> NullableAppAsset:
         """Find the closest asset to a given description"""
         try:
-            return self.asset_finder.find_by_description(description)
+            return executors["io"].call(
+                self.asset_finder.find_by_description, description
+            )
         except Exception:
             raise
 
     def clear_database(self):
         """Clear the entire asset database."""
         try:
-            self.db.clear_asset_table()
-            self.asset.delete_all_local_assets()
+            executors["database"].call(self.db.clear_asset_table)
+            executors["io"].call(self.asset.delete_all_local_assets)
             return "Successfully cleared all records from the 'asset' table."
         except Exception:
             raise
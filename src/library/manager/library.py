@@ -5,7 +5,6 @@ import json
 from beartype import beartype
 from colorama import Fore
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import SentenceTransformerEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.documents import Document
@@ -13,9 +12,10 @@ from loguru import logger
 from pydantic import BaseModel, Field
 from typing import Optional
 
-from agent.llm.creation import initialize_model
+from agent.llm.creation import cached, initialize_model
 from library.sql.row import SQL
 from library.manager.database import Database as DB
+from model.backends import backend
 
 
 class AppAsset(BaseModel):
@@ -170,19 +170,16 @@ class AssetFinder:
         self.threshold = 0.95
         self.asset_map = {asset.id: asset for asset in assets}
 
-        embedding_function = SentenceTransformerEmbeddings(
-            model_name="all-MiniLM-L6-v2"
-        )
-
         self.vector_store = Chroma(
             collection_name="app_assets",
-            embedding_function=embedding_function,
+            embedding_function=backend("embeddings").get_embedding_function(),
             persist_directory="./asset_db",
         )
 
         self._populate_db(assets)
 
-        self.llm = initialize_model("devstral:24b")
+        self.model_name = "devstral:24b"
+        self.llm = initialize_model(self.model_name)
         self.rerank_chain = self._create_rerank_chain()
 
     def _populate_db(self, assets: list[AppAsset]):
@@ -277,7 +274,16 @@ class AssetFinder:
         prompt = ChatPromptTemplate.from_messages(
             [("system", system_prompt), ("user", user_prompt)]
         )
-        return prompt | self.llm | parser
+        model = cached(
+            self.llm | parser,
+            "asset_rerank",
+            system_prompt + user_prompt,
+            self.model_name,
+            dump=json.dumps,
+            load=json.loads,
+            validate=lambda output: NullableAppAsset(**output),
+        )
+        return prompt | model
 
     @beartype
     def find_by_description(self, description: str) -> NullableAppAsset:
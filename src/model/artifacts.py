@@ -0,0 +1,121 @@
+import concurrent.futures
+import io
+import threading
+
+from beartype import beartype
+from collections.abc import Callable
+from pathlib import Path
+from PIL import Image
+from typing import Any
+
+from lib import executors, logger, span
+
+
+@beartype
+def encode_png(image: Image.Image) -> bytes:
+    """PNG file content of an image, encoded in memory."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@beartype
+class ArtifactStore:
+    """Generated images and GLB files, written to disk off the generation's path.
+
+    The pipeline stages hand their artifacts over in memory (PIL images, GLB
+    bytes) and the delivery sends them from memory too: writing them to disk
+    runs in the `io` pool meanwhile. Readers of a file still being written wait
+    for it first, and work depending on files (e.g. registering them in the
+    library) is started once they are written.
+    """
+
+    def __init__(self):
+        self._pending: dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def save(
+        self, path: Path, artifact: bytes | Image.Image
+    ) -> concurrent.futures.Future:
+        """Write an image (as PNG) or file bytes to `path` in the background."""
+        future = executors["io"].submit(self._write, path, artifact)
+        with self._lock:
+            self._pending[str(path)] = future
+        future.add_done_callback(lambda done: self._written(str(path), done))
+        return future
+
+    def wait(self, path: Path | str):
+        """Wait for the pending write of `path`, if any."""
+        with self._lock:
+            future = self._pending.get(str(path))
+        if future is not None:
+            future.result()
+
+    def after(self, paths: list[Path], fn: Callable[..., Any], *args, **kwargs):
+        """Run `fn` in the `io` pool once the pending writes of `paths` are done.
+
+        It is skipped, with an error logged, if one of the writes failed.
+        """
+        with self._lock:
+            futures = [
+                self._pending[str(path)]
+                for path in paths
+                if str(path) in self._pending
+            ]
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def start():
+            if any(self._failed(future) for future in futures):
+                logger.error(f"Not running {fn.__name__}: an artifact was not written")
+                return
+            task = executors["io"].submit(fn, *args, **kwargs)
+            task.add_done_callback(self._log_failure)
+
+        def done(_: concurrent.futures.Future):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            start()
+
+        if not futures:
+            start()
+        for future in futures:
+            future.add_done_callback(done)
+
+    def flush(self):
+        """Wait for every pending write, e.g. before shutting down."""
+        with self._lock:
+            futures = list(self._pending.values())
+        concurrent.futures.wait(futures)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    # Subfunctions
+    @staticmethod
+    def _write(path: Path, artifact: bytes | Image.Image):
+        with span("write_artifact", path=path.name):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = artifact if isinstance(artifact, bytes) else encode_png(artifact)
+            path.write_bytes(data)
+
+    def _written(self, path: str, future: concurrent.futures.Future):
+        with self._lock:
+            if self._pending.get(path) is future:
+                del self._pending[path]
+        self._log_failure(future)
+
+    @staticmethod
+    def _failed(future: concurrent.futures.Future) -> bool:
+        return future.cancelled() or future.exception() is not None
+
+    def _log_failure(self, future: concurrent.futures.Future):
+        if self._failed(future):
+            error = "cancelled" if future.cancelled() else future.exception()
+            logger.error(f"Failed to persist a generated artifact: {error}")
+
+
+artifacts = ArtifactStore()
@@ -0,0 +1,87 @@
+import functools
+import importlib
+
+from beartype import beartype
+from types import ModuleType
+
+from lib import load_config
+from model.manager import PROVIDERS
+
+# Modules implementing each kind of backend, by the name selected in config.json.
+# A backend module exposes the same functions as the others of its kind:
+#   image:       generate(prompt, filename), render(prompt) -> PIL image in memory
+#   image_to_3d: generate(image_path, image_id), writing `{image_id}.glb` beside it,
+#                in two stages: sample(image, image_id) -> samples on the GPU, then
+#                export(samples) -> GLB bytes, run in the EXPORT_POOL executor
+#   asr:         transcribe(audio_path) -> str,
+#                transcribe_samples(samples, sample_rate) -> str (mono float samples)
+#   embeddings:  get_embedding_function() -> Embeddings
+#   llm:         initialize_model(model_name, temperature) -> BaseChatModel,
+#                warm(model_names), loading models ahead of their first call
+BACKENDS = {
+    "image": {
+        "stable_diffusion": "model.stable_diffusers",
+        "fake": "model.fakes.image",
+    },
+    "image_to_3d": {
+        "trellis": "model.trellis",
+        "fake": "model.fakes.image_to_3d",
+    },
+    "asr": {
+        "whisper": "model.whisper",
+        "fake": "model.fakes.asr",
+    },
+    "embeddings": {
+        "sentence_transformers": "model.embeddings",
+        "fake": "model.fakes.embeddings",
+    },
+    "llm": {
+        "ollama": "model.ollama",
+        "fake": "model.fakes.llm",
+    },
+}
+
+DEFAULT_BACKENDS = {
+    "image": "stable_diffusion",
+    "image_to_3d": "trellis",
+    "asr": "whisper",
+    "embeddings": "sentence_transformers",
+    "llm": "ollama",
+}
+
+
+@functools.cache
+def backends_config() -> dict:
+    """The `backends` section of config.json, read once at the first lookup."""
+    return load_config().get("backends", {})
+
+
+@beartype
+def backend_name(kind: str) -> str:
+    """Name of the backend selected in config.json for `kind`."""
+    if kind not in BACKENDS:
+        raise KeyError(f"Unknown backend kind '{kind}'")
+    return backends_config().get(kind, DEFAULT_BACKENDS[kind])
+
+
+@beartype
+def backend(kind: str) -> ModuleType:
+    """Import the module of the backend selected for `kind`, on first use only."""
+    name = backend_name(kind)
+    if name not in BACKENDS[kind]:
+        raise ValueError(
+            f"Unknown {kind} backend '{name}', expected one of {list(BACKENDS[kind])}"
+        )
+    return importlib.import_module(BACKENDS[kind][name])
+
+
+@beartype
+def active_models(model_ids: list[str]) -> list[str]:
+    """Drop the models of backends that are not selected, e.g. before preloading."""
+    selected = {BACKENDS[kind][backend_name(kind)] for kind in BACKENDS}
+    known = {module for modules in BACKENDS.values() for module in modules.values()}
+    return [
+        model_id
+        for model_id in model_ids
+        if PROVIDERS.get(model_id) not in known or PROVIDERS[model_id] in selected
+    ]
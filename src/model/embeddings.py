@@ -0,0 +1,24 @@
+from langchain_community.embeddings import SentenceTransformerEmbeddings
+
+from model.manager import GB, ModelSpec, model_manager
+
+MODEL_ID = "all-MiniLM-L6-v2"
+
+
+def _load():
+    return SentenceTransformerEmbeddings(model_name=MODEL_ID)
+
+
+def _move(embeddings: SentenceTransformerEmbeddings, device: str):
+    embeddings.client.to(device)
+    return embeddings
+
+
+# Pinned: the vector store keeps a reference to it for the whole process lifetime
+model_manager.register(
+    MODEL_ID, ModelSpec(loader=_load, size=GB // 8, mover=_move, pinned=True)
+)
+
+
+def get_embedding_function() -> SentenceTransformerEmbeddings:
+    return model_manager.get(MODEL_ID)
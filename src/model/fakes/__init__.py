@@ -0,0 +1,78 @@
+"""Deterministic stand-ins for the model backends, to run without GPU or network.
+
+Each fake sleeps for a latency drawn from the distribution configured for its kind in
+`backends.fake.latency`, then returns a payload of realistic size. Draws are seeded by
+`backends.fake.seed` and by the request content, so a benchmark replays identically
+whatever the interleaving of concurrent requests.
+"""
+
+import hashlib
+import math
+import random
+import time
+
+from beartype import beartype
+
+from model.backends import backends_config
+from model.scheduler import checkpoint, job_context
+
+
+def settings() -> dict:
+    """The `backends.fake` section of config.json."""
+    return backends_config().get("fake", {})
+
+
+@beartype
+def digest(*parts: str | bytes) -> str:
+    """Stable hash of request content, to derive seeds and ids from."""
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part.encode() if isinstance(part, str) else part)
+    return sha.hexdigest()
+
+
+@beartype
+def seeded(kind: str, key: str | bytes) -> random.Random:
+    """Random generator for one call of a fake, reproducible across runs."""
+    return random.Random(digest(str(settings().get("seed", 0)), kind, key))
+
+
+@beartype
+def sample_latency(spec: dict, rng: random.Random) -> float:
+    """Draw a latency in seconds from a distribution spec.
+
+    Supported specs:
+        {"distribution": "constant", "value": s}
+        {"distribution": "uniform", "low": s, "high": s}
+        {"distribution": "normal", "mean": s, "stddev": s}
+        {"distribution": "lognormal", "median": s, "sigma": x}
+    """
+    distribution = spec.get("distribution", "constant")
+    match distribution:
+        case "constant":
+            value = spec.get("value", 0)
+        case "uniform":
+            value = rng.uniform(spec.get("low", 0), spec.get("high", 0))
+        case "normal":
+            value = rng.gauss(spec.get("mean", 0), spec.get("stddev", 0))
+        case "lognormal":
+            value = rng.lognormvariate(
+                math.log(spec.get("median", 1)), spec.get("sigma", 0)
+            )
+        case _:
+            raise ValueError(f"Unknown latency distribution '{distribution}'")
+    return max(0.0, float(value))
+
+
+@beartype
+def simulate_latency(kind: str, key: str | bytes) -> float:
+    """Sleep for the configured latency of `kind`; a cancelled job wakes up early."""
+    spec = settings().get("latency", {}).get(kind, {})
+    delay = sample_latency(spec, seeded(kind, key))
+    token = job_context.get().token
+    if token is not None:
+        token.wait(delay)
+        checkpoint()
+    else:
+        time.sleep(delay)
+    return delay
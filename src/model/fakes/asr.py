@@ -0,0 +1,31 @@
+import numpy as np
+
+from beartype import beartype
+
+from model.fakes import digest, seeded, settings, simulate_latency
+
+DEFAULT_TRANSCRIPTS = [
+    "Generate a 3D scene of a cozy living room with a couch and a sleeping cat",
+    "Create a 3D model of a wooden chair",
+    "Add a lamp on the table",
+    "Generate an image of a sunset over the sea",
+]
+
+
+@beartype
+def transcribe(audio: str) -> str:
+    """Pick one of the configured transcripts, always the same for the same audio."""
+    with open(audio, "rb") as f:
+        return _pick(digest(f.read()))
+
+
+@beartype
+def transcribe_samples(samples: np.ndarray, sample_rate: int) -> str:
+    return _pick(digest(samples.tobytes(), str(sample_rate)))
+
+
+def _pick(audio_hash: str) -> str:
+    simulate_latency("asr", audio_hash)
+
+    transcripts = settings().get("transcripts") or DEFAULT_TRANSCRIPTS
+    return seeded("asr", audio_hash).choice(transcripts)
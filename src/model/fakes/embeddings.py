@@ -0,0 +1,36 @@
+import math
+import re
+
+from beartype import beartype
+from langchain_core.embeddings import Embeddings
+
+from model.fakes import digest, simulate_latency
+
+# Same dimension as all-MiniLM-L6-v2
+DIMENSION = 384
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag of words: texts sharing words get close vectors."""
+
+    @beartype
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    @beartype
+    def embed_query(self, text: str) -> list[float]:
+        simulate_latency("embeddings", text)
+
+        vector = [0.0] * DIMENSION
+        for word in re.findall(r"\w+", text.lower()):
+            index = int(digest("embeddings", word)[:8], 16)
+            vector[index % DIMENSION] += 1.0 if index & (1 << 31) else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+
+_embeddings = FakeEmbeddings()
+
+
+def get_embedding_function() -> FakeEmbeddings:
+    return _embeddings
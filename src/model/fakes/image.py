@@ -0,0 +1,20 @@
+from beartype import beartype
+from PIL import Image
+
+from model.fakes import seeded, settings, simulate_latency
+
+
+@beartype
+def render(prompt: str) -> Image.Image:
+    """A noise image drawn from the prompt, as big as a real generated image."""
+    simulate_latency("image", prompt)
+
+    size = settings().get("image_size", 512)
+    rng = seeded("image", prompt)
+    return Image.frombytes("RGB", (size, size), rng.randbytes(size * size * 3))
+
+
+@beartype
+def generate(prompt: str, filename: str):
+    """Write a noise PNG drawn from the prompt."""
+    render(prompt).save(filename)
@@ -0,0 +1,33 @@
+from beartype import beartype
+from pathlib import Path
+from PIL import Image
+
+from model.fakes import digest, settings, simulate_latency
+from model.glb import MB, synthetic_glb
+
+# The fake export is plain CPU work on picklable samples
+EXPORT_POOL = "process"
+
+
+@beartype
+def sample(image: Image.Image, image_id: str) -> str:
+    """Stand in for sampling: the samples are the seed of the GLB, from the image."""
+    image_hash = digest(image.tobytes())
+    simulate_latency("image_to_3d", image_hash)
+    return image_hash
+
+
+@beartype
+def export(samples: str) -> bytes:
+    """A synthetic GLB of `glb_size_mb`, after the export latency."""
+    simulate_latency("glb_export", samples)
+
+    size = int(settings().get("glb_size_mb", 8) * MB)
+    return synthetic_glb(size, seed=samples)
+
+
+@beartype
+def generate(image_path: Path, image_id: str):
+    """Write a synthetic GLB of `glb_size_mb` next to the image, seeded by the image."""
+    glb = export(sample(Image.open(image_path), image_id))
+    (image_path.parent / f"{image_id}.glb").write_bytes(glb)
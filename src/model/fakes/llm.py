@@ -0,0 +1,311 @@
+import json
+import re
+
+from beartype import beartype
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from model.fakes import digest, simulate_latency
+from sdk.scene import (
+    ColorRGBA,
+    DirectionalLight,
+    DynamicObject,
+    LightMode,
+    LightShadowType,
+    PrimitiveObject,
+    PrimitiveShape,
+    Scene,
+    SceneObject,
+    Vector3,
+)
+
+MAX_OBJECTS = 8
+
+# Agent routing, tried in order on the user's request
+ROUTES = [
+    (
+        "modify_3d_scene",
+        re.compile(
+            r"^\s*(please\s+)?"
+            r"(add|move|remove|delete|change|replace|turn|make|put|rotate|scale)\b",
+            re.I,
+        ),
+    ),
+    ("generate_3d_scene", re.compile(r"\b(scene|room|environment|landscape)\b", re.I)),
+    ("generate_image", re.compile(r"\b(image|picture|photo|drawing|painting)\b", re.I)),
+    ("generate_3d_object", re.compile(r"\b(3d|model|object|mesh)\b", re.I)),
+]
+
+# Decomposition: what the scene is "of", what separates objects, which one is the room
+SUBJECT = re.compile(r"^.*?\b(?:scene|model|image|picture)\s+(?:of|with)\s+", re.I)
+SEPARATORS = re.compile(
+    r",|;|\band\b|\bwith\b|\bon\b|\bin\b|\bunder\b|\bnext to\b|\bbeside\b|\bnear\b",
+    re.I,
+)
+ROOMS = re.compile(
+    r"\b(room|hall|kitchen|bedroom|office|cave|garden|street|forest|beach|space)\b",
+    re.I,
+)
+DECOMPOSED_OBJECT = re.compile(
+    r"DecomposedObject\(id=(['\"])(.*?)\1, name=(['\"])(.*?)\3, "
+    r"prompt=(['\"])(.*?)\5, type=(['\"])(primitive|dynamic)\7\)"
+)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model answering each prompt of the pipeline with a well-formed canned reply.
+
+    The reply is picked from the prompt's shape: agent turn (tools bound), initial
+    decomposition (structured output), final decomposition, scene analysis, asset
+    re-ranking, and prompt improvement for anything else.
+    """
+
+    model: str
+    temperature: float = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model": self.model, "temperature": self.temperature}
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop=None,
+        run_manager=None,
+        **kwargs,
+    ) -> ChatResult:
+        tools = [tool["function"]["name"] for tool in kwargs.get("tools") or []]
+        simulate_latency(
+            "llm", digest(self.model, *(_text(message) for message in messages))
+        )
+
+        if "DecompositionOutput" in tools:
+            message = _decompose(_last(messages, HumanMessage))
+        elif tools:
+            message = _route(messages, tools)
+        else:
+            message = AIMessage(content=_complete(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+@beartype
+def initialize_model(model_name: str, temperature: int | float = 0) -> FakeChatModel:
+    return FakeChatModel(model=model_name, temperature=temperature)
+
+
+@beartype
+def warm(model_names: list[str]):
+    """Nothing to load: fake models answer from the first call."""
+
+
+# Subfunctions
+def _text(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(
+        part if isinstance(part, str) else part.get("text", "")
+        for part in message.content
+    )
+
+
+def _last(messages: list[BaseMessage], kind: type) -> str:
+    for message in reversed(messages):
+        if isinstance(message, kind):
+            return _text(message)
+    return ""
+
+
+def _between(text: str, start: str, end: str) -> str:
+    _, _, rest = text.partition(start)
+    return rest.partition(end)[0].strip()
+
+
+def _user_input(text: str) -> str:
+    return text.strip().removeprefix("User:").strip()
+
+
+def _tool_call(name: str, args: dict) -> dict:
+    id = f"call_{digest(name, json.dumps(args))[:16]}"
+    return {"name": name, "args": args, "id": id}
+
+
+def _route(messages: list[BaseMessage], tools: list[str]) -> AIMessage:
+    if isinstance(messages[-1], ToolMessage):
+        return AIMessage(content=f"Here is the result of {messages[-1].name}.")
+
+    request = _last(messages, HumanMessage)
+    for tool, pattern in ROUTES:
+        if tool in tools and pattern.search(request):
+            return AIMessage(
+                content="", tool_calls=[_tool_call(tool, {"user_input": request})]
+            )
+    return AIMessage(
+        content="I can generate images, 3D objects and 3D scenes, or modify the "
+        "current scene. What would you like to create?"
+    )
+
+
+def _decompose(text: str) -> AIMessage:
+    request = _user_input(text)
+    phrases = [
+        phrase.strip(" .")
+        for phrase in SEPARATORS.split(SUBJECT.sub("", request))
+        if re.search(r"\w", phrase)
+    ][:MAX_OBJECTS]
+
+    room = next((phrase for phrase in phrases if ROOMS.search(phrase)), "a room")
+    objects = [{"prompt": room, "type": "primitive"}] + [
+        {"prompt": phrase, "type": "dynamic"} for phrase in phrases if phrase != room
+    ]
+    for index, object in enumerate(objects):
+        object["id"] = str(index)
+        object["name"] = re.findall(r"\w+", object["prompt"])[-1].lower()
+
+    return AIMessage(
+        content="",
+        tool_calls=[_tool_call("DecompositionOutput", {"scene": {"objects": objects}})],
+    )
+
+
+def _complete(messages: list[BaseMessage]) -> str:
+    system = _last(messages, SystemMessage)
+    human = _last(messages, HumanMessage)
+
+    if "Available Assets:" in human:
+        return _rerank(human)
+    if "SceneUpdate" in system:
+        return _analyze(human)
+    if "DecomposedObject(" in human:
+        return _final_decomposition(human)
+    return _improve(human)
+
+
+def _rerank(text: str) -> str:
+    assets_text = text[text.find("[", text.index("Available Assets:")) :]
+    try:
+        assets, _ = json.JSONDecoder().raw_decode(assets_text)
+    except ValueError:
+        assets = []
+    return json.dumps({"data": assets[0] if assets else None})
+
+
+def _object(
+    id: str, name: str, parent_id: str | None, position: Vector3, components: list
+) -> SceneObject:
+    return SceneObject(
+        id=id,
+        name=name,
+        parent_id=parent_id,
+        position=position,
+        rotation=Vector3(x=0, y=0, z=0),
+        scale=Vector3(x=1, y=1, z=1),
+        components=components,
+        children=[],
+    )
+
+
+def _final_decomposition(text: str) -> str:
+    objects = [
+        (match.group(2), match.group(4), match.group(8))
+        for match in DECOMPOSED_OBJECT.finditer(text)
+    ]
+    room_id, room_name = next(
+        ((id, name) for id, name, type in objects if type == "primitive"),
+        ("room", "room"),
+    )
+
+    room = _object(
+        room_id,
+        room_name,
+        None,
+        Vector3(x=0, y=0, z=0),
+        [
+            PrimitiveObject(
+                shape=PrimitiveShape.CUBE, color=ColorRGBA(r=0.9, g=0.9, b=0.9, a=1)
+            )
+        ],
+    )
+    dynamic = [(id, name) for id, name, type in objects if type == "dynamic"]
+    for index, (id, name) in enumerate(dynamic):
+        position = Vector3(x=(index % 3 - 1) * 1.5, y=0, z=(index // 3 - 1) * 1.5)
+        room.children.append(
+            _object(id, name, room_id, position, [DynamicObject(id=id)])
+        )
+    room.children.append(
+        _object(
+            f"{room_id}_light",
+            "light",
+            room_id,
+            Vector3(x=0, y=3, z=0),
+            [
+                DirectionalLight(
+                    color=ColorRGBA(r=1, g=1, b=1, a=1),
+                    intensity=1,
+                    indirect_multiplier=1,
+                    mode=LightMode.REALTIME,
+                    shadow_type=LightShadowType.SOFT_SHADOWS,
+                )
+            ],
+        )
+    )
+
+    name = _between(text, "<ORIGINAL_REQUEST>", "</ORIGINAL_REQUEST>")[:64]
+    return Scene(name=name or "scene", skybox=None, graph=[room]).model_dump_json()
+
+
+def _analyze(text: str) -> str:
+    try:
+        scene = json.loads(_between(text, "<current_scene>", "</current_scene>"))
+    except ValueError:
+        scene = {}
+    graph = scene.get("graph") or [{}]
+    request = _between(text, "<user_request>", "</user_request>")
+    prompt = re.sub(
+        r"^\s*(please\s+)?(add|put|place|insert)\s+", "", request, flags=re.I
+    )
+    prompt = re.split(r"\b(?:on|to|in|next to|under|near)\b", prompt)[0].strip(" .")
+
+    id = f"new_{digest(request)[:8]}"
+    name = (re.findall(r"\w+", prompt) or ["object"])[-1].lower()
+    addition = _object(
+        id, name, graph[0].get("id"), Vector3(x=0, y=0, z=0), [DynamicObject(id=id)]
+    )
+    return json.dumps(
+        {
+            "name": scene.get("name", "scene"),
+            "skybox": None,
+            "objects_to_add": [
+                {
+                    "prompt": prompt or request,
+                    "scene_object": addition.model_dump(mode="json"),
+                }
+            ],
+            "objects_to_update": [],
+            "objects_to_delete": [],
+            "objects_to_regenerate": [],
+        }
+    )
+
+
+def _improve(text: str) -> str:
+    return (
+        f"{_user_input(text).rstrip('.')}, highly detailed, realistic materials and "
+        "soft studio lighting. Front camera view. Placed on a white and empty "
+        "background. Completely detached from surroundings."
+    )
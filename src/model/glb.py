@@ -0,0 +1,84 @@
+import json
+import random
+import struct
+
+from beartype import beartype
+
+from lib import span
+
+MB = 1024**2
+
+GLB_MAGIC = 0x46546C67  # "glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+# Vertices of the repeated block of synthetic meshes, a multiple of 3 (triangles)
+BLOCK_VERTICES = 3072
+
+
+@beartype
+def read_glb(object_path: str):
+    with span("read_glb"), open(object_path, "rb") as f:
+        return f.read()
+
+
+def _pad(data: bytes, filler: bytes) -> bytes:
+    return data + filler * (-len(data) % 4)
+
+
+@beartype
+def synthetic_glb(size: int, seed: int | str = 0) -> bytes:
+    """Build a valid glTF 2.0 binary of roughly `size` bytes holding a triangle soup.
+
+    The vertices are drawn from `seed` and tiled, so the same seed and size give the
+    same bytes and large files are cheap to produce.
+    """
+    rng = random.Random(seed)
+    block = struct.pack(
+        f"<{BLOCK_VERTICES * 3}f",
+        *(rng.uniform(-0.5, 0.5) for _ in range(BLOCK_VERTICES * 3)),
+    )
+    # Bounds must match the float32 values actually stored
+    values = struct.unpack(f"<{BLOCK_VERTICES * 3}f", block)
+    minimum = [min(values[axis::3]) for axis in range(3)]
+    maximum = [max(values[axis::3]) for axis in range(3)]
+
+    # Header and JSON chunk take well under 1 KiB, the rest goes to positions
+    vertices = max(3, (size - 1024) // 12 // 3 * 3)
+    repeats, rest = divmod(vertices, BLOCK_VERTICES)
+    positions = block * repeats + block[: rest * 12]
+
+    document = {
+        "asset": {"version": "2.0", "generator": "scener fake backend"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0}, "mode": 4}]}],
+        "accessors": [
+            {
+                "bufferView": 0,
+                "componentType": 5126,  # float32
+                "count": vertices,
+                "type": "VEC3",
+                "min": minimum,
+                "max": maximum,
+            }
+        ],
+        "bufferViews": [
+            {"buffer": 0, "byteLength": len(positions), "target": 34962}
+        ],
+        "buffers": [{"byteLength": len(positions)}],
+    }
+    json_chunk = _pad(json.dumps(document, separators=(",", ":")).encode(), b" ")
+    bin_chunk = _pad(positions, b"\x00")
+
+    length = 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)
+    return b"".join(
+        (
+            struct.pack("<III", GLB_MAGIC, 2, length),
+            struct.pack("<II", len(json_chunk), CHUNK_JSON),
+            json_chunk,
+            struct.pack("<II", len(bin_chunk), CHUNK_BIN),
+            bin_chunk,
+        )
+    )
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from beartype import beartype
+from collections.abc import Callable
+from typing import Any, Optional
+
+from lib import PROJECT_ROOT, load_config, logger
+
+
+@beartype
+class LLMCache:
+    """Completions of deterministic LLM stages, kept on disk in an SQLite file.
+
+    Entries are keyed by model, rendered prompt and call parameters, so a prompt
+    answered once is answered again without calling the model. Each stage has its
+    own switch and time to live; a stage not listed in `stages` is not cached.
+    When the total size goes over `max_bytes`, the least recently used entries go.
+    Registering a stage's prompt template drops its entries if the template changed.
+    `on_lookup(stage, hit)` is called on every lookup, e.g. to count them.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        stages: dict[str, dict] | None = None,
+        on_lookup: Optional[Callable[[str, bool], None]] = None,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.stages = stages or {}
+        self.on_lookup = on_lookup
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Stages run in worker threads, one connection serves them under the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                stage TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS completions_used ON completions (used);
+            CREATE TABLE IF NOT EXISTS templates (
+                stage TEXT PRIMARY KEY,
+                hash TEXT NOT NULL
+            );
+            """
+        )
+        self._bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()[0]
+
+    @classmethod
+    def from_config(cls, config: dict) -> "LLMCache":
+        """Build the cache from the `llm_cache` section of config.json."""
+        section = config.get("llm_cache", {})
+        return cls(
+            os.path.join(PROJECT_ROOT, section.get("path", "cache/llm.sqlite")),
+            max_bytes=section.get("max_bytes", 256 * 1024 * 1024),
+            stages=section.get("stages", {}),
+        )
+
+    def enabled(self, stage: str) -> bool:
+        return self.stages.get(stage, {}).get("enabled", False)
+
+    @staticmethod
+    def key(model: str, prompt: str, params: dict[str, Any]) -> str:
+        """Hash of everything the completion depends on."""
+        sha = hashlib.sha256()
+        sha.update(model.encode())
+        sha.update(b"\0" + json.dumps(params, sort_keys=True, default=str).encode())
+        sha.update(b"\0" + prompt.encode())
+        return sha.hexdigest()
+
+    def get(self, stage: str, key: str) -> str | None:
+        ttl = self.stages.get(stage, {}).get("ttl")
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, size, created FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and ttl is not None and now - row[2] > ttl:
+                self._delete(key, row[1])
+                row = None
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE completions SET used = ? WHERE key = ?", (now, key)
+                )
+                self._conn.commit()
+
+        if self.on_lookup is not None:
+            self.on_lookup(stage, row is not None)
+        return None if row is None else row[0]
+
+    def put(self, stage: str, key: str, value: str):
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?)",
+                (key, stage, value, size, now, now),
+            )
+            self._bytes += size - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def register_template(self, stage: str, template: str):
+        """Drop the stage's completions if its prompt template changed since."""
+        digest = hashlib.sha256(template.encode()).hexdigest()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hash FROM templates WHERE stage = ?", (stage,)
+            ).fetchone()
+            if row is not None and row[0] == digest:
+                return
+            if row is not None:
+                dropped = self._drop_stage(stage)
+                logger.info(
+                    f"Prompt template of {stage} changed: {dropped} cached "
+                    "completions dropped"
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO templates VALUES (?, ?)", (stage, digest)
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()
+            return {"entries": entries[0], "bytes": self._bytes}
+
+    # Subfunctions
+    def _delete(self, key: str, size: int):
+        self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+        self._bytes -= size
+
+    def _drop_stage(self, stage: str) -> int:
+        count, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions WHERE stage = ?",
+            (stage,),
+        ).fetchone()
+        self._conn.execute("DELETE FROM completions WHERE stage = ?", (stage,))
+        self._bytes -= size
+        return count
+
+    def _evict(self):
+        while self._bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM completions ORDER BY used LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._bytes = 0
+                return
+            for key, size in rows:
+                self._delete(key, size)
+                if self._bytes <= self.max_bytes:
+                    return
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def llm_cache() -> LLMCache:
+    """The cache described in config.json, opened on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache.from_config(load_config())
+        return _cache
@@ -0,0 +1,411 @@
+import gc
+import importlib
+import threading
+import time
+
+from beartype import beartype
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from lib import load_config, logger
+
+GB = 1024**3
+
+# Modules registering a loader for a given model id, imported on demand so that
+# preloading a model does not require the caller to import its wrapper first.
+PROVIDERS = {
+    "stabilityai/stable-diffusion-3.5-medium": "model.stable_diffusers",
+    "microsoft/TRELLIS-image-large": "model.trellis",
+    "openai/whisper-large-v3-turbo": "model.whisper",
+    "all-MiniLM-L6-v2": "model.embeddings",
+}
+
+
+def move_to(model: Any, device: str) -> Any:
+    """Default mover: call `.to(device)` and keep the original object if it returns None."""
+    moved = model.to(device)
+    return model if moved is None else moved
+
+
+@dataclass
+class ModelSpec:
+    """How to load a model and how much memory it takes once resident."""
+
+    loader: Callable[[], Any]
+    size: int
+    mover: Callable[[Any, str], Any] = move_to
+    pinned: bool = False
+
+
+@dataclass
+class ModelEntry:
+    model: Any
+    spec: ModelSpec
+    location: str
+    last_used: float = field(default_factory=time.monotonic)
+    in_use: int = 0
+    # Location the model is being moved to, outside the manager's lock
+    moving: Optional[str] = None
+
+
+@beartype
+class ModelManager:
+    """Keep model pipelines resident between requests in an LRU bounded by a memory budget.
+
+    Moving a model between the host and the device takes seconds: the lock only
+    guards the bookkeeping, moves happen outside of it on entries marked `moving`,
+    counted at both locations until done. `stats()` never waits for a move.
+    """
+
+    def __init__(
+        self,
+        device_budget: int,
+        host_budget: int,
+        offload_idle: bool = True,
+        idle_timeout: float = 300.0,
+        device: Optional[str] = None,
+        sizes: Optional[dict[str, int]] = None,
+    ):
+        self.device_budget = device_budget
+        self.host_budget = host_budget
+        self.offload_idle = offload_idle
+        self.idle_timeout = idle_timeout
+        self._device = device
+        self.sizes = sizes or {}
+
+        self._specs: dict[str, ModelSpec] = {}
+        self._entries: OrderedDict[str, ModelEntry] = OrderedDict()
+        self._loading: dict[str, threading.Event] = {}
+        self._lock = threading.RLock()
+        # Notified when a move ends
+        self._moved = threading.Condition(self._lock)
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.counters = {
+            "loads": 0,
+            "hits": 0,
+            "evictions": 0,
+            "offloads": 0,
+            "restores": 0,
+            "load_errors": 0,
+        }
+        self.load_seconds = 0.0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ModelManager":
+        """Build a manager from the `model_manager` section of config.json.
+
+        Ollama keeps its models resident on the same GPU: `ollama_reserved_gb` is
+        left to it out of `device_budget_gb`.
+        """
+        section = config.get("model_manager", {})
+        device_gb = section.get("device_budget_gb", 24)
+        reserved_gb = section.get("ollama_reserved_gb", 0)
+        return cls(
+            device_budget=int((device_gb - reserved_gb) * GB),
+            host_budget=int(section.get("host_budget_gb", 32) * GB),
+            offload_idle=section.get("offload_idle", True),
+            idle_timeout=float(section.get("idle_timeout", 300)),
+            device=section.get("device"),
+            sizes={
+                model_id: int(size_gb * GB)
+                for model_id, size_gb in section.get("sizes_gb", {}).items()
+            },
+        )
+
+    @property
+    def device(self) -> str:
+        """Device models are placed on when in use ("cuda" when available, else "cpu")."""
+        if self._device is None:
+            try:
+                import torch
+
+                self._device = "cuda" if torch.cuda.is_available() else "cpu"
+            except ImportError:
+                self._device = "cpu"
+        return self._device
+
+    def register(self, model_id: str, spec: ModelSpec):
+        """Declare how to load a model. Registering twice keeps the first spec."""
+        if model_id in self.sizes:
+            spec.size = self.sizes[model_id]
+        with self._lock:
+            if model_id not in self._specs:
+                self._specs[model_id] = spec
+
+    def is_registered(self, model_id: str) -> bool:
+        return model_id in self._specs
+
+    @contextmanager
+    def use(self, model_id: str) -> Iterator[Any]:
+        """Borrow a model placed on the device; it cannot be evicted while borrowed."""
+        entry = self._acquire(model_id)
+        try:
+            yield entry.model
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    def get(self, model_id: str) -> Any:
+        """Return a model for long-lived holders. Only safe for pinned models."""
+        with self.use(model_id) as model:
+            return model
+
+    def preload(self, model_ids: list[str]) -> threading.Thread:
+        """Load the given models in a background thread."""
+
+        def run():
+            for model_id in model_ids:
+                try:
+                    self._ensure_registered(model_id)
+                    with self.use(model_id):
+                        pass
+                    logger.info(f"Preloaded model '{model_id}'")
+                except Exception as e:
+                    logger.error(f"Failed to preload model '{model_id}': {e}")
+
+        thread = threading.Thread(target=run, name="model-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def offload_idle_models(self):
+        """Move models unused for `idle_timeout` seconds from the device to the host."""
+        if self.device == "cpu":
+            return
+        now = time.monotonic()
+        with self._lock:
+            moves = [
+                self._plan_offload(model_id, entry)
+                for model_id, entry in list(self._entries.items())
+                if entry.location == self.device
+                and entry.in_use == 0
+                and entry.moving is None
+                and not entry.spec.pinned
+                and now - entry.last_used >= self.idle_timeout
+            ]
+        self._run_moves(moves)
+
+    def evict(self, model_id: str):
+        """Drop a model from memory if it is not in use."""
+        with self._lock:
+            entry = self._entries.get(model_id)
+            if entry is None or entry.in_use or entry.moving is not None:
+                return
+            self._drop(model_id)
+        self._free_memory()
+
+    def clear(self):
+        """Drop every model that is not in use."""
+        with self._lock:
+            for model_id, entry in list(self._entries.items()):
+                if not entry.in_use and entry.moving is None:
+                    self._drop(model_id)
+        self._free_memory()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        """Counters and current residency, for logs and metrics."""
+        with self._lock:
+            return {
+                **self.counters,
+                "load_seconds": self.load_seconds,
+                "device_bytes": self._usage(self.device),
+                "host_bytes": self._usage("cpu") if self.device != "cpu" else 0,
+                "models": {
+                    model_id: {
+                        "location": entry.location,
+                        "moving": entry.moving,
+                        "size": entry.spec.size,
+                        "in_use": entry.in_use,
+                    }
+                    for model_id, entry in self._entries.items()
+                },
+            }
+
+    # Subfunctions
+    def _ensure_registered(self, model_id: str):
+        if model_id not in self._specs and model_id in PROVIDERS:
+            importlib.import_module(PROVIDERS[model_id])
+        if model_id not in self._specs:
+            raise KeyError(f"No loader registered for model '{model_id}'")
+
+    def _acquire(self, model_id: str) -> ModelEntry:
+        self._ensure_registered(model_id)
+        self._start_reaper()
+
+        while True:
+            with self._lock:
+                entry = self._entries.get(model_id)
+                if entry is not None and entry.moving is not None:
+                    self._moved.wait()
+                    continue
+                if entry is not None:
+                    self.counters["hits"] += 1
+                    entry.in_use += 1
+                    entry.last_used = time.monotonic()
+                    self._entries.move_to_end(model_id)
+                    if entry.location == self.device:
+                        return entry
+                    entry.moving = self.device
+                    moves = self._plan_room(self.device, entry.spec.size, model_id)
+                    break
+
+                event = self._loading.get(model_id)
+                if event is None:
+                    self._loading[model_id] = threading.Event()
+                    break
+            event.wait()
+
+        if entry is not None:
+            self._run_moves(moves)
+            try:
+                self._move(model_id, entry, self.device)
+            except Exception:
+                with self._lock:
+                    entry.in_use -= 1
+                raise
+            return entry
+
+        try:
+            entry = self._load(model_id)
+        finally:
+            with self._lock:
+                self._loading.pop(model_id).set()
+        return entry
+
+    def _load(self, model_id: str) -> ModelEntry:
+        spec = self._specs[model_id]
+        logger.info(f"Loading model '{model_id}'...")
+        start = time.perf_counter()
+
+        with self._lock:
+            moves = self._plan_room(self.device, spec.size, exclude=model_id)
+        self._run_moves(moves)
+
+        try:
+            model = spec.mover(spec.loader(), self.device)
+        except Exception:
+            with self._lock:
+                self.counters["load_errors"] += 1
+            raise
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.counters["loads"] += 1
+            self.load_seconds += elapsed
+            entry = ModelEntry(model=model, spec=spec, location=self.device, in_use=1)
+            self._entries[model_id] = entry
+        logger.info(f"Model '{model_id}' loaded on {self.device} in {elapsed:.1f}s")
+        return entry
+
+    def _plan_offload(self, model_id: str, entry: ModelEntry) -> tuple:
+        """Under the lock: mark a model as moving to the host, after making room."""
+        self._plan_room("cpu", entry.spec.size, exclude=model_id)
+        entry.moving = "cpu"
+        return model_id, entry, "cpu"
+
+    def _run_moves(self, moves: list[tuple]):
+        """Run moves planned under the lock, outside of it."""
+        for model_id, entry, location in moves:
+            try:
+                self._move(model_id, entry, location)
+            except Exception as e:
+                logger.error(f"Failed to move model '{model_id}' to {location}: {e}")
+        if moves:
+            self._free_memory()
+
+    def _move(self, model_id: str, entry: ModelEntry, location: str):
+        """Move a model marked as moving to `location`, without holding the lock."""
+        try:
+            model = entry.spec.mover(entry.model, location)
+        except Exception:
+            with self._lock:
+                entry.moving = None
+                self._moved.notify_all()
+            raise
+
+        with self._lock:
+            entry.model = model
+            entry.location = location
+            entry.moving = None
+            self.counters["restores" if location == self.device else "offloads"] += 1
+            self._moved.notify_all()
+        if location == self.device:
+            logger.info(f"Model '{model_id}' restored to {self.device}")
+        else:
+            logger.info(f"Model '{model_id}' offloaded to cpu")
+
+    def _drop(self, model_id: str):
+        del self._entries[model_id]
+        self.counters["evictions"] += 1
+        logger.info(f"Model '{model_id}' evicted")
+
+    def _budget(self, location: str) -> int:
+        return self.device_budget if location == self.device else self.host_budget
+
+    def _usage(self, location: str) -> int:
+        """Memory taken at `location`, by models there or on their way to it."""
+        return sum(
+            entry.spec.size
+            for entry in self._entries.values()
+            if location in (entry.location, entry.moving)
+        )
+
+    def _plan_room(self, location: str, needed: int, exclude: str) -> list[tuple]:
+        """Under the lock: evict, or mark for offloading, least recently used idle
+        models until `needed` bytes fit. Return the offloads to run outside the lock.
+        """
+        budget = self._budget(location)
+        moves, freed = [], 0
+        for model_id, entry in list(self._entries.items()):
+            if self._usage(location) - freed + needed <= budget:
+                return moves
+            if (
+                model_id == exclude
+                or entry.location != location
+                or entry.moving is not None
+                or entry.in_use
+                or entry.spec.pinned
+            ):
+                continue
+            if location != "cpu" and self.offload_idle:
+                moves.append(self._plan_offload(model_id, entry))
+                # Counted on the device until moved, but freed for this request
+                freed += entry.spec.size
+            else:
+                self._drop(model_id)
+                self._free_memory()
+
+        if self._usage(location) - freed + needed > budget:
+            logger.warning(
+                f"Model memory budget exceeded on {location}: every resident model is in use or pinned"
+            )
+        return moves
+
+    def _free_memory(self):
+        gc.collect()
+        if self.device.startswith("cuda"):
+            import torch
+
+            torch.cuda.empty_cache()
+
+    def _start_reaper(self):
+        if not self.offload_idle or self._reaper is not None or self.device == "cpu":
+            return
+
+        def run():
+            while not self._stop.wait(self.idle_timeout / 2):
+                self.offload_idle_models()
+
+        self._reaper = threading.Thread(target=run, name="model-reaper", daemon=True)
+        self._reaper.start()
+
+
+model_manager = ModelManager.from_config(load_config())
@@ -0,0 +1,127 @@
+import threading
+import time
+
+from beartype import beartype
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_ollama import ChatOllama
+
+from lib import load_config, logger
+from lib.metrics import llm_inference_seconds, llm_load_seconds
+
+# Ollama's default: a model is unloaded after five idle minutes
+DEFAULT_KEEP_ALIVE = "5m"
+
+
+class OllamaTiming(BaseCallbackHandler):
+    """Split the time of each Ollama call between loading the model and inference.
+
+    Ollama reports both in the final response, in nanoseconds: a load time above
+    zero means the call found its model unloaded and paid a cold start.
+    """
+
+    def on_llm_end(self, response: LLMResult, **kwargs) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                info = dict(generation.generation_info or {})
+                message = getattr(generation, "message", None)
+                if message is not None:
+                    info = {**message.response_metadata, **info}
+                if "total_duration" in info:
+                    self.record(info)
+
+    @staticmethod
+    def record(info: dict):
+        model = info.get("model", "")
+        load = info.get("load_duration", 0) / 1e9
+        inference = (
+            info.get("prompt_eval_duration", 0) + info.get("eval_duration", 0)
+        ) / 1e9
+        llm_load_seconds.observe(load, model=model)
+        llm_inference_seconds.observe(inference, model=model)
+        if load > 1:
+            logger.info(f"Ollama loaded {model} in {load:.1f} s before answering")
+
+
+@beartype
+class OllamaRegistry:
+    """Chat models served by the local Ollama instance, built once and shared.
+
+    A model is built once per (model, temperature): the stages and requests using
+    it share its HTTP client and connection pool. Each model gets the residency of
+    the `keep_alive` policy (a duration such as "30m", -1 to keep it loaded, 0 to
+    unload it after each call), so that consecutive stages do not reload it.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        keep_alive: dict[str, str | int] | None = None,
+    ):
+        self.base_url = base_url
+        self.policy = keep_alive or {}
+        self.timing = OllamaTiming()
+        self._models: dict[tuple[str, int | float], ChatOllama] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "OllamaRegistry":
+        """Build the registry from the `ollama` section of config.json."""
+        section = config.get("ollama", {})
+        return cls(
+            base_url=section.get("base_url"),
+            keep_alive=section.get("keep_alive"),
+        )
+
+    def keep_alive(self, model_name: str) -> str | int:
+        return self.policy.get(
+            model_name, self.policy.get("default", DEFAULT_KEEP_ALIVE)
+        )
+
+    def model(self, model_name: str, temperature: int | float = 0) -> ChatOllama:
+        key = (model_name, temperature)
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = ChatOllama(
+                    model=model_name,
+                    temperature=temperature,
+                    streaming=True,
+                    keep_alive=self.keep_alive(model_name),
+                    base_url=self.base_url,
+                    callbacks=[self.timing],
+                )
+            return self._models[key]
+
+    def warm(self, model_names: list[str]):
+        """Load models into Ollama ahead of the first request that needs them.
+
+        A request without prompt only loads the model, with its residency policy.
+        """
+        for model_name in dict.fromkeys(model_names):
+            client = self.model(model_name)._client
+            start = time.perf_counter()
+            try:
+                response = client.generate(
+                    model=model_name, prompt="", keep_alive=self.keep_alive(model_name)
+                )
+            except Exception as e:
+                logger.warning(f"Could not warm Ollama model {model_name}: {e}")
+                continue
+            load = (response.load_duration or 0) / 1e9
+            llm_load_seconds.observe(load, model=model_name)
+            logger.info(
+                f"Warmed Ollama model {model_name} in "
+                f"{time.perf_counter() - start:.1f} s (load {load:.1f} s)"
+            )
+
+
+registry = OllamaRegistry.from_config(load_config())
+
+
+def initialize_model(model_name: str, temperature: int | float = 0) -> ChatOllama:
+    """Chat model served by the local Ollama instance."""
+    return registry.model(model_name, temperature)
+
+
+def warm(model_names: list[str]):
+    registry.warm(model_names)
@@ -0,0 +1,254 @@
+import contextvars
+import itertools
+import threading
+import time
+
+from beartype import beartype
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Optional
+
+from lib import CancellationToken, OperationCancelled, load_config, logger, span
+from model.manager import model_manager
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+
+    INTERACTIVE = 0
+    BULK = 1
+
+
+@dataclass(frozen=True)
+class JobContext:
+    session: str = "default"
+    priority: Priority = Priority.INTERACTIVE
+    token: Optional[CancellationToken] = None
+
+
+job_context: contextvars.ContextVar[JobContext] = contextvars.ContextVar(
+    "job_context", default=JobContext()
+)
+
+# How often a cancellable job waiting for a slot checks its token
+CANCEL_POLL_INTERVAL = 0.2
+
+
+def checkpoint():
+    """Abort the current job if its request was cancelled. Call it at step boundaries."""
+    token = job_context.get().token
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def _job_name(fn: Callable[..., Any]) -> str:
+    """Name of a job in traces, e.g. "model.trellis.generate"."""
+    name = getattr(fn, "__qualname__", type(fn).__name__)
+    module = getattr(fn, "__module__", None)
+    return f"{module}.{name}" if module else name
+
+
+@dataclass
+class Ticket:
+    id: int
+    session: str
+    priority: Priority
+    device: str
+    submitted_at: float = field(default_factory=time.monotonic)
+    granted: bool = False
+
+
+@beartype
+class GPUScheduler:
+    """Run heavy model calls with a fixed number of slots per device.
+
+    Waiting jobs are ordered by priority, then served round-robin across client
+    sessions so that one session queuing many jobs cannot starve the others.
+    The submitting thread runs its own job once it has been granted a slot.
+    """
+
+    def __init__(self, slots: dict[str, int], default_slots: int = 1):
+        self.slots = dict(slots)
+        self.default_slots = default_slots
+
+        self._cond = threading.Condition()
+        self._ids = itertools.count()
+        # device -> priority -> session -> waiting tickets (insertion order is the round-robin order)
+        self._waiting: dict[str, dict[Priority, OrderedDict[str, deque[Ticket]]]] = {}
+        self._running: dict[str, int] = {}
+
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.wait_count = 0
+        self.wait_seconds = 0.0
+        self.wait_max = 0.0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "GPUScheduler":
+        """Build a scheduler from the `scheduler` section of config.json."""
+        section = config.get("scheduler", {})
+        return cls(
+            slots=section.get("slots", {}),
+            default_slots=section.get("default_slots", 1),
+        )
+
+    @contextmanager
+    def context(
+        self,
+        session: str,
+        priority: Priority = Priority.INTERACTIVE,
+        token: Optional[CancellationToken] = None,
+    ):
+        """Attribute the jobs submitted inside this block to a client session.
+
+        Jobs carrying a cancellation token leave the queue as soon as it is cancelled
+        and can stop early through `checkpoint()`.
+        """
+        reset_token = job_context.set(
+            JobContext(session=session, priority=priority, token=token)
+        )
+        try:
+            yield
+        finally:
+            job_context.reset(reset_token)
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        device: Optional[str] = None,
+        **kwargs,
+    ) -> Any:
+        """Block until a slot is free on `device`, then run `fn` in the calling thread."""
+        ctx = job_context.get()
+        ticket = Ticket(
+            id=next(self._ids),
+            session=ctx.session,
+            priority=ctx.priority,
+            device=device or model_manager.device,
+        )
+
+        checkpoint()
+        with span("gpu_wait", device=ticket.device):
+            self._wait_for_slot(ticket, ctx.token)
+        error = None
+        try:
+            with span(_job_name(fn), device=ticket.device):
+                return fn(*args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._release(ticket, error)
+
+    def stats(self) -> dict:
+        """Queue depth, running jobs and wait times, for logs and metrics."""
+        with self._cond:
+            devices = set(self._waiting) | set(self._running) | set(self.slots)
+            return {
+                "devices": {
+                    device: {
+                        "slots": self._slots(device),
+                        "running": self._running.get(device, 0),
+                        "queued": {
+                            priority.name.lower(): sum(
+                                len(tickets)
+                                for tickets in self._waiting.get(device, {})
+                                .get(priority, {})
+                                .values()
+                            )
+                            for priority in Priority
+                        },
+                    }
+                    for device in devices
+                },
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "wait_count": self.wait_count,
+                "wait_seconds": self.wait_seconds,
+                "wait_max": self.wait_max,
+            }
+
+    # Subfunctions
+    def _slots(self, device: str) -> int:
+        return self.slots.get(device, self.default_slots)
+
+    def _wait_for_slot(self, ticket: Ticket, token: Optional[CancellationToken]):
+        with self._cond:
+            sessions = self._waiting.setdefault(ticket.device, {}).setdefault(
+                ticket.priority, OrderedDict()
+            )
+            sessions.setdefault(ticket.session, deque()).append(ticket)
+            self._dispatch(ticket.device)
+
+            if not ticket.granted:
+                logger.info(
+                    f"Job {ticket.id} from session {ticket.session} queued for {ticket.device}"
+                )
+            while not ticket.granted:
+                if token is not None and token.cancelled:
+                    self._withdraw(ticket)
+                    raise OperationCancelled(token.reason)
+                self._cond.wait(CANCEL_POLL_INTERVAL if token is not None else None)
+
+            waited = time.monotonic() - ticket.submitted_at
+            self.wait_count += 1
+            self.wait_seconds += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def _withdraw(self, ticket: Ticket):
+        """Remove a ticket that gave up waiting."""
+        sessions = self._waiting[ticket.device][ticket.priority]
+        sessions[ticket.session].remove(ticket)
+        if not sessions[ticket.session]:
+            del sessions[ticket.session]
+        self.cancelled += 1
+        logger.info(
+            f"Job {ticket.id} from session {ticket.session} cancelled while queued"
+        )
+
+    def _release(self, ticket: Ticket, error: Optional[BaseException]):
+        with self._cond:
+            if error is None:
+                self.completed += 1
+            elif isinstance(error, OperationCancelled):
+                self.cancelled += 1
+            else:
+                self.failed += 1
+            self._running[ticket.device] -= 1
+            self._dispatch(ticket.device)
+
+    def _dispatch(self, device: str):
+        """Grant free slots to waiting tickets: best priority first, round-robin on sessions."""
+        granted = False
+        while self._running.get(device, 0) < self._slots(device):
+            ticket = self._next_ticket(device)
+            if ticket is None:
+                break
+            ticket.granted = True
+            self._running[device] = self._running.get(device, 0) + 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _next_ticket(self, device: str) -> Optional[Ticket]:
+        for priority in Priority:
+            sessions = self._waiting.get(device, {}).get(priority)
+            if not sessions:
+                continue
+            session, tickets = next(iter(sessions.items()))
+            ticket = tickets.popleft()
+            # Move the session to the back of the rotation, or drop it if it has nothing left
+            del sessions[session]
+            if tickets:
+                sessions[session] = tickets
+            return ticket
+        return None
+
+
+gpu_scheduler = GPUScheduler.from_config(load_config())
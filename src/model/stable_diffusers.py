@@ -5,6 +5,10 @@ from beartype import beartype
 from diffusers import StableDiffusion3Pipeline
 from dotenv import load_dotenv
 from huggingface_hub import login
+from PIL import Image
+
+from model.manager import GB, ModelSpec, model_manager
+from model.scheduler import checkpoint, job_context
 
 load_dotenv()
 
@@ -17,22 +21,40 @@ if hf_token is None:
 
 login(token=hf_token)
 
+MODEL_ID = "stabilityai/stable-diffusion-3.5-medium"
+
+
+def _load():
+    return StableDiffusion3Pipeline.from_pretrained(MODEL_ID, torch_dtype=torch.float16)
+
+
+model_manager.register(MODEL_ID, ModelSpec(loader=_load, size=16 * GB))
 
-@beartype
-def generate(prompt: str, filename: str):
-    model_id = "stabilityai/stable-diffusion-3.5-medium"
 
-    pipe = StableDiffusion3Pipeline.from_pretrained(model_id, torch_dtype=torch.float16)
-    pipe = pipe.to("cuda")
+def _interrupt_if_cancelled(pipe, step, timestep, callback_kwargs):
+    """Step callback: make the pipeline leave its denoising loop once the job is cancelled."""
+    token = job_context.get().token
+    if token is not None and token.cancelled:
+        pipe._interrupt = True
+    return callback_kwargs
 
-    image = pipe(prompt).images[0]
 
+@beartype
+def render(prompt: str) -> Image.Image:
+    """The generated image, in memory."""
+    with model_manager.use(MODEL_ID) as pipe:
+        image = pipe(prompt, callback_on_step_end=_interrupt_if_cancelled).images[0]
+    # An interrupted pipeline still returns the half-denoised image
+    checkpoint()
+    return image
+
+
+@beartype
+def generate(prompt: str, filename: str):
+    image = render(prompt)
     image.save(filename)
     image.show()
 
-    del pipe
-    torch.cuda.empty_cache()
-
 
 if __name__ == "__main__":
     prompt = "A majestic steampunk boat with intricate brass and copper details sails across the open sea, its smokestacks releasing gentle plumes of steam. In the distance, the colossal figure of Cthulhu emerges ominously from the horizon, its tentacles writhing beneath a stormy, otherworldly sky. The atmosphere is eerie yet awe-inspiring, with a blend of fantasy and Lovecraftian horror."
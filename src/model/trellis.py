@@ -3,8 +3,6 @@ import os
 from beartype import beartype
 from pathlib import Path
 
-import torch
-
 os.environ["ATTN_BACKEND"] = (
     "xformers"  # Can be 'flash-attn' or 'xformers', default is 'flash-attn'
 )
@@ -17,49 +15,79 @@ from PIL import Image
 from TRELLIS.trellis.pipelines import TrellisImageTo3DPipeline
 from TRELLIS.trellis.utils import postprocessing_utils
 
+from model.manager import GB, ModelSpec, model_manager
+from model.scheduler import checkpoint
 
-@beartype
-def read_glb(object_path: str):
-    with open(object_path, "rb") as f:
-        return f.read()
+MODEL_ID = "microsoft/TRELLIS-image-large"
 
 
-@beartype
-def generate(image_path: Path, image_id: str):
+def _checked(sample_once):
+    """Wrap a sampler step so that a cancelled job stops at the next step boundary."""
+
+    def run(*args, **kwargs):
+        checkpoint()
+        return sample_once(*args, **kwargs)
+
+    return run
+
+
+def _load():
     # Load a pipeline from a model folder or a Hugging Face model hub.
-    pipeline = TrellisImageTo3DPipeline.from_pretrained("microsoft/TRELLIS-image-large")
-    pipeline.cuda()
+    pipeline = TrellisImageTo3DPipeline.from_pretrained(MODEL_ID)
+    for sampler in (pipeline.sparse_structure_sampler, pipeline.slat_sampler):
+        sampler.sample_once = _checked(sampler.sample_once)
+    return pipeline
+
+
+model_manager.register(MODEL_ID, ModelSpec(loader=_load, size=6 * GB))
 
-    # Load an image
-    image = Image.open(image_path)
 
+# Texture baking renders the gaussians with CUDA: the export stays in this process,
+# off the GPU scheduler slot so that the next object's sampling can start, and in
+# the `gpu` pool as it runs for seconds
+EXPORT_POOL = "gpu"
+
+
+@beartype
+def sample(image: Image.Image, image_id: str) -> dict:
+    """Sample the gaussians and mesh of the object in the image."""
     # Run the pipeline
-    outputs = pipeline.run(
-        image,
-        seed=1,
-        # Optional parameters
-        sparse_structure_sampler_params={
-            "steps": 12,
-            "cfg_strength": 7.5,
-        },
-        slat_sampler_params={
-            "steps": 12,
-            "cfg_strength": 3,
-        },
-    )
+    with model_manager.use(MODEL_ID) as pipeline:
+        outputs = pipeline.run(
+            image,
+            seed=1,
+            # Optional parameters
+            sparse_structure_sampler_params={
+                "steps": 12,
+                "cfg_strength": 7.5,
+            },
+            slat_sampler_params={
+                "steps": 12,
+                "cfg_strength": 3,
+            },
+        )
 
+    checkpoint()
+    return {"gaussian": outputs["gaussian"][0], "mesh": outputs["mesh"][0]}
+
+
+def export(samples: dict) -> bytes:
+    """Simplify the mesh, bake its texture and return the GLB file content."""
     # GLB files can be extracted from the outputs
     glb = postprocessing_utils.to_glb(
-        outputs["gaussian"][0],
-        outputs["mesh"][0],
+        samples["gaussian"],
+        samples["mesh"],
         # Optional parameters
         simplify=0.95,  # Ratio of triangles to remove in the simplification process
         texture_size=256,  # Size of the texture used for the GLB
     )
-    glb.export(image_path.parent / f"{image_id}.glb")
+    return glb.export(file_type="glb")
+
 
-    del pipeline
-    torch.cuda.empty_cache()
+@beartype
+def generate(image_path: Path, image_id: str):
+    glb = export(sample(Image.open(image_path), image_id))
+    (image_path.parent / f"{image_id}.glb").write_bytes(glb)
 
 
 if __name__ == "__main__":
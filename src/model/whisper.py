@@ -0,0 +1,53 @@
+import numpy as np
+import torch
+
+from beartype import beartype
+from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
+
+from model.manager import GB, ModelSpec, model_manager
+
+MODEL_ID = "openai/whisper-large-v3-turbo"
+
+
+def _load():
+    dtype = torch.float16 if model_manager.device.startswith("cuda") else torch.float32
+
+    model = AutoModelForSpeechSeq2Seq.from_pretrained(
+        MODEL_ID, dtype=dtype, low_cpu_mem_usage=True, use_safetensors=True
+    )
+    processor = AutoProcessor.from_pretrained(MODEL_ID)
+
+    return pipeline(
+        "automatic-speech-recognition",
+        model=model,
+        tokenizer=processor.tokenizer,
+        feature_extractor=processor.feature_extractor,
+        torch_dtype=dtype,
+    )
+
+
+def _move(pipe, device: str):
+    # transformers pipelines have no `.to()`, move the underlying model instead
+    pipe.model.to(device)
+    pipe.device = torch.device(device)
+    return pipe
+
+
+model_manager.register(MODEL_ID, ModelSpec(loader=_load, size=2 * GB, mover=_move))
+
+
+@beartype
+def transcribe(audio: str) -> str:
+    with model_manager.use(MODEL_ID) as pipe:
+        result = pipe(audio, return_timestamps=True)
+    return result["text"]
+
+
+@beartype
+def transcribe_samples(samples: np.ndarray, sample_rate: int) -> str:
+    # The pipeline resamples to Whisper's 16 kHz itself
+    with model_manager.use(MODEL_ID) as pipe:
+        result = pipe(
+            {"raw": samples, "sampling_rate": sample_rate}, return_timestamps=True
+        )
+    return result["text"]
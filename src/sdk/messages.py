@@ -1,27 +1,47 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from dataclasses import dataclass
 from enum import Enum
 from sdk.protobuf import message_pb2
 
+import hashlib
 import json
+import uuid
+import zlib
+
+# Room left in a frame for everything but the chunk payload (type, ids, checksum, ...)
+FRAME_OVERHEAD = 1024
 
 
 class IncomingMessageType(str, Enum):
     TEXT = "text"
     AUDIO = "audio"
+    AUDIO_START = "audio_start"
+    AUDIO_CHUNK = "audio_chunk"
+    AUDIO_END = "audio_end"
     GESTURE = "gesture"
+    SESSION_CONFIG = "session_config"
+    CANCEL = "cancel"
+    TRACE = "trace"
     ERROR = "error"
 
 
 class OutgoingMessageType(str, Enum):
     SESSION_START = "session_start"
+    SESSION_CONFIG = "session_config"
     UNRELATED_RESPONSE = "unrelated_response"
     GENERATE_IMAGE = "generate_image"
     GENERATE_3D_OBJECT = "generate_3d_object"
     GENERATE_3D_SCENE = "generate_3d_scene"
     MODIFY_3D_SCENE = "modify_3d_scene"
+    SCENE_LAYOUT = "scene_layout"
+    SCENE_OBJECT = "scene_object"
     CONVERT_SPEECH = "convert_speech"
+    ASSET_HEADER = "asset_header"
+    ASSET_CHUNK = "asset_chunk"
+    ASSET_COMPLETE = "asset_complete"
+    TRACE = "trace"
     ERROR = "error"
 
 
@@ -39,8 +59,30 @@ class IIncomingMessage(ABC):
                 return IncomingTextMessage(text=proto.text)
             case IncomingMessageType.AUDIO:
                 return IncomingAudioMessage(data=proto.assets[0].data)
+            case IncomingMessageType.AUDIO_START:
+                return IncomingAudioStartMessage(
+                    request_id=proto.request_id,
+                    **json.loads(proto.metadata or "{}"),
+                )
+            case IncomingMessageType.AUDIO_CHUNK:
+                return IncomingAudioChunkMessage(
+                    request_id=proto.request_id,
+                    data=proto.assets[0].data if proto.assets else b"",
+                )
+            case IncomingMessageType.AUDIO_END:
+                return IncomingAudioEndMessage(request_id=proto.request_id)
             case IncomingMessageType.GESTURE:
                 return IncomingGestureMessage(data=proto.text)
+            case IncomingMessageType.SESSION_CONFIG:
+                config = json.loads(proto.metadata or "{}")
+                return IncomingSessionConfigMessage(
+                    audio_codec=config.get("audio_codec"),
+                    asset_hashes=tuple(config.get("asset_hashes", ())),
+                )
+            case IncomingMessageType.CANCEL:
+                return IncomingCancelMessage(request_id=proto.request_id)
+            case IncomingMessageType.TRACE:
+                return IncomingTraceMessage(request_id=proto.text)
             case IncomingMessageType.ERROR:
                 return IncomingErrorMessage(status=proto.status, text=proto.text)
 
@@ -63,11 +105,65 @@ class IncomingAudioMessage(IIncomingMessage):
     data: bytes
 
 
+@dataclass(frozen=True)
+class IncomingAudioStartMessage(IIncomingMessage):
+    """Start of a recording streamed in `audio_chunk` messages, up to `audio_end`.
+
+    Its format is given in the metadata, e.g. {"sample_rate": 16000, "channels": 1}.
+    Every message of the stream carries the same request id.
+    """
+
+    request_id: str
+    sample_rate: int = 16000
+    channels: int = 1
+    encoding: str = "pcm_s16le"
+
+
+@dataclass(frozen=True)
+class IncomingAudioChunkMessage(IIncomingMessage):
+    """Next bytes of a streamed recording, in `assets[0].data`."""
+
+    request_id: str
+    data: bytes
+
+
+@dataclass(frozen=True)
+class IncomingAudioEndMessage(IIncomingMessage):
+    request_id: str
+
+
 @dataclass(frozen=True)
 class IncomingGestureMessage(IIncomingMessage):
     data: bytes
 
 
+@dataclass(frozen=True)
+class IncomingSessionConfigMessage(IIncomingMessage):
+    """Session settings chosen by the client among the ones offered at session start.
+
+    `asset_hashes` are the content hashes of the assets the client already holds,
+    e.g. cached from previous sessions: they are sent by reference only.
+    Settings left to None are unchanged.
+    """
+
+    audio_codec: str | None = None
+    asset_hashes: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class IncomingCancelMessage(IIncomingMessage):
+    """Stop the request `request_id`, or every request of the session if it is empty."""
+
+    request_id: str = ""
+
+
+@dataclass(frozen=True)
+class IncomingTraceMessage(IIncomingMessage):
+    """Ask for the timing tree of a request, the latest one if `request_id` is empty."""
+
+    request_id: str
+
+
 @dataclass(frozen=True)
 class IncomingErrorMessage(IIncomingMessage):
     status: int
@@ -79,22 +175,49 @@ class IncomingUnknownMessage(IIncomingMessage):
     original_type: str
 
 
+def content_hash(data: bytes) -> str:
+    """Hash identifying an asset by its content, in MediaAsset.hash."""
+    return hashlib.sha256(data).hexdigest()
+
+
 @dataclass(frozen=True)
 class AppMediaAsset:
     id: str
     filename: str
     data: bytes
+    hash: str = ""  # content_hash(data), when known beforehand
 
 
 @dataclass(frozen=True)
 class OutgoingSessionStartMessage(IOutgoingMessage):
+    """Session id, and the audio codecs the client may pick from with session_config."""
+
     text: str
+    audio_codecs: tuple[str, ...] = ("wav",)
 
     def to_proto(self) -> message_pb2.Content:
         return message_pb2.Content(
             type=OutgoingMessageType.SESSION_START.value,
             text=self.text,
             status=200,
+            metadata=json.dumps({"audio_codecs": list(self.audio_codecs)}),
+        )
+
+
+@dataclass(frozen=True)
+class OutgoingSessionConfigMessage(IOutgoingMessage):
+    """Session settings in effect, answering a session_config message."""
+
+    audio_codec: str
+    assets_held: int = 0  # assets the server knows the client holds
+
+    def to_proto(self) -> message_pb2.Content:
+        return message_pb2.Content(
+            type=OutgoingMessageType.SESSION_CONFIG.value,
+            status=200,
+            metadata=json.dumps(
+                {"audio_codec": self.audio_codec, "assets_held": self.assets_held}
+            ),
         )
 
 
@@ -112,13 +235,16 @@ class OutgoingUnrelatedMessage(IOutgoingMessage):
 
 @dataclass(frozen=True)
 class OutgoingConvertedSpeechMessage(IOutgoingMessage):
+    """Transcript of a recording; partial ones (status 206) grow as the user speaks."""
+
     text: str
+    partial: bool = False
 
     def to_proto(self) -> message_pb2.Content:
         return message_pb2.Content(
             type=OutgoingMessageType.CONVERT_SPEECH.value,
             text=self.text,
-            status=200,
+            status=206 if self.partial else 200,
         )
 
 
@@ -149,6 +275,7 @@ class OutgoingGeneratedImagesMessage(IOutgoingMessage):
                     id=app_asset.id,
                     filename=app_asset.filename,
                     data=app_asset.data,
+                    hash=app_asset.hash,
                 )
             )
 
@@ -174,6 +301,7 @@ class OutgoingGenerated3DObjectsMessage(IOutgoingMessage):
                     id=app_asset.id,
                     filename=app_asset.filename,
                     data=app_asset.data,
+                    hash=app_asset.hash,
                 )
             )
 
@@ -200,6 +328,7 @@ class OutgoingGenerated3DSceneMessage(IOutgoingMessage):
                     id=app_asset.id,
                     filename=app_asset.filename,
                     data=app_asset.data,
+                    hash=app_asset.hash,
                 )
             )
 
@@ -227,6 +356,7 @@ class OutgoingModified3DSceneMessage(IOutgoingMessage):
                     id=app_asset.id,
                     filename=app_asset.filename,
                     data=app_asset.data,
+                    hash=app_asset.hash,
                 )
             )
 
@@ -237,3 +367,194 @@ class OutgoingModified3DSceneMessage(IOutgoingMessage):
             status=200,
             metadata=json.dumps(self.modified_scene),
         )
+
+
+@dataclass(frozen=True)
+class OutgoingSceneLayoutMessage(IOutgoingMessage):
+    """Scene graph sent before its objects exist; `placeholders` are the dynamic ids to fill."""
+
+    text: str
+    json_scene: dict
+    placeholders: list[str]
+
+    def to_proto(self) -> message_pb2.Content:
+        return message_pb2.Content(
+            type=OutgoingMessageType.SCENE_LAYOUT.value,
+            text=self.text,
+            assets=[
+                message_pb2.MediaAsset(id=placeholder)
+                for placeholder in self.placeholders
+            ],
+            status=200,
+            metadata=json.dumps(self.json_scene),
+        )
+
+
+@dataclass(frozen=True)
+class OutgoingSceneObjectMessage(IOutgoingMessage):
+    """One generated object of a scene layout, replacing the placeholder `placeholder_id`."""
+
+    text: str
+    placeholder_id: str
+    asset: AppMediaAsset
+
+    def to_proto(self) -> message_pb2.Content:
+        return message_pb2.Content(
+            type=OutgoingMessageType.SCENE_OBJECT.value,
+            text=self.text,
+            assets=[
+                message_pb2.MediaAsset(
+                    id=self.asset.id,
+                    filename=self.asset.filename,
+                    data=self.asset.data,
+                    hash=self.asset.hash,
+                )
+            ],
+            status=200,
+            metadata=json.dumps({"placeholder_id": self.placeholder_id}),
+        )
+
+
+@dataclass(frozen=True)
+class OutgoingTraceMessage(IOutgoingMessage):
+    request_id: str
+    tree: dict
+
+    def to_proto(self) -> message_pb2.Content:
+        return message_pb2.Content(
+            type=OutgoingMessageType.TRACE.value,
+            text=self.request_id,
+            status=200,
+            metadata=json.dumps(self.tree),
+        )
+
+
+@dataclass(frozen=True)
+class OutgoingAssetHeaderMessage(IOutgoingMessage):
+    transfer_id: str
+    asset_id: str
+    filename: str
+    total: int
+    checksum: str
+
+    def to_proto(self) -> message_pb2.Content:
+        return message_pb2.Content(
+            type=OutgoingMessageType.ASSET_HEADER.value,
+            assets=[
+                message_pb2.MediaAsset(
+                    id=self.asset_id, filename=self.filename, chunked=True
+                )
+            ],
+            chunk=message_pb2.AssetChunk(
+                transfer_id=self.transfer_id,
+                asset_id=self.asset_id,
+                total=self.total,
+                checksum=self.checksum,
+            ),
+            status=200,
+        )
+
+
+@dataclass(frozen=True)
+class OutgoingAssetChunkMessage(IOutgoingMessage):
+    transfer_id: str
+    asset_id: str
+    offset: int
+    total: int
+    data: bytes
+
+    def to_proto(self) -> message_pb2.Content:
+        return message_pb2.Content(
+            type=OutgoingMessageType.ASSET_CHUNK.value,
+            chunk=message_pb2.AssetChunk(
+                transfer_id=self.transfer_id,
+                asset_id=self.asset_id,
+                offset=self.offset,
+                total=self.total,
+                data=self.data,
+                checksum=f"{zlib.crc32(self.data):08x}",
+            ),
+            status=200,
+        )
+
+
+@dataclass(frozen=True)
+class OutgoingAssetCompleteMessage(IOutgoingMessage):
+    transfer_id: str
+    asset_id: str
+    total: int
+    checksum: str
+
+    def to_proto(self) -> message_pb2.Content:
+        return message_pb2.Content(
+            type=OutgoingMessageType.ASSET_COMPLETE.value,
+            chunk=message_pb2.AssetChunk(
+                transfer_id=self.transfer_id,
+                asset_id=self.asset_id,
+                total=self.total,
+                checksum=self.checksum,
+            ),
+            status=200,
+        )
+
+
+def chunk_content(
+    content: message_pb2.Content, max_frame_size: int
+) -> Iterator[message_pb2.Content]:
+    """Split a message into frames no bigger than `max_frame_size`.
+
+    A message that fits is yielded as is. Otherwise each inline asset is sent as a
+    chunked transfer (header, data chunks, completion marker) and the message itself
+    follows with those assets marked as chunked and their data removed. Every frame
+    keeps the request id of the message.
+    """
+    if content.ByteSize() <= max_frame_size:
+        yield content
+        return
+
+    chunk_size = max(max_frame_size - FRAME_OVERHEAD, 1)
+    envelope = message_pb2.Content()
+    envelope.CopyFrom(content)
+
+    for asset in envelope.assets:
+        if not asset.data:
+            continue
+
+        data = memoryview(asset.data)
+        transfer_id = uuid.uuid4().hex
+        total = len(data)
+        # The content hash is the sha256 of the asset too, when it is set
+        checksum = asset.hash or content_hash(data)
+
+        header = OutgoingAssetHeaderMessage(
+            transfer_id=transfer_id,
+            asset_id=asset.id,
+            filename=asset.filename,
+            total=total,
+            checksum=checksum,
+        ).to_proto()
+        header.request_id = content.request_id
+        yield header
+        for offset in range(0, total, chunk_size):
+            chunk = OutgoingAssetChunkMessage(
+                transfer_id=transfer_id,
+                asset_id=asset.id,
+                offset=offset,
+                total=total,
+                data=bytes(data[offset : offset + chunk_size]),
+            ).to_proto()
+            chunk.request_id = content.request_id
+            yield chunk
+        complete = OutgoingAssetCompleteMessage(
+            transfer_id=transfer_id,
+            asset_id=asset.id,
+            total=total,
+            checksum=checksum,
+        ).to_proto()
+        complete.request_id = content.request_id
+        yield complete
+
+        asset.data = b""
+        asset.chunked = True
+
+    yield envelope
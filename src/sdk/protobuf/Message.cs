@@ -22,19 +22,751 @@ public static partial class MessageReflection {
   static MessageReflection() {
     byte[] descriptorData = global::System.Convert.FromBase64String(
         string.Concat(
-          "Cg1tZXNzYWdlLnByb3RvIlIKB0NvbnRlbnQSDAoEdHlwZRgBIAEoCRIMCgR0",
-          "ZXh0GAIgASgJEgwKBGRhdGEYAyABKAwSDgoGc3RhdHVzGAQgASgFEg0KBWVy",
-          "cm9yGAUgASgJYgZwcm90bzM="));
+          "Cg1tZXNzYWdlLnByb3RvIlcKCk1lZGlhQXNzZXQSCgoCaWQYASABKAkSDAoE",
+          "ZGF0YRgCIAEoDBIQCghmaWxlbmFtZRgDIAEoCRIPCgdjaHVua2VkGAQgASgI",
+          "EgwKBGhhc2gYBSABKAkicgoKQXNzZXRDaHVuaxITCgt0cmFuc2Zlcl9pZBgB",
+          "IAEoCRIQCghhc3NldF9pZBgCIAEoCRIOCgZvZmZzZXQYAyABKAMSDQoFdG90",
+          "YWwYBCABKAMSDAoEZGF0YRgFIAEoDBIQCghjaGVja3N1bRgGIAEoCSKjAQoH",
+          "Q29udGVudBIMCgR0eXBlGAEgASgJEgwKBHRleHQYAiABKAkSGwoGYXNzZXRz",
+          "GAMgAygLMgsuTWVkaWFBc3NldBIOCgZzdGF0dXMYBCABKAUSDQoFZXJyb3IY",
+          "BSABKAkSEAoIbWV0YWRhdGEYBiABKAkSGgoFY2h1bmsYByABKAsyCy5Bc3Nl",
+          "dENodW5rEhIKCnJlcXVlc3RfaWQYCCABKAliBnByb3RvMw=="));
     descriptor = pbr::FileDescriptor.FromGeneratedCode(descriptorData,
         new pbr::FileDescriptor[] { },
         new pbr::GeneratedClrTypeInfo(null, null, new pbr::GeneratedClrTypeInfo[] {
-          new pbr::GeneratedClrTypeInfo(typeof(global::Content), global::Content.Parser, new[]{ "Type", "Text", "Data", "Status", "Error" }, null, null, null, null)
+          new pbr::GeneratedClrTypeInfo(typeof(global::MediaAsset), global::MediaAsset.Parser, new[]{ "Id", "Data", "Filename", "Chunked", "Hash" }, null, null, null, null),
+          new pbr::GeneratedClrTypeInfo(typeof(global::AssetChunk), global::AssetChunk.Parser, new[]{ "TransferId", "AssetId", "Offset", "Total", "Data", "Checksum" }, null, null, null, null),
+          new pbr::GeneratedClrTypeInfo(typeof(global::Content), global::Content.Parser, new[]{ "Type", "Text", "Assets", "Status", "Error", "Metadata", "Chunk", "RequestId" }, null, null, null, null)
         }));
   }
   #endregion
 
 }
 #region Messages
+public sealed partial class MediaAsset : pb::IMessage<MediaAsset>
+#if !GOOGLE_PROTOBUF_REFSTRUCT_COMPATIBILITY_MODE
+    , pb::IBufferMessage
+#endif
+{
+  private static readonly pb::MessageParser<MediaAsset> _parser = new pb::MessageParser<MediaAsset>(() => new MediaAsset());
+  private pb::UnknownFieldSet _unknownFields;
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public static pb::MessageParser<MediaAsset> Parser { get { return _parser; } }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public static pbr::MessageDescriptor Descriptor {
+    get { return global::MessageReflection.Descriptor.MessageTypes[0]; }
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  pbr::MessageDescriptor pb::IMessage.Descriptor {
+    get { return Descriptor; }
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public MediaAsset() {
+    OnConstruction();
+  }
+
+  partial void OnConstruction();
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public MediaAsset(MediaAsset other) : this() {
+    id_ = other.id_;
+    data_ = other.data_;
+    filename_ = other.filename_;
+    chunked_ = other.chunked_;
+    hash_ = other.hash_;
+    _unknownFields = pb::UnknownFieldSet.Clone(other._unknownFields);
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public MediaAsset Clone() {
+    return new MediaAsset(this);
+  }
+
+  /// <summary>Field number for the "id" field.</summary>
+  public const int IdFieldNumber = 1;
+  private string id_ = "";
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public string Id {
+    get { return id_; }
+    set {
+      id_ = pb::ProtoPreconditions.CheckNotNull(value, "value");
+    }
+  }
+
+  /// <summary>Field number for the "data" field.</summary>
+  public const int DataFieldNumber = 2;
+  private pb::ByteString data_ = pb::ByteString.Empty;
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public pb::ByteString Data {
+    get { return data_; }
+    set {
+      data_ = pb::ProtoPreconditions.CheckNotNull(value, "value");
+    }
+  }
+
+  /// <summary>Field number for the "filename" field.</summary>
+  public const int FilenameFieldNumber = 3;
+  private string filename_ = "";
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public string Filename {
+    get { return filename_; }
+    set {
+      filename_ = pb::ProtoPreconditions.CheckNotNull(value, "value");
+    }
+  }
+
+  /// <summary>Field number for the "chunked" field.</summary>
+  public const int ChunkedFieldNumber = 4;
+  private bool chunked_;
+  /// <summary>
+  /// data is delivered through an asset transfer instead of inline
+  /// </summary>
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public bool Chunked {
+    get { return chunked_; }
+    set {
+      chunked_ = value;
+    }
+  }
+
+  /// <summary>Field number for the "hash" field.</summary>
+  public const int HashFieldNumber = 5;
+  private string hash_ = "";
+  /// <summary>
+  /// sha256 of data; sent without data when the client already holds it
+  /// </summary>
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public string Hash {
+    get { return hash_; }
+    set {
+      hash_ = pb::ProtoPreconditions.CheckNotNull(value, "value");
+    }
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public override bool Equals(object other) {
+    return Equals(other as MediaAsset);
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public bool Equals(MediaAsset other) {
+    if (ReferenceEquals(other, null)) {
+      return false;
+    }
+    if (ReferenceEquals(other, this)) {
+      return true;
+    }
+    if (Id != other.Id) return false;
+    if (Data != other.Data) return false;
+    if (Filename != other.Filename) return false;
+    if (Chunked != other.Chunked) return false;
+    if (Hash != other.Hash) return false;
+    return Equals(_unknownFields, other._unknownFields);
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public override int GetHashCode() {
+    int hash = 1;
+    if (Id.Length != 0) hash ^= Id.GetHashCode();
+    if (Data.Length != 0) hash ^= Data.GetHashCode();
+    if (Filename.Length != 0) hash ^= Filename.GetHashCode();
+    if (Chunked != false) hash ^= Chunked.GetHashCode();
+    if (Hash.Length != 0) hash ^= Hash.GetHashCode();
+    if (_unknownFields != null) {
+      hash ^= _unknownFields.GetHashCode();
+    }
+    return hash;
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public override string ToString() {
+    return pb::JsonFormatter.ToDiagnosticString(this);
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public void WriteTo(pb::CodedOutputStream output) {
+  #if !GOOGLE_PROTOBUF_REFSTRUCT_COMPATIBILITY_MODE
+    output.WriteRawMessage(this);
+  #else
+    if (Id.Length != 0) {
+      output.WriteRawTag(10);
+      output.WriteString(Id);
+    }
+    if (Data.Length != 0) {
+      output.WriteRawTag(18);
+      output.WriteBytes(Data);
+    }
+    if (Filename.Length != 0) {
+      output.WriteRawTag(26);
+      output.WriteString(Filename);
+    }
+    if (Chunked != false) {
+      output.WriteRawTag(32);
+      output.WriteBool(Chunked);
+    }
+    if (Hash.Length != 0) {
+      output.WriteRawTag(42);
+      output.WriteString(Hash);
+    }
+    if (_unknownFields != null) {
+      _unknownFields.WriteTo(output);
+    }
+  #endif
+  }
+
+  #if !GOOGLE_PROTOBUF_REFSTRUCT_COMPATIBILITY_MODE
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  void pb::IBufferMessage.InternalWriteTo(ref pb::WriteContext output) {
+    if (Id.Length != 0) {
+      output.WriteRawTag(10);
+      output.WriteString(Id);
+    }
+    if (Data.Length != 0) {
+      output.WriteRawTag(18);
+      output.WriteBytes(Data);
+    }
+    if (Filename.Length != 0) {
+      output.WriteRawTag(26);
+      output.WriteString(Filename);
+    }
+    if (Chunked != false) {
+      output.WriteRawTag(32);
+      output.WriteBool(Chunked);
+    }
+    if (Hash.Length != 0) {
+      output.WriteRawTag(42);
+      output.WriteString(Hash);
+    }
+    if (_unknownFields != null) {
+      _unknownFields.WriteTo(ref output);
+    }
+  }
+  #endif
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public int CalculateSize() {
+    int size = 0;
+    if (Id.Length != 0) {
+      size += 1 + pb::CodedOutputStream.ComputeStringSize(Id);
+    }
+    if (Data.Length != 0) {
+      size += 1 + pb::CodedOutputStream.ComputeBytesSize(Data);
+    }
+    if (Filename.Length != 0) {
+      size += 1 + pb::CodedOutputStream.ComputeStringSize(Filename);
+    }
+    if (Chunked != false) {
+      size += 1 + 1;
+    }
+    if (Hash.Length != 0) {
+      size += 1 + pb::CodedOutputStream.ComputeStringSize(Hash);
+    }
+    if (_unknownFields != null) {
+      size += _unknownFields.CalculateSize();
+    }
+    return size;
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public void MergeFrom(MediaAsset other) {
+    if (other == null) {
+      return;
+    }
+    if (other.Id.Length != 0) {
+      Id = other.Id;
+    }
+    if (other.Data.Length != 0) {
+      Data = other.Data;
+    }
+    if (other.Filename.Length != 0) {
+      Filename = other.Filename;
+    }
+    if (other.Chunked != false) {
+      Chunked = other.Chunked;
+    }
+    if (other.Hash.Length != 0) {
+      Hash = other.Hash;
+    }
+    _unknownFields = pb::UnknownFieldSet.MergeFrom(_unknownFields, other._unknownFields);
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public void MergeFrom(pb::CodedInputStream input) {
+  #if !GOOGLE_PROTOBUF_REFSTRUCT_COMPATIBILITY_MODE
+    input.ReadRawMessage(this);
+  #else
+    uint tag;
+    while ((tag = input.ReadTag()) != 0) {
+      switch(tag) {
+        default:
+          _unknownFields = pb::UnknownFieldSet.MergeFieldFrom(_unknownFields, input);
+          break;
+        case 10: {
+          Id = input.ReadString();
+          break;
+        }
+        case 18: {
+          Data = input.ReadBytes();
+          break;
+        }
+        case 26: {
+          Filename = input.ReadString();
+          break;
+        }
+        case 32: {
+          Chunked = input.ReadBool();
+          break;
+        }
+        case 42: {
+          Hash = input.ReadString();
+          break;
+        }
+      }
+    }
+  #endif
+  }
+
+  #if !GOOGLE_PROTOBUF_REFSTRUCT_COMPATIBILITY_MODE
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  void pb::IBufferMessage.InternalMergeFrom(ref pb::ParseContext input) {
+    uint tag;
+    while ((tag = input.ReadTag()) != 0) {
+      switch(tag) {
+        default:
+          _unknownFields = pb::UnknownFieldSet.MergeFieldFrom(_unknownFields, ref input);
+          break;
+        case 10: {
+          Id = input.ReadString();
+          break;
+        }
+        case 18: {
+          Data = input.ReadBytes();
+          break;
+        }
+        case 26: {
+          Filename = input.ReadString();
+          break;
+        }
+        case 32: {
+          Chunked = input.ReadBool();
+          break;
+        }
+        case 42: {
+          Hash = input.ReadString();
+          break;
+        }
+      }
+    }
+  }
+  #endif
+
+}
+
+/// <summary>
+/// One frame of a chunked asset transfer: a header (type "asset_header"), data chunks
+/// (type "asset_chunk") and a completion marker (type "asset_complete").
+/// </summary>
+public sealed partial class AssetChunk : pb::IMessage<AssetChunk>
+#if !GOOGLE_PROTOBUF_REFSTRUCT_COMPATIBILITY_MODE
+    , pb::IBufferMessage
+#endif
+{
+  private static readonly pb::MessageParser<AssetChunk> _parser = new pb::MessageParser<AssetChunk>(() => new AssetChunk());
+  private pb::UnknownFieldSet _unknownFields;
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public static pb::MessageParser<AssetChunk> Parser { get { return _parser; } }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public static pbr::MessageDescriptor Descriptor {
+    get { return global::MessageReflection.Descriptor.MessageTypes[1]; }
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  pbr::MessageDescriptor pb::IMessage.Descriptor {
+    get { return Descriptor; }
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public AssetChunk() {
+    OnConstruction();
+  }
+
+  partial void OnConstruction();
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public AssetChunk(AssetChunk other) : this() {
+    transferId_ = other.transferId_;
+    assetId_ = other.assetId_;
+    offset_ = other.offset_;
+    total_ = other.total_;
+    data_ = other.data_;
+    checksum_ = other.checksum_;
+    _unknownFields = pb::UnknownFieldSet.Clone(other._unknownFields);
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public AssetChunk Clone() {
+    return new AssetChunk(this);
+  }
+
+  /// <summary>Field number for the "transfer_id" field.</summary>
+  public const int TransferIdFieldNumber = 1;
+  private string transferId_ = "";
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public string TransferId {
+    get { return transferId_; }
+    set {
+      transferId_ = pb::ProtoPreconditions.CheckNotNull(value, "value");
+    }
+  }
+
+  /// <summary>Field number for the "asset_id" field.</summary>
+  public const int AssetIdFieldNumber = 2;
+  private string assetId_ = "";
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public string AssetId {
+    get { return assetId_; }
+    set {
+      assetId_ = pb::ProtoPreconditions.CheckNotNull(value, "value");
+    }
+  }
+
+  /// <summary>Field number for the "offset" field.</summary>
+  public const int OffsetFieldNumber = 3;
+  private long offset_;
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public long Offset {
+    get { return offset_; }
+    set {
+      offset_ = value;
+    }
+  }
+
+  /// <summary>Field number for the "total" field.</summary>
+  public const int TotalFieldNumber = 4;
+  private long total_;
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public long Total {
+    get { return total_; }
+    set {
+      total_ = value;
+    }
+  }
+
+  /// <summary>Field number for the "data" field.</summary>
+  public const int DataFieldNumber = 5;
+  private pb::ByteString data_ = pb::ByteString.Empty;
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public pb::ByteString Data {
+    get { return data_; }
+    set {
+      data_ = pb::ProtoPreconditions.CheckNotNull(value, "value");
+    }
+  }
+
+  /// <summary>Field number for the "checksum" field.</summary>
+  public const int ChecksumFieldNumber = 6;
+  private string checksum_ = "";
+  /// <summary>
+  /// sha256 of the whole asset on header/completion, crc32 of the chunk data otherwise
+  /// </summary>
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public string Checksum {
+    get { return checksum_; }
+    set {
+      checksum_ = pb::ProtoPreconditions.CheckNotNull(value, "value");
+    }
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public override bool Equals(object other) {
+    return Equals(other as AssetChunk);
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public bool Equals(AssetChunk other) {
+    if (ReferenceEquals(other, null)) {
+      return false;
+    }
+    if (ReferenceEquals(other, this)) {
+      return true;
+    }
+    if (TransferId != other.TransferId) return false;
+    if (AssetId != other.AssetId) return false;
+    if (Offset != other.Offset) return false;
+    if (Total != other.Total) return false;
+    if (Data != other.Data) return false;
+    if (Checksum != other.Checksum) return false;
+    return Equals(_unknownFields, other._unknownFields);
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public override int GetHashCode() {
+    int hash = 1;
+    if (TransferId.Length != 0) hash ^= TransferId.GetHashCode();
+    if (AssetId.Length != 0) hash ^= AssetId.GetHashCode();
+    if (Offset != 0L) hash ^= Offset.GetHashCode();
+    if (Total != 0L) hash ^= Total.GetHashCode();
+    if (Data.Length != 0) hash ^= Data.GetHashCode();
+    if (Checksum.Length != 0) hash ^= Checksum.GetHashCode();
+    if (_unknownFields != null) {
+      hash ^= _unknownFields.GetHashCode();
+    }
+    return hash;
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public override string ToString() {
+    return pb::JsonFormatter.ToDiagnosticString(this);
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public void WriteTo(pb::CodedOutputStream output) {
+  #if !GOOGLE_PROTOBUF_REFSTRUCT_COMPATIBILITY_MODE
+    output.WriteRawMessage(this);
+  #else
+    if (TransferId.Length != 0) {
+      output.WriteRawTag(10);
+      output.WriteString(TransferId);
+    }
+    if (AssetId.Length != 0) {
+      output.WriteRawTag(18);
+      output.WriteString(AssetId);
+    }
+    if (Offset != 0L) {
+      output.WriteRawTag(24);
+      output.WriteInt64(Offset);
+    }
+    if (Total != 0L) {
+      output.WriteRawTag(32);
+      output.WriteInt64(Total);
+    }
+    if (Data.Length != 0) {
+      output.WriteRawTag(42);
+      output.WriteBytes(Data);
+    }
+    if (Checksum.Length != 0) {
+      output.WriteRawTag(50);
+      output.WriteString(Checksum);
+    }
+    if (_unknownFields != null) {
+      _unknownFields.WriteTo(output);
+    }
+  #endif
+  }
+
+  #if !GOOGLE_PROTOBUF_REFSTRUCT_COMPATIBILITY_MODE
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  void pb::IBufferMessage.InternalWriteTo(ref pb::WriteContext output) {
+    if (TransferId.Length != 0) {
+      output.WriteRawTag(10);
+      output.WriteString(TransferId);
+    }
+    if (AssetId.Length != 0) {
+      output.WriteRawTag(18);
+      output.WriteString(AssetId);
+    }
+    if (Offset != 0L) {
+      output.WriteRawTag(24);
+      output.WriteInt64(Offset);
+    }
+    if (Total != 0L) {
+      output.WriteRawTag(32);
+      output.WriteInt64(Total);
+    }
+    if (Data.Length != 0) {
+      output.WriteRawTag(42);
+      output.WriteBytes(Data);
+    }
+    if (Checksum.Length != 0) {
+      output.WriteRawTag(50);
+      output.WriteString(Checksum);
+    }
+    if (_unknownFields != null) {
+      _unknownFields.WriteTo(ref output);
+    }
+  }
+  #endif
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public int CalculateSize() {
+    int size = 0;
+    if (TransferId.Length != 0) {
+      size += 1 + pb::CodedOutputStream.ComputeStringSize(TransferId);
+    }
+    if (AssetId.Length != 0) {
+      size += 1 + pb::CodedOutputStream.ComputeStringSize(AssetId);
+    }
+    if (Offset != 0L) {
+      size += 1 + pb::CodedOutputStream.ComputeInt64Size(Offset);
+    }
+    if (Total != 0L) {
+      size += 1 + pb::CodedOutputStream.ComputeInt64Size(Total);
+    }
+    if (Data.Length != 0) {
+      size += 1 + pb::CodedOutputStream.ComputeBytesSize(Data);
+    }
+    if (Checksum.Length != 0) {
+      size += 1 + pb::CodedOutputStream.ComputeStringSize(Checksum);
+    }
+    if (_unknownFields != null) {
+      size += _unknownFields.CalculateSize();
+    }
+    return size;
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public void MergeFrom(AssetChunk other) {
+    if (other == null) {
+      return;
+    }
+    if (other.TransferId.Length != 0) {
+      TransferId = other.TransferId;
+    }
+    if (other.AssetId.Length != 0) {
+      AssetId = other.AssetId;
+    }
+    if (other.Offset != 0L) {
+      Offset = other.Offset;
+    }
+    if (other.Total != 0L) {
+      Total = other.Total;
+    }
+    if (other.Data.Length != 0) {
+      Data = other.Data;
+    }
+    if (other.Checksum.Length != 0) {
+      Checksum = other.Checksum;
+    }
+    _unknownFields = pb::UnknownFieldSet.MergeFrom(_unknownFields, other._unknownFields);
+  }
+
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public void MergeFrom(pb::CodedInputStream input) {
+  #if !GOOGLE_PROTOBUF_REFSTRUCT_COMPATIBILITY_MODE
+    input.ReadRawMessage(this);
+  #else
+    uint tag;
+    while ((tag = input.ReadTag()) != 0) {
+      switch(tag) {
+        default:
+          _unknownFields = pb::UnknownFieldSet.MergeFieldFrom(_unknownFields, input);
+          break;
+        case 10: {
+          TransferId = input.ReadString();
+          break;
+        }
+        case 18: {
+          AssetId = input.ReadString();
+          break;
+        }
+        case 24: {
+          Offset = input.ReadInt64();
+          break;
+        }
+        case 32: {
+          Total = input.ReadInt64();
+          break;
+        }
+        case 42: {
+          Data = input.ReadBytes();
+          break;
+        }
+        case 50: {
+          Checksum = input.ReadString();
+          break;
+        }
+      }
+    }
+  #endif
+  }
+
+  #if !GOOGLE_PROTOBUF_REFSTRUCT_COMPATIBILITY_MODE
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  void pb::IBufferMessage.InternalMergeFrom(ref pb::ParseContext input) {
+    uint tag;
+    while ((tag = input.ReadTag()) != 0) {
+      switch(tag) {
+        default:
+          _unknownFields = pb::UnknownFieldSet.MergeFieldFrom(_unknownFields, ref input);
+          break;
+        case 10: {
+          TransferId = input.ReadString();
+          break;
+        }
+        case 18: {
+          AssetId = input.ReadString();
+          break;
+        }
+        case 24: {
+          Offset = input.ReadInt64();
+          break;
+        }
+        case 32: {
+          Total = input.ReadInt64();
+          break;
+        }
+        case 42: {
+          Data = input.ReadBytes();
+          break;
+        }
+        case 50: {
+          Checksum = input.ReadString();
+          break;
+        }
+      }
+    }
+  }
+  #endif
+
+}
+
 public sealed partial class Content : pb::IMessage<Content>
 #if !GOOGLE_PROTOBUF_REFSTRUCT_COMPATIBILITY_MODE
     , pb::IBufferMessage
@@ -49,7 +781,7 @@ public sealed partial class Content : pb::IMessage<Content>
   [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
   [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
   public static pbr::MessageDescriptor Descriptor {
-    get { return global::MessageReflection.Descriptor.MessageTypes[0]; }
+    get { return global::MessageReflection.Descriptor.MessageTypes[2]; }
   }
 
   [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
@@ -71,9 +803,12 @@ public sealed partial class Content : pb::IMessage<Content>
   public Content(Content other) : this() {
     type_ = other.type_;
     text_ = other.text_;
-    data_ = other.data_;
+    assets_ = other.assets_.Clone();
     status_ = other.status_;
     error_ = other.error_;
+    metadata_ = other.metadata_;
+    chunk_ = other.chunk_ != null ? other.chunk_.Clone() : null;
+    requestId_ = other.requestId_;
     _unknownFields = pb::UnknownFieldSet.Clone(other._unknownFields);
   }
 
@@ -86,9 +821,6 @@ public sealed partial class Content : pb::IMessage<Content>
   /// <summary>Field number for the "type" field.</summary>
   public const int TypeFieldNumber = 1;
   private string type_ = "";
-  /// <summary>
-  /// Declare the type of message
-  /// </summary>
   [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
   [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
   public string Type {
@@ -101,9 +833,6 @@ public sealed partial class Content : pb::IMessage<Content>
   /// <summary>Field number for the "text" field.</summary>
   public const int TextFieldNumber = 2;
   private string text_ = "";
-  /// <summary>
-  /// (optionnal) Contain json or text stuff
-  /// </summary>
   [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
   [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
   public string Text {
@@ -113,27 +842,20 @@ public sealed partial class Content : pb::IMessage<Content>
     }
   }
 
-  /// <summary>Field number for the "data" field.</summary>
-  public const int DataFieldNumber = 3;
-  private pb::ByteString data_ = pb::ByteString.Empty;
-  /// <summary>
-  /// (optionnal) Contain binary data stuff
-  /// </summary>
+  /// <summary>Field number for the "assets" field.</summary>
+  public const int AssetsFieldNumber = 3;
+  private static readonly pb::FieldCodec<global::MediaAsset> _repeated_assets_codec
+      = pb::FieldCodec.ForMessage(26, global::MediaAsset.Parser);
+  private readonly pbc::RepeatedField<global::MediaAsset> assets_ = new pbc::RepeatedField<global::MediaAsset>();
   [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
   [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
-  public pb::ByteString Data {
-    get { return data_; }
-    set {
-      data_ = pb::ProtoPreconditions.CheckNotNull(value, "value");
-    }
+  public pbc::RepeatedField<global::MediaAsset> Assets {
+    get { return assets_; }
   }
 
   /// <summary>Field number for the "status" field.</summary>
   public const int StatusFieldNumber = 4;
   private int status_;
-  /// <summary>
-  /// ex: 200, 404, 500
-  /// </summary>
   [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
   [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
   public int Status {
@@ -146,9 +868,6 @@ public sealed partial class Content : pb::IMessage<Content>
   /// <summary>Field number for the "error" field.</summary>
   public const int ErrorFieldNumber = 5;
   private string error_ = "";
-  /// <summary>
-  /// (optionnal) explain error
-  /// </summary>
   [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
   [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
   public string Error {
@@ -158,6 +877,45 @@ public sealed partial class Content : pb::IMessage<Content>
     }
   }
 
+  /// <summary>Field number for the "metadata" field.</summary>
+  public const int MetadataFieldNumber = 6;
+  private string metadata_ = "";
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public string Metadata {
+    get { return metadata_; }
+    set {
+      metadata_ = pb::ProtoPreconditions.CheckNotNull(value, "value");
+    }
+  }
+
+  /// <summary>Field number for the "chunk" field.</summary>
+  public const int ChunkFieldNumber = 7;
+  private global::AssetChunk chunk_;
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public global::AssetChunk Chunk {
+    get { return chunk_; }
+    set {
+      chunk_ = value;
+    }
+  }
+
+  /// <summary>Field number for the "request_id" field.</summary>
+  public const int RequestIdFieldNumber = 8;
+  private string requestId_ = "";
+  /// <summary>
+  /// set by the client on requests (or by the server), echoed on every message answering them
+  /// </summary>
+  [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
+  [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
+  public string RequestId {
+    get { return requestId_; }
+    set {
+      requestId_ = pb::ProtoPreconditions.CheckNotNull(value, "value");
+    }
+  }
+
   [global::System.Diagnostics.DebuggerNonUserCodeAttribute]
   [global::System.CodeDom.Compiler.GeneratedCode("protoc", null)]
   public override bool Equals(object other) {
@@ -175,9 +933,12 @@ public sealed partial class Content : pb::IMessage<Content>
     }
     if (Type != other.Type) return false;
     if (Text != other.Text) return false;
-    if (Data != other.Data) return false;
+    if(!assets_.Equals(other.assets_)) return false;
     if (Status != other.Status) return false;
     if (Error != other.Error) return false;
+    if (Metadata != other.Metadata) return false;
+    if (!object.Equals(Chunk, other.Chunk)) return false;
+    if (RequestId != other.RequestId) return false;
     return Equals(_unknownFields, other._unknownFields);
   }
 
@@ -187,9 +948,12 @@ public sealed partial class Content : pb::IMessage<Content>
     int hash = 1;
     if (Type.Length != 0) hash ^= Type.GetHashCode();
     if (Text.Length != 0) hash ^= Text.GetHashCode();
-    if (Data.Length != 0) hash ^= Data.GetHashCode();
+    hash ^= assets_.GetHashCode();
     if (Status != 0) hash ^= Status.GetHashCode();
     if (Error.Length != 0) hash ^= Error.GetHashCode();
+    if (Metadata.Length != 0) hash ^= Metadata.GetHashCode();
+    if (chunk_ != null) hash ^= Chunk.GetHashCode();
+    if (RequestId.Length != 0) hash ^= RequestId.GetHashCode();
     if (_unknownFields != null) {
       hash ^= _unknownFields.GetHashCode();
     }
@@ -216,10 +980,7 @@ public sealed partial class Content : pb::IMessage<Content>
       output.WriteRawTag(18);
       output.WriteString(Text);
     }
-    if (Data.Length != 0) {
-      output.WriteRawTag(26);
-      output.WriteBytes(Data);
-    }
+    assets_.WriteTo(output, _repeated_assets_codec);
     if (Status != 0) {
       output.WriteRawTag(32);
       output.WriteInt32(Status);
@@ -228,6 +989,18 @@ public sealed partial class Content : pb::IMessage<Content>
       output.WriteRawTag(42);
       output.WriteString(Error);
     }
+    if (Metadata.Length != 0) {
+      output.WriteRawTag(50);
+      output.WriteString(Metadata);
+    }
+    if (chunk_ != null) {
+      output.WriteRawTag(58);
+      output.WriteMessage(Chunk);
+    }
+    if (RequestId.Length != 0) {
+      output.WriteRawTag(66);
+      output.WriteString(RequestId);
+    }
     if (_unknownFields != null) {
       _unknownFields.WriteTo(output);
     }
@@ -246,10 +1019,7 @@ public sealed partial class Content : pb::IMessage<Content>
       output.WriteRawTag(18);
       output.WriteString(Text);
     }
-    if (Data.Length != 0) {
-      output.WriteRawTag(26);
-      output.WriteBytes(Data);
-    }
+    assets_.WriteTo(ref output, _repeated_assets_codec);
     if (Status != 0) {
       output.WriteRawTag(32);
       output.WriteInt32(Status);
@@ -258,6 +1028,18 @@ public sealed partial class Content : pb::IMessage<Content>
       output.WriteRawTag(42);
       output.WriteString(Error);
     }
+    if (Metadata.Length != 0) {
+      output.WriteRawTag(50);
+      output.WriteString(Metadata);
+    }
+    if (chunk_ != null) {
+      output.WriteRawTag(58);
+      output.WriteMessage(Chunk);
+    }
+    if (RequestId.Length != 0) {
+      output.WriteRawTag(66);
+      output.WriteString(RequestId);
+    }
     if (_unknownFields != null) {
       _unknownFields.WriteTo(ref output);
     }
@@ -274,15 +1056,22 @@ public sealed partial class Content : pb::IMessage<Content>
     if (Text.Length != 0) {
       size += 1 + pb::CodedOutputStream.ComputeStringSize(Text);
     }
-    if (Data.Length != 0) {
-      size += 1 + pb::CodedOutputStream.ComputeBytesSize(Data);
-    }
+    size += assets_.CalculateSize(_repeated_assets_codec);
     if (Status != 0) {
       size += 1 + pb::CodedOutputStream.ComputeInt32Size(Status);
     }
     if (Error.Length != 0) {
       size += 1 + pb::CodedOutputStream.ComputeStringSize(Error);
     }
+    if (Metadata.Length != 0) {
+      size += 1 + pb::CodedOutputStream.ComputeStringSize(Metadata);
+    }
+    if (chunk_ != null) {
+      size += 1 + pb::CodedOutputStream.ComputeMessageSize(Chunk);
+    }
+    if (RequestId.Length != 0) {
+      size += 1 + pb::CodedOutputStream.ComputeStringSize(RequestId);
+    }
     if (_unknownFields != null) {
       size += _unknownFields.CalculateSize();
     }
@@ -301,15 +1090,25 @@ public sealed partial class Content : pb::IMessage<Content>
     if (other.Text.Length != 0) {
       Text = other.Text;
     }
-    if (other.Data.Length != 0) {
-      Data = other.Data;
-    }
+    assets_.Add(other.assets_);
     if (other.Status != 0) {
       Status = other.Status;
     }
     if (other.Error.Length != 0) {
       Error = other.Error;
     }
+    if (other.Metadata.Length != 0) {
+      Metadata = other.Metadata;
+    }
+    if (other.chunk_ != null) {
+      if (chunk_ == null) {
+        Chunk = new global::AssetChunk();
+      }
+      Chunk.MergeFrom(other.Chunk);
+    }
+    if (other.RequestId.Length != 0) {
+      RequestId = other.RequestId;
+    }
     _unknownFields = pb::UnknownFieldSet.MergeFrom(_unknownFields, other._unknownFields);
   }
 
@@ -334,7 +1133,7 @@ public sealed partial class Content : pb::IMessage<Content>
           break;
         }
         case 26: {
-          Data = input.ReadBytes();
+          assets_.AddEntriesFrom(input, _repeated_assets_codec);
           break;
         }
         case 32: {
@@ -345,6 +1144,21 @@ public sealed partial class Content : pb::IMessage<Content>
           Error = input.ReadString();
           break;
         }
+        case 50: {
+          Metadata = input.ReadString();
+          break;
+        }
+        case 58: {
+          if (chunk_ == null) {
+            Chunk = new global::AssetChunk();
+          }
+          input.ReadMessage(Chunk);
+          break;
+        }
+        case 66: {
+          RequestId = input.ReadString();
+          break;
+        }
       }
     }
   #endif
@@ -369,7 +1183,7 @@ public sealed partial class Content : pb::IMessage<Content>
           break;
         }
         case 26: {
-          Data = input.ReadBytes();
+          assets_.AddEntriesFrom(ref input, _repeated_assets_codec);
           break;
         }
         case 32: {
@@ -380,6 +1194,21 @@ public sealed partial class Content : pb::IMessage<Content>
           Error = input.ReadString();
           break;
         }
+        case 50: {
+          Metadata = input.ReadString();
+          break;
+        }
+        case 58: {
+          if (chunk_ == null) {
+            Chunk = new global::AssetChunk();
+          }
+          input.ReadMessage(Chunk);
+          break;
+        }
+        case 66: {
+          RequestId = input.ReadString();
+          break;
+        }
       }
     }
   }
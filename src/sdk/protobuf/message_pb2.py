@@ -13,7 +13,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rmessage.proto\"8\n\nMediaAsset\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\x12\x10\n\x08\x66ilename\x18\x03 \x01(\t\"s\n\x07\x43ontent\x12\x0c\n\x04type\x18\x01 \x01(\t\x12\x0c\n\x04text\x18\x02 \x01(\t\x12\x1b\n\x06\x61ssets\x18\x03 \x03(\x0b\x32\x0b.MediaAsset\x12\x0e\n\x06status\x18\x04 \x01(\x05\x12\r\n\x05\x65rror\x18\x05 \x01(\t\x12\x10\n\x08metadata\x18\x06 \x01(\tb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rmessage.proto\"W\n\nMediaAsset\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\x12\x10\n\x08\x66ilename\x18\x03 \x01(\t\x12\x0f\n\x07\x63hunked\x18\x04 \x01(\x08\x12\x0c\n\x04hash\x18\x05 \x01(\t\"r\n\nAssetChunk\x12\x13\n\x0btransfer_id\x18\x01 \x01(\t\x12\x10\n\x08\x61sset_id\x18\x02 \x01(\t\x12\x0e\n\x06offset\x18\x03 \x01(\x03\x12\r\n\x05total\x18\x04 \x01(\x03\x12\x0c\n\x04\x64\x61ta\x18\x05 \x01(\x0c\x12\x10\n\x08\x63hecksum\x18\x06 \x01(\t\"\xa3\x01\n\x07\x43ontent\x12\x0c\n\x04type\x18\x01 \x01(\t\x12\x0c\n\x04text\x18\x02 \x01(\t\x12\x1b\n\x06\x61ssets\x18\x03 \x03(\x0b\x32\x0b.MediaAsset\x12\x0e\n\x06status\x18\x04 \x01(\x05\x12\r\n\x05\x65rror\x18\x05 \x01(\t\x12\x10\n\x08metadata\x18\x06 \x01(\t\x12\x1a\n\x05\x63hunk\x18\x07 \x01(\x0b\x32\x0b.AssetChunk\x12\x12\n\nrequest_id\x18\x08 \x01(\tb\x06proto3')
 
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'message_pb2', globals())
@@ -21,7 +21,9 @@ if _descriptor._USE_C_DESCRIPTORS == False:
 
   DESCRIPTOR._options = None
   _MEDIAASSET._serialized_start=17
-  _MEDIAASSET._serialized_end=73
-  _CONTENT._serialized_start=75
-  _CONTENT._serialized_end=190
+  _MEDIAASSET._serialized_end=104
+  _ASSETCHUNK._serialized_start=106
+  _ASSETCHUNK._serialized_end=220
+  _CONTENT._serialized_start=223
+  _CONTENT._serialized_end=386
 # @@protoc_insertion_point(module_scope)
@@ -202,6 +202,16 @@ class Scene(BaseModel):
     skybox: Optional[Skybox]
     graph: list[SceneObject]
 
+    def replace_dynamic_ids(self, mapping: dict[str, str]):
+        """Point dynamic components at new asset ids, e.g. once placeholders are generated."""
+        nodes = list(self.graph)
+        while nodes:
+            node = nodes.pop()
+            for component in node.components:
+                if isinstance(component, DynamicObject) and component.id in mapping:
+                    component.id = mapping[component.id]
+            nodes.extend(node.children)
+
 
 class FinalDecompositionOutput(BaseModel):
     scene: Scene
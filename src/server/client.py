@@ -1,14 +1,50 @@
 from agent.api import AgentAPI
 from sdk.protobuf import message_pb2
-from sdk.messages import IOutgoingMessage
-from server.io.queue import Queue
-from lib import logger
+from sdk.messages import (
+    IIncomingMessage,
+    content_hash,
+    IncomingMessageType,
+    IOutgoingMessage,
+    OutgoingErrorMessage,
+    OutgoingSessionConfigMessage,
+    OutgoingTraceMessage,
+)
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from server.data.audio import AudioStream, AudioStreamError, supported_codecs
+from server.io.queue import Queue, QueueRejected
+from lib.metrics import asset_bytes_saved, assets_sent, messages_received
+from server.watchdog import tag_task
+from lib import (
+    CancellationToken,
+    JobLimit,
+    Span,
+    Trace,
+    load_config,
+    logger,
+    span,
+    start_span,
+)
 from beartype import beartype
 from colorama import Fore
 import websockets
 import asyncio
 import uuid
 
+# Id of the request being handled, stamped on the messages sent on its behalf
+current_request_id: ContextVar[str] = ContextVar("current_request_id", default="")
+
+
+@dataclass
+class Request:
+    """A client request in progress."""
+
+    id: str
+    type: str
+    token: CancellationToken
+    task: asyncio.Task | None = None
+
 
 @beartype
 class Client:
@@ -21,7 +57,9 @@ class Client:
 
         self.websocket = websocket  # The WebSocket connection object
         self.agent = agent
-        self.queue = Queue()
+        self.queue = Queue(
+            websocket.remote_address[0] if websocket.remote_address else None
+        )
         self.queue_input = Input(self)
         self.queue_output = Output(self)
 
@@ -29,6 +67,29 @@ class Client:
         self.disconnection = asyncio.Event()
         self.uid = uuid.uuid1()
         self.task_input = None
+        # Requests in progress, handled concurrently; long jobs share `jobs` slots
+        self.requests: dict[str, Request] = {}
+        self.jobs = JobLimit(
+            load_config()
+            .get("server", {})
+            .get("sessions", {})
+            .get("max_concurrent_jobs", 1)
+        )
+        # Content hashes of the assets the client holds: announced, or sent this session
+        self.assets_held: set[str] = set()
+        # Codec of the recordings sent in audio messages, chosen with session_config
+        self.audio_codec = "wav"
+        # Recordings being streamed, by request id, fed as their chunks arrive
+        self.audio_streams: dict[str, AudioStream] = {}
+        # Held by the request using the session's agent memory: the others run on
+        # a copy of it, and leave their exchange to merge back once it is done
+        self.memory = asyncio.Lock()
+        self.memory_merges: list[tuple[str, int]] = []
+        # Latest request traces, and the spans of messages waiting to be sent
+        self.traces: OrderedDict[str, Trace] = OrderedDict()
+        self.max_traces = load_config().get("tracing", {}).get("keep_per_client", 20)
+        self.deliveries: dict[int, Span] = {}
+        self.queue.output.on_drop = self.drop_delivery
 
     def start(self):
         """Start input/output handlers."""
@@ -36,16 +97,37 @@ class Client:
             f"Client {self.get_uid()} - connection from {self.websocket.remote_address}"
         )
         self.task_input = asyncio.create_task(self.loop_input())
+        tag_task(self.task_input, client=self.get_uid(), message="receive")
         self.queue_input.start()
         self.queue_output.start()
 
-    async def send_message(self, message: IOutgoingMessage):
-        """Queue a message to be sent to the client."""
+    async def send_message(
+        self, message: IOutgoingMessage, request_id: str | None = None
+    ):
+        """Queue a message to be sent to the client, tagged with its request id.
+
+        The id defaults to the one of the request being handled, if any.
+        """
         # Queue message
         try:
-            proto_message = message.to_proto()
-            await self.queue.output.put(proto_message)
+            # Covers serialization, time in the output queue and sending, see Output
+            delivery = start_span("deliver", message=type(message).__name__)
+            with span("to_proto"):
+                proto_message = message.to_proto()
+            proto_message.request_id = (
+                current_request_id.get() if request_id is None else request_id
+            )
+            self.reference_held_assets(proto_message)
+            if delivery is not None:
+                self.deliveries[id(proto_message)] = delivery
+            await self.queue.output.push(proto_message)
         # Manage exceptions
+        except QueueRejected as e:
+            self.drop_delivery(proto_message)
+            logger.warning(f"Client {self.get_uid()} - message dropped: {e}")
+            self.queue.output.push_urgent(
+                OutgoingErrorMessage(429, f"Too many pending messages: {e}").to_proto()
+            )
         except asyncio.CancelledError:
             logger.error(
                 f"Task was cancelled while sending message to {Fore.GREEN}{self.websocket.remote_address}{Fore.RESET}, message type: {type}"
@@ -56,6 +138,26 @@ class Client:
                 f"Error queuing message for {Fore.GREEN}{self.websocket.remote_address}{Fore.RESET}: {e}, message type: {type}"
             )
 
+    def reference_held_assets(self, message: message_pb2.Content):
+        """Strip the data of the assets the client holds, leaving their hash only.
+
+        The others are recorded as held from now on. A reference may reach the
+        client before the end of the transfer carrying its data, when both are
+        queued at the same time.
+        """
+        for asset in message.assets:
+            if not asset.data:
+                continue
+            if not asset.hash:
+                asset.hash = content_hash(asset.data)
+            if asset.hash in self.assets_held:
+                asset_bytes_saved.inc(len(asset.data))
+                assets_sent.inc(mode="reference")
+                asset.ClearField("data")
+            else:
+                self.assets_held.add(asset.hash)
+                assets_sent.inc(mode="full")
+
     async def loop_input(self):
         """Queue incoming client messages."""
 
@@ -65,7 +167,23 @@ class Client:
                 async for proto in self.websocket:
                     message = message_pb2.Content()
                     message.ParseFromString(proto)
-                    await self.queue.input.put(message)
+                    messages_received.inc(type=message.type)
+                    if await self.handle_control_message(message):
+                        continue
+                    try:
+                        # Not waiting for room: control messages must still be read
+                        self.queue.input.offer(message)
+                    except QueueRejected as e:
+                        self.audio_streams.pop(message.request_id, None)
+                        logger.warning(
+                            f"Client {self.get_uid()} - message refused: {e}"
+                        )
+                        await self.send_message(
+                            OutgoingErrorMessage(
+                                429, f"Too many pending requests: {e}"
+                            ),
+                            message.request_id,
+                        )
 
             # Manage exceptions
             except asyncio.CancelledError:
@@ -93,6 +211,11 @@ class Client:
             return
         self.is_active = False
 
+        # Stop the generations started for this client
+        self.cancel_requests("client disconnected")
+        for stream in self.audio_streams.values():
+            stream.close()
+
         # Close client tasks
         tasks_to_cancel = [
             t
@@ -100,6 +223,7 @@ class Client:
                 self.task_input,
                 self.queue_input.task_loop,
                 self.queue_output.task_loop,
+                *(request.task for request in self.requests.values()),
             ]
             if t and not t.done()
         ]
@@ -120,7 +244,152 @@ class Client:
         )
 
         # Close client queues
+        logger.info(f"Client {self.get_uid()} - queue usage: {self.queue.stats()}")
         self.queue.clear()
+        self.queue_output.close_streams()
+
+    async def handle_control_message(self, message: message_pb2.Content) -> bool:
+        """Handle on arrival the messages that must not wait for the request in progress."""
+        match message.type:
+            case IncomingMessageType.CANCEL.value:
+                if message.request_id and message.request_id not in self.requests:
+                    await self.send_message(
+                        OutgoingErrorMessage(
+                            404, f"No request '{message.request_id}' in progress"
+                        ),
+                        message.request_id,
+                    )
+                else:
+                    self.cancel_requests("cancelled by client", message.request_id)
+            case IncomingMessageType.TRACE.value:
+                await self.send_trace(message.text)
+            case IncomingMessageType.SESSION_CONFIG.value:
+                await self.configure_session(message)
+            case IncomingMessageType.AUDIO_START.value:
+                # Queued as a request once its stream is ready to take chunks
+                return not await self.handle_audio_stream_message(message)
+            case (
+                IncomingMessageType.AUDIO_CHUNK.value
+                | IncomingMessageType.AUDIO_END.value
+            ):
+                await self.handle_audio_stream_message(message)
+            case _:
+                return False
+        return True
+
+    async def handle_audio_stream_message(self, message: message_pb2.Content) -> bool:
+        """Open, feed or end an audio stream as its messages arrive.
+
+        Returns False if the message is refused. Errors of an open stream (too
+        long, idle) are answered by the request transcribing it.
+        """
+        try:
+            incoming = IIncomingMessage.from_proto(message)
+        except (TypeError, ValueError) as e:
+            incoming, error = None, AudioStreamError(400, f"Invalid audio message: {e}")
+
+        try:
+            if incoming is None:
+                raise error
+            if message.type == IncomingMessageType.AUDIO_START.value:
+                if not message.request_id:
+                    raise AudioStreamError(400, "Audio streams need a request id")
+                if message.request_id in self.audio_streams:
+                    raise AudioStreamError(409, "Audio stream already open")
+                self.audio_streams[message.request_id] = AudioStream.from_config(
+                    load_config(),
+                    incoming.sample_rate,
+                    incoming.channels,
+                    incoming.encoding,
+                )
+                return True
+
+            stream = self.audio_streams.get(message.request_id)
+            if stream is None:
+                raise AudioStreamError(
+                    404, f"No audio stream '{message.request_id}' in progress"
+                )
+            if message.type == IncomingMessageType.AUDIO_END.value:
+                stream.end()
+            else:
+                stream.feed(incoming.data)
+            return True
+        except AudioStreamError as e:
+            logger.warning(f"Client {self.get_uid()} - audio stream refused: {e}")
+            await self.send_message(
+                OutgoingErrorMessage(e.status, str(e)), message.request_id
+            )
+            return False
+
+    async def configure_session(self, message: message_pb2.Content):
+        """Apply the settings the client picked among the ones offered at session start."""
+        try:
+            config = IIncomingMessage.from_proto(message)
+        except (AttributeError, TypeError, ValueError) as e:
+            await self.send_message(
+                OutgoingErrorMessage(400, f"Invalid session config: {e}")
+            )
+            return
+        if config.audio_codec is not None:
+            if config.audio_codec not in supported_codecs():
+                await self.send_message(
+                    OutgoingErrorMessage(
+                        415, f"Unsupported audio codec '{config.audio_codec}'"
+                    )
+                )
+                return
+            self.audio_codec = config.audio_codec
+            logger.info(f"Client {self.get_uid()} - audio codec: {self.audio_codec}")
+        self.assets_held.update(config.asset_hashes)
+
+        await self.send_message(
+            OutgoingSessionConfigMessage(self.audio_codec, len(self.assets_held))
+        )
+
+    def add_trace(self, trace: Trace):
+        self.traces[trace.request_id] = trace
+        while len(self.traces) > self.max_traces:
+            self.traces.popitem(last=False)
+
+    async def send_trace(self, request_id: str):
+        """Send the timing tree of a request, the latest one if no id is given."""
+        if request_id:
+            trace = self.traces.get(request_id)
+        else:
+            trace = next(reversed(self.traces.values()), None)
+
+        if trace is None:
+            await self.send_message(
+                OutgoingErrorMessage(404, f"No trace for request '{request_id}'")
+            )
+            return
+        await self.send_message(
+            OutgoingTraceMessage(trace.request_id, trace.to_dict())
+        )
+
+    def drop_delivery(self, message: message_pb2.Content):
+        """Close the span of a message that will never be sent.
+
+        The assets it carried are not held by the client after all.
+        """
+        for asset in message.assets:
+            if asset.data:
+                self.assets_held.discard(asset.hash)
+        delivery = self.deliveries.pop(id(message), None)
+        if delivery is not None:
+            delivery.finish(dropped=True)
+
+    def cancel_requests(self, reason: str, request_id: str = ""):
+        """Cancel the request `request_id`, or every request still being processed."""
+        requests = [
+            request
+            for request in list(self.requests.values())
+            if not request_id or request.id == request_id
+        ]
+        for request in requests:
+            request.token.cancel(reason)
+        if requests:
+            logger.info(f"Client {self.get_uid()} - {len(requests)} request(s) {reason}")
 
     def get_uid(self):
         return str(self.uid)[:6]
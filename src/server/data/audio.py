@@ -0,0 +1,278 @@
+import asyncio
+import importlib.util
+import io
+import time
+import wave
+
+import numpy as np
+
+from beartype import beartype
+from collections import deque
+from collections.abc import AsyncIterator
+
+
+class AudioStreamError(Exception):
+    """A streamed recording that cannot be accepted, with the status to answer."""
+
+    def __init__(self, status: int, text: str):
+        super().__init__(text)
+        self.status = status
+
+
+# Codecs of whole recordings, by client preference order (OGG holds Opus or Vorbis)
+CODECS = ("opus", "vorbis", "flac", "wav")
+
+
+def supported_codecs() -> list[str]:
+    """Codecs this server decodes; compressed ones need soundfile (libsndfile)."""
+    if importlib.util.find_spec("soundfile") is None:
+        return ["wav"]
+    return list(CODECS)
+
+
+@beartype
+def pcm16_to_float(data: bytes, channels: int = 1) -> np.ndarray:
+    """Little-endian 16 bit PCM to mono float samples in [-1, 1]."""
+    samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+@beartype
+def decode_wav(data: bytes) -> tuple[np.ndarray, int]:
+    """Mono float samples and sample rate of a 16 bit PCM WAV file held in memory."""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise wave.Error(f"Unsupported WAV sample width {wav.getsampwidth()}")
+        frames = wav.readframes(wav.getnframes())
+        return pcm16_to_float(frames, wav.getnchannels()), wav.getframerate()
+
+
+@beartype
+def decode_audio(data: bytes, codec: str) -> tuple[np.ndarray, int]:
+    """Mono float samples and sample rate of a recording held in memory.
+
+    Raises ValueError for audio that is not valid `codec` data.
+    """
+    if codec not in supported_codecs():
+        raise ValueError(f"Unsupported audio codec '{codec}'")
+    if codec == "wav":
+        try:
+            return decode_wav(data)
+        except (wave.Error, EOFError):
+            if "flac" not in supported_codecs():
+                raise ValueError("Only 16 bit PCM WAV files are supported")
+
+    import soundfile
+
+    try:
+        samples, sample_rate = soundfile.read(
+            io.BytesIO(data), dtype="float32", always_2d=True
+        )
+    except (RuntimeError, TypeError) as e:
+        # libsndfile's own errors, for data it cannot decode
+        raise ValueError(f"Cannot decode {codec} audio: {e}")
+    return samples.mean(axis=1), sample_rate
+
+
+@beartype
+class VoiceActivityDetector:
+    """Cut a stream of samples into voice segments, using the energy of short frames.
+
+    A segment starts with the first loud frame (plus `padding_ms` of audio before
+    it) and ends after `silence_ms` of quiet frames, or once it lasts
+    `max_segment_seconds`. Segments with less than `min_speech_ms` of voice are
+    dropped as noise.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_ms: int = 30,
+        threshold_db: int | float = -45,
+        silence_ms: int = 500,
+        min_speech_ms: int = 150,
+        padding_ms: int = 200,
+        max_segment_seconds: int | float = 15,
+    ):
+        self.frame_size = max(sample_rate * frame_ms // 1000, 1)
+        self.threshold_db = threshold_db
+        self.silence_frames = max(silence_ms // frame_ms, 1)
+        self.min_speech_frames = max(min_speech_ms // frame_ms, 1)
+        self.max_segment_frames = max(int(max_segment_seconds * 1000 // frame_ms), 1)
+
+        self._rest = np.zeros(0, dtype=np.float32)  # samples short of a whole frame
+        self._padding: deque[np.ndarray] = deque(maxlen=padding_ms // frame_ms)
+        self._segment: list[np.ndarray] = []
+        self._speech = 0  # loud frames in the current segment
+        self._silence = 0  # quiet frames since the last loud one
+
+    def push(self, samples: np.ndarray) -> list[np.ndarray]:
+        """Add samples, return the segments they complete."""
+        samples = np.concatenate([self._rest, samples])
+        count = len(samples) // self.frame_size
+        self._rest = samples[count * self.frame_size :]
+
+        segments = []
+        for frame in samples[: count * self.frame_size].reshape(-1, self.frame_size):
+            segment = self._push_frame(frame)
+            if segment is not None:
+                segments.append(segment)
+        return segments
+
+    def flush(self) -> list[np.ndarray]:
+        """End of the stream: the segment in progress, if it has enough voice."""
+        if len(self._rest) and self._segment:
+            self._segment.append(self._rest)
+        self._rest = np.zeros(0, dtype=np.float32)
+        segment = self._close()
+        return [segment] if segment is not None else []
+
+    # Subfunctions
+    def _push_frame(self, frame: np.ndarray) -> np.ndarray | None:
+        rms = float(np.sqrt(np.mean(frame**2)))
+        loud = 20 * np.log10(rms + 1e-10) > self.threshold_db
+
+        if not self._segment:
+            if not loud:
+                self._padding.append(frame)
+                return None
+            self._segment = [*self._padding, frame]
+            self._padding.clear()
+            self._speech, self._silence = 1, 0
+            return None
+
+        self._segment.append(frame)
+        if loud:
+            self._speech += 1
+            self._silence = 0
+        else:
+            self._silence += 1
+
+        if self._silence >= self.silence_frames:
+            return self._close()
+        if len(self._segment) >= self.max_segment_frames:
+            # Long speech without a pause: cut it, the next frames start a new segment
+            return self._close()
+        return None
+
+    def _close(self) -> np.ndarray | None:
+        segment, speech = self._segment, self._speech
+        self._segment, self._speech, self._silence = [], 0, 0
+        if speech < self.min_speech_frames:
+            return None
+        return np.concatenate(segment)
+
+
+@beartype
+class AudioStream:
+    """Recording streamed by a client, kept in memory and cut into voice segments.
+
+    Chunks are fed on arrival, while the request handling the stream transcribes
+    the segments already complete.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        encoding: str = "pcm_s16le",
+        max_seconds: int | float = 120,
+        idle_timeout: int | float = 30,
+        vad: dict | None = None,
+    ):
+        if encoding != "pcm_s16le":
+            raise AudioStreamError(415, f"Unsupported audio encoding '{encoding}'")
+        if not 8000 <= sample_rate <= 48000 or not 1 <= channels <= 2:
+            raise AudioStreamError(
+                400, f"Unsupported audio format: {sample_rate} Hz, {channels} channels"
+            )
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.encoding = encoding
+        self.max_samples = int(max_seconds * sample_rate)
+        self.idle_timeout = idle_timeout
+        self.vad = VoiceActivityDetector(sample_rate, **(vad or {}))
+
+        self.bytes = 0
+        self.samples = 0
+        self.ended = False
+        self.error: AudioStreamError | None = None
+        self._partial = b""  # bytes short of a whole sample frame
+        self._last_chunk = time.monotonic()
+        self._segments: asyncio.Queue[np.ndarray | None] = asyncio.Queue()
+
+    @classmethod
+    def from_config(
+        cls, config: dict, sample_rate: int, channels: int, encoding: str
+    ) -> "AudioStream":
+        """Build a stream with the limits of the `server.audio_stream` section."""
+        section = config.get("server", {}).get("audio_stream", {})
+        return cls(
+            sample_rate,
+            channels,
+            encoding,
+            max_seconds=section.get("max_seconds", 120),
+            idle_timeout=section.get("idle_timeout", 30),
+            vad=section.get("vad"),
+        )
+
+    def feed(self, data: bytes):
+        if self.error is not None:
+            return  # Already reported by the request reading the stream
+        if self.ended:
+            raise AudioStreamError(409, "Audio stream already ended")
+        self._last_chunk = time.monotonic()
+        self.bytes += len(data)
+        data = self._partial + data
+        usable = len(data) - len(data) % (2 * self.channels)
+        self._partial = data[usable:]
+
+        samples = pcm16_to_float(data[:usable], self.channels)
+        self.samples += len(samples)
+        if self.samples > self.max_samples:
+            self.close(AudioStreamError(413, "Audio stream too long"))
+            return
+        for segment in self.vad.push(samples):
+            self._segments.put_nowait(segment)
+
+    def end(self):
+        if self.ended:
+            return
+        for segment in self.vad.flush():
+            self._segments.put_nowait(segment)
+        self.close()
+
+    def close(self, error: AudioStreamError | None = None):
+        """Stop the stream, e.g. when its request is cancelled, or on `error`."""
+        if self.ended:
+            return
+        self.ended = True
+        self.error = error
+        self._segments.put_nowait(None)
+
+    async def segments(self) -> AsyncIterator[np.ndarray]:
+        """Voice segments, as soon as each one is complete, until the stream ends.
+
+        The stream times out once no chunk was received for `idle_timeout`
+        seconds, however long the user speaks without a pause.
+        """
+        while True:
+            idle = time.monotonic() - self._last_chunk
+            if not self._segments.empty():
+                segment = self._segments.get_nowait()
+            elif idle >= self.idle_timeout:
+                raise AudioStreamError(408, "Audio stream idle for too long")
+            else:
+                try:
+                    segment = await asyncio.wait_for(
+                        self._segments.get(), self.idle_timeout - idle
+                    )
+                except asyncio.TimeoutError:
+                    continue  # Chunks may have arrived meanwhile
+            if segment is None:
+                if self.error is not None:
+                    raise self.error
+                return
+            yield segment
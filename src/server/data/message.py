@@ -1,9 +1,23 @@
-import os
-from lib import speech_to_text
-from server.client import Client
+from lib import (
+    OperationCancelled,
+    Trace,
+    executors,
+    log_trace,
+    speech_samples_to_text,
+    use_trace,
+)
+from server.data.audio import AudioStreamError, decode_audio
+from server.client import Client, Request
+from lib.metrics import (
+    agent_run_seconds,
+    audio_decode_seconds,
+    audio_duration_seconds,
+    audio_upload_bytes,
+)
 from lib import logger
 from beartype import beartype
 import asyncio
+import time
 import uuid
 import json
 from sdk.protobuf import message_pb2
@@ -20,36 +34,49 @@ class Message:
     def __init__(self, client: Client):
         self.client = client
 
-    async def handle_incoming_message(self, proto_message: message_pb2.Content):
+    async def handle_incoming_message(
+        self, proto_message: message_pb2.Content, request: Request
+    ):
         """Process incoming message according to his type"""
         message = IIncomingMessage.from_proto(proto_message)
 
         match message:
             case IncomingTextMessage():
-                await self.handle_text_message(message.text)
+                await self.handle_text_message(message.text, request)
             case IncomingAudioMessage():
-                await self.handle_audio_message(message.data)
+                await self.handle_audio_message(message.data, request)
+            case IncomingAudioStartMessage():
+                await self.handle_audio_stream(request)
             case IncomingGestureMessage():
                 await self.handle_gesture_message(message.data)
 
-    async def handle_text_message(self, message: str):
+    async def handle_text_message(self, message: str, request: Request):
         """Manage text message"""
+        # Traces are looked up by request id
+        trace = Trace(request.id, on_complete=log_trace, client=self.client.get_uid())
+        self.client.add_trace(trace)
+        start = time.perf_counter()
+        outcome = "error"
         try:
-            output_generator = self.client.agent.aask(message, str(self.client.uid))
-            async for token in output_generator:
-                logger.info(
-                    f"Received token for client {self.client.get_uid()}: {token}"
-                )
-                await self.client.send_message(token)
-
+            with use_trace(trace):
+                await self.run_agent(message, request, trace)
             logger.info(f"Stream completed for client {self.client.get_uid()}")
+            outcome = "ok"
 
         # Manage exceptions
         except asyncio.CancelledError:
             logger.info(
                 f"Stream cancelled for client {self.client.get_uid()} for websocket {self.client.websocket.remote_address}"
             )
+            outcome = "cancelled"
             raise
+        except OperationCancelled as e:
+            outcome = "cancelled"
+            logger.info(f"Stream {e} for client {self.client.get_uid()}")
+            if self.client.is_active:
+                await self.client.send_message(
+                    OutgoingErrorMessage(status=499, text=f"Request {e}")
+                )
         except Exception as e:
             logger.error(f"Error during chat stream: {e}")
             await self.client.send_message(
@@ -58,22 +85,138 @@ class Message:
                     text=f"Error during chat stream in thread {self.client.uid}: {e}",
                 )
             )
+        finally:
+            agent_run_seconds.observe(time.perf_counter() - start, outcome=outcome)
+            trace.root.finish(outcome=outcome)
+
+    async def run_agent(self, message: str, request: Request, trace: Trace):
+        """Stream the agent's responses for one request to the client.
+
+        Requests run concurrently, but an agent memory thread takes one run at a
+        time: a request arriving while another one uses the session's memory runs
+        on a copy of it. Its exchange is appended to the session's memory right
+        away if the memory is free, else by the request using it once it is done:
+        the request ends without waiting for it.
+        """
+        session = str(self.client.uid)
+        conversation = None
+        merge_later = False
+        if self.client.memory.locked():
+            conversation = f"{session}:{request.id}"
+        else:
+            await self.client.memory.acquire()
+
+        try:
+            if conversation is not None:
+                copied = await self.client.agent.fork(session, conversation)
+            output_generator = self.client.agent.aask(
+                message,
+                str(self.client.uid),
+                request.token,
+                trace,
+                self.client.jobs,
+                conversation,
+            )
+            async for token in output_generator:
+                logger.info(
+                    f"Received token for client {self.client.get_uid()}: {token}"
+                )
+                await self.client.send_message(token)
+            # A cancelled or failed exchange is not merged: it may end on tool calls
+            if conversation is not None and self.client.memory.locked():
+                self.client.memory_merges.append((conversation, copied))
+                merge_later = True
+            elif conversation is not None:
+                async with self.client.memory:
+                    await self.client.agent.merge(conversation, session, copied)
+        finally:
+            if conversation is None:
+                await self.merge_pending(session)
+                self.client.memory.release()
+            elif not merge_later:
+                self.client.agent.forget(conversation)
 
-    async def handle_audio_message(self, data):
-        """Manage audio message"""
-        os.makedirs("media/temp_audio", exist_ok=True)
-        temp_audio_filename = f"media/temp_audio/temp_audio_{uuid.uuid4().hex}.wav"
+    async def merge_pending(self, session: str):
+        """Append the exchanges of the requests that ran on a copy of the memory."""
+        while self.client.memory_merges:
+            conversation, copied = self.client.memory_merges.pop(0)
+            try:
+                await self.client.agent.merge(conversation, session, copied)
+            except Exception as e:
+                logger.error(f"Failed to merge conversation {conversation}: {e}")
+            finally:
+                self.client.agent.forget(conversation)
 
-        with open(temp_audio_filename, "wb") as f:
-            f.write(data)
+    async def handle_audio_message(self, data, request: Request):
+        """Manage audio message: a whole recording, in the session's audio codec"""
+        codec = self.client.audio_codec
+        audio_upload_bytes.observe(len(data), codec=codec)
+
+        # Decoding and transcription would hold the event loop, and every client.
+        # Decoding is numpy or libsndfile work: a thread avoids pickling the upload
+        try:
+            with audio_decode_seconds.time(codec=codec):
+                samples, sample_rate = await executors["compute"].run(
+                    decode_audio, data, codec
+                )
+        except ValueError as e:
+            logger.warning(f"Client {self.client.get_uid()} - audio refused: {e}")
+            await self.client.send_message(OutgoingErrorMessage(400, str(e)))
+            return
+        audio_duration_seconds.observe(len(samples) / sample_rate, codec=codec)
 
-        text = speech_to_text(temp_audio_filename)
+        text = await executors["compute"].run(
+            speech_samples_to_text, samples, sample_rate
+        )
         await self.client.send_message(
             OutgoingConvertedSpeechMessage(
                 text=text,
             )
         )
-        await self.handle_text_message(text)
+        await self.handle_text_message(text, request)
+
+    async def handle_audio_stream(self, request: Request):
+        """Transcribe a streamed recording while it is being received.
+
+        Each voice segment is transcribed as soon as the user pauses, and the
+        transcript so far is sent as a partial message. Once the stream ends, only
+        the last segment is left to transcribe before the agent takes the text.
+        """
+        stream = self.client.audio_streams[request.id]
+        loop = asyncio.get_running_loop()
+        request.token.on_cancel(
+            lambda: loop.call_soon_threadsafe(
+                stream.close, AudioStreamError(499, f"Request {request.token.reason}")
+            )
+        )
+
+        texts = []
+        try:
+            async for segment in stream.segments():
+                text = await executors["compute"].run(
+                    speech_samples_to_text, segment, stream.sample_rate
+                )
+                if text.strip():
+                    texts.append(text.strip())
+                    await self.client.send_message(
+                        OutgoingConvertedSpeechMessage(" ".join(texts), partial=True)
+                    )
+        except AudioStreamError as e:
+            logger.warning(f"Client {self.client.get_uid()} - audio stream: {e}")
+            if self.client.is_active:
+                await self.client.send_message(OutgoingErrorMessage(e.status, str(e)))
+            return
+        finally:
+            self.client.audio_streams.pop(request.id, None)
+            audio_upload_bytes.observe(stream.bytes, codec=stream.encoding)
+            audio_duration_seconds.observe(
+                stream.samples / stream.sample_rate, codec=stream.encoding
+            )
+
+        text = " ".join(texts)
+        await self.client.send_message(OutgoingConvertedSpeechMessage(text=text))
+        if text:
+            await self.handle_text_message(text, request)
 
     async def handle_gesture_message(self, message):
         """Manage gesture message"""
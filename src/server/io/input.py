@@ -1,23 +1,37 @@
 from sdk.messages import OutgoingErrorMessage
-from server.client import Client
+from server.client import Client, Request, current_request_id
 from server.data.message import Message
+from server.watchdog import tag_task
 from sdk.protobuf import message_pb2
-from lib import logger
+from lib import CancellationToken, JobLimit, load_config, logger
 from beartype import beartype
 import asyncio
+import uuid
 
 
 @beartype
 class Input:
-    """Manage client queued input messages"""
+    """Manage client queued input messages
+
+    Each request runs in its own task, so a quick question is answered while a
+    generation of the same client is still running. Requests are in one of two
+    lanes: the conversation lane (routing, chat) or, once a generation tool starts,
+    the job lane, whose size is capped by `client.jobs`. A new request is taken from
+    the input queue only when both the conversation lane and the whole session have
+    room, otherwise it waits there.
+    """
 
     def __init__(self, client: Client):
         self.client = client
         self.message = Message(client)
         self.task_loop = None
+        config = load_config().get("server", {}).get("sessions", {})
+        self.max_requests = config.get("max_concurrent_requests", 0)
+        self.max_conversations = config.get("max_concurrent_conversations", 0)
 
     def start(self):
         self.task_loop = asyncio.create_task(self.loop())
+        tag_task(self.task_loop, client=self.client.get_uid(), message="input")
 
     async def loop(self):
         """While client keep being active, handle input messages"""
@@ -27,7 +41,8 @@ class Input:
                 message = (
                     await self.client.queue.input.get()
                 )  # Take the older message of the queue
-                await self.handle_message(message)
+                await self.wait_for_room()
+                await self.start_request(message)
                 self.client.queue.input.task_done()
 
             # Manage exceptions
@@ -42,7 +57,65 @@ class Input:
                 )
                 break
 
-    async def handle_message(self, msg):
+    def has_room(self) -> bool:
+        requests = len(self.client.requests)
+        conversations = requests - self.client.jobs.busy
+        return (not self.max_requests or requests < self.max_requests) and (
+            not self.max_conversations or conversations < self.max_conversations
+        )
+
+    async def wait_for_room(self):
+        """Wait until a request ends or leaves the conversation lane for a job."""
+        while not self.has_room():
+            tasks = [request.task for request in self.client.requests.values()]
+            await asyncio.wait(
+                tasks,
+                timeout=JobLimit.POLL_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+
+    async def start_request(self, message: message_pb2.Content):
+        """Handle a message in a task of its own, under the id chosen by the client."""
+        request_id = message.request_id or uuid.uuid4().hex
+        if request_id in self.client.requests:
+            await self.client.send_message(
+                OutgoingErrorMessage(
+                    409, f"Request '{request_id}' already in progress"
+                ),
+                request_id,
+            )
+            return
+
+        request = Request(request_id, message.type, CancellationToken())
+        self.client.requests[request_id] = request
+        request.task = asyncio.create_task(self.run_request(message, request))
+        tag_task(
+            request.task,
+            client=self.client.get_uid(),
+            message=message.type,
+            request=request_id,
+        )
+
+    async def run_request(self, message: message_pb2.Content, request: Request):
+        current_request_id.set(request.id)
+        try:
+            await self.handle_message(message, request)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Client {self.client.get_uid()} - request error: {e}")
+            await self.client.send_message(
+                OutgoingErrorMessage(
+                    500, f"Internal server error in thread {self.client.get_uid()}"
+                )
+            )
+        finally:
+            self.client.requests.pop(request.id, None)
+
+    async def handle_message(self, msg, request: Request):
         """handle one client input message - send it to async chat"""
-        logger.info(f"Client {self.client.get_uid()} - Received message '{msg.type}'")
-        await self.message.handle_incoming_message(msg)
+        logger.info(
+            f"Client {self.client.get_uid()} - Received message '{msg.type}' "
+            f"(request {request.id})"
+        )
+        await self.message.handle_incoming_message(msg, request)
@@ -1,10 +1,15 @@
 import asyncio
 
 from beartype import beartype
+from collections.abc import Iterator
 
-from lib import logger
+from lib import Span, load_config, logger
 from server.client import Client
-from sdk.messages import OutgoingErrorMessage
+from server.io.queue import FrameStreams
+from sdk.messages import OutgoingErrorMessage, OutgoingMessageType, chunk_content
+from sdk.protobuf import message_pb2
+from lib.metrics import bytes_sent, messages_sent
+from server.watchdog import tag_task
 
 
 @beartype
@@ -15,41 +20,92 @@ class Output:
     def __init__(self, client: Client):
         self.client = client
         self.task_loop = None
+        config = load_config().get("server", {})
+        self.max_frame_size = config.get("max_frame_size", 1024 * 1024)
+        self.max_streams = config.get("max_concurrent_streams", 4)
+        # Messages being sent, interleaved across requests and in order within one.
+        # The rest waits in the bounded output queue.
+        self.streams = FrameStreams()
 
     def start(self):
         self.task_loop = asyncio.create_task(self.loop())
+        tag_task(self.task_loop, client=self.client.get_uid(), message="output")
 
     async def loop(self):
         """While client keep being active, handle output messages"""
         while self.client.is_active:
             # Handle client message
             try:
-                message = (
-                    await self.client.queue.output.get()
-                )  # Take the older message of the queue
-                await self.handle_message(message)
-                self.client.queue.output.task_done()
+                if not self.streams:
+                    self.add_stream(
+                        await self.client.queue.output.get()
+                    )  # Take the older message of the queue
+                while (
+                    len(self.streams) < self.max_streams
+                    and not self.client.queue.output.empty()
+                ):
+                    self.add_stream(self.client.queue.output.get_nowait())
+                await self.send_next_frame()
 
             # Manage exceptions
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Output error: {e}")
-                await self.client.send_error(
+                await self.client.send_message(
                     OutgoingErrorMessage(
                         500, f"Internal server error in thread {self.client.get_uid()}"
                     )
                 )
                 break
 
+    def add_stream(self, message: message_pb2.Content):
+        """Split a queued message into frames and schedule them for sending."""
+        messages_sent.inc(type=message.type)
+        frames = chunk_content(message, self.max_frame_size)
+        delivery = self.client.deliveries.pop(id(message), None)
+        if delivery is not None:
+            frames = self.traced(frames, delivery)
+        self.streams.add(message.request_id, frames)
+        self.client.queue.output.task_done()
+
+    def traced(
+        self, frames: Iterator[message_pb2.Content], delivery: Span
+    ) -> Iterator[message_pb2.Content]:
+        """Finish the delivery span once the last frame has been sent."""
+        count = 0
+        try:
+            for frame in frames:
+                count += 1
+                yield frame
+        finally:
+            delivery.finish(frames=count)
+
+    def close_streams(self):
+        self.streams.close()
+
+    async def send_next_frame(self):
+        """Send one frame of the next request in turn."""
+        frame = self.streams.next_frame()
+        if frame is None:
+            return
+        await self.handle_message(frame)
+
     async def handle_message(self, message):
         """Process the outgoing messages in the client's queue."""
         # Output management
         try:
-            logger.info(
-                f"Server send message to client {self.client.get_uid()} of type {message.type}"
-            )
-            await self.client.websocket.send(message.SerializeToString())
+            if message.type == OutgoingMessageType.ASSET_CHUNK.value:
+                logger.debug(
+                    f"Server send chunk {message.chunk.offset}/{message.chunk.total} of asset {message.chunk.asset_id} to client {self.client.get_uid()}"
+                )
+            else:
+                logger.info(
+                    f"Server send message to client {self.client.get_uid()} of type {message.type}"
+                )
+            data = message.SerializeToString()
+            await self.client.websocket.send(data)
+            bytes_sent.inc(len(data))
 
         # Manage exceptions
         except asyncio.CancelledError:
@@ -1,27 +1,231 @@
 from sdk.protobuf import message_pb2
 from beartype import beartype
+from collections import deque
+from collections.abc import Callable, Iterator
+from enum import Enum
+from lib import load_config
 import asyncio
 
 
+class QueuePolicy(str, Enum):
+    """What to do with a new message when a client queue is full."""
+
+    BLOCK = "block"  # Wait for room (backpressure on the producer)
+    DROP_OLDEST = "drop_oldest"  # Discard the oldest queued messages
+    REJECT = "reject"  # Refuse the new message, the client gets a 429 error
+
+
+class QueueRejected(Exception):
+    """Raised when a message is refused by a full queue with the reject policy."""
+
+
+@beartype
+class FrameStreams:
+    """Messages being sent, as iterators of frames, interleaved per request.
+
+    Requests are served round-robin one frame at a time, so a big asset transfer
+    never holds back the answers to other requests. The messages of one request
+    keep their order: one starts once the previous is fully sent, so a final scene
+    message never reaches the client before the chunks of the assets it uses.
+    """
+
+    def __init__(self):
+        self._lanes: dict[str, deque[Iterator[message_pb2.Content]]] = {}
+        self._order: deque[str] = deque()
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Messages being sent or waiting behind one of their request."""
+        return self._count
+
+    def add(self, request_id: str, frames: Iterator[message_pb2.Content]):
+        if request_id not in self._lanes:
+            self._lanes[request_id] = deque()
+            self._order.append(request_id)
+        self._lanes[request_id].append(frames)
+        self._count += 1
+
+    def next_frame(self) -> message_pb2.Content | None:
+        """Next frame of the next request in turn; None when a message just ended."""
+        if not self._order:
+            return None
+        request_id = self._order.popleft()
+        lane = self._lanes[request_id]
+        frame = next(lane[0], None)
+        if frame is None:
+            lane.popleft()
+            self._count -= 1
+            if not lane:
+                del self._lanes[request_id]
+                return None
+        self._order.append(request_id)
+        return frame
+
+    def close(self):
+        for lane in self._lanes.values():
+            for frames in lane:
+                if hasattr(frames, "close"):
+                    frames.close()
+        self._lanes.clear()
+        self._order.clear()
+        self._count = 0
+
+
+@beartype
+class BoundedQueue(asyncio.Queue):
+    """asyncio.Queue of protobuf messages bounded by item count and by total bytes.
+
+    A queue is full once either bound is reached, so one message bigger than
+    `max_bytes` is still accepted when the queue is empty. 0 means unbounded.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_items: int = 0,
+        max_bytes: int = 0,
+        policy: QueuePolicy = QueuePolicy.BLOCK,
+    ):
+        super().__init__(maxsize=max_items)
+        self.name = name
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.bytes = 0
+        self.high_water_items = 0
+        self.high_water_bytes = 0
+        self.dropped = 0
+        self.rejected = 0
+        self._unbounded = False
+        # Messages offered while the queue was full, moved in as room frees
+        self.backlog: deque[message_pb2.Content] = deque()
+        # Called with each message discarded without being consumed
+        self.on_drop: Callable[[message_pb2.Content], None] | None = None
+
+    def full(self) -> bool:
+        if self._unbounded:
+            return False
+        return super().full() or (0 < self.max_bytes <= self.bytes)
+
+    async def push(self, item: message_pb2.Content):
+        """Queue a message according to the queue policy."""
+        if self.policy == QueuePolicy.BLOCK:
+            await self.put(item)
+        else:
+            self.offer(item)
+
+    def offer(self, item: message_pb2.Content):
+        """Queue a message without waiting, for a reader that must keep reading.
+
+        With the block policy, a message that does not fit waits in the backlog,
+        in order, until room frees; once the backlog holds `max_items` messages
+        too, new ones are refused. The other policies never wait anyway.
+        """
+        match self.policy:
+            case QueuePolicy.BLOCK:
+                if not self.backlog and not self.full():
+                    self.put_nowait(item)
+                elif not self.maxsize or len(self.backlog) < self.maxsize:
+                    self.backlog.append(item)
+                else:
+                    self._reject()
+            case QueuePolicy.DROP_OLDEST:
+                while self.full() and not self.empty():
+                    self.discard(self.get_nowait())
+                    self.task_done()
+                    self.dropped += 1
+                self.put_nowait(item)
+            case QueuePolicy.REJECT:
+                if self.full():
+                    self._reject()
+                self.put_nowait(item)
+
+    def get_nowait(self) -> message_pb2.Content:
+        item = super().get_nowait()
+        while self.backlog and not self.full():
+            self.put_nowait(self.backlog.popleft())
+        return item
+
+    def push_urgent(self, item: message_pb2.Content):
+        """Queue a small control message (e.g. an error) even if the queue is full."""
+        self._unbounded = True
+        try:
+            self.put_nowait(item)
+        finally:
+            self._unbounded = False
+
+    def discard(self, item: message_pb2.Content):
+        if self.on_drop is not None:
+            self.on_drop(item)
+
+    def stats(self) -> dict:
+        return {
+            "items": self.qsize(),
+            "bytes": self.bytes,
+            "backlog": len(self.backlog),
+            "high_water_items": self.high_water_items,
+            "high_water_bytes": self.high_water_bytes,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+        }
+
+    # Subfunctions
+    def _reject(self):
+        self.rejected += 1
+        waiting = f", {len(self.backlog)} waiting" if self.backlog else ""
+        raise QueueRejected(
+            f"{self.name} queue full "
+            f"({self.qsize()} messages, {self.bytes} bytes{waiting})"
+        )
+
+    def _put(self, item):
+        super()._put(item)
+        self.bytes += item.ByteSize()
+        self.high_water_items = max(self.high_water_items, self.qsize())
+        self.high_water_bytes = max(self.high_water_bytes, self.bytes)
+
+    def _get(self):
+        item = super()._get()
+        self.bytes -= item.ByteSize()
+        return item
+
+
 @beartype
 class Queue:
     """Manage client queues creation / deletion"""
 
-    def __init__(self):
-        self.input: asyncio.Queue[message_pb2.Content] = asyncio.Queue()
-        self.output: asyncio.Queue[message_pb2.Content] = asyncio.Queue()
+    def __init__(self, host: str | None = None):
+        config = load_config().get("server", {}).get("queues", {})
+        # Per-client policy by remote host, falling back to the default one
+        self.policy = QueuePolicy(
+            config.get("client_policies", {}).get(host, config.get("policy", "block"))
+        )
+        self.input = BoundedQueue(
+            "input",
+            max_items=config.get("input", {}).get("max_items", 0),
+            max_bytes=config.get("input", {}).get("max_bytes", 0),
+            policy=self.policy,
+        )
+        self.output = BoundedQueue(
+            "output",
+            max_items=config.get("output", {}).get("max_items", 0),
+            max_bytes=config.get("output", {}).get("max_bytes", 0),
+            policy=self.policy,
+        )
+
+    def stats(self) -> dict:
+        return {"input": self.input.stats(), "output": self.output.stats()}
 
     def clear(self):
         """Clear queues without blocking."""
         while not self.input.empty():
             try:
-                self.input.get_nowait()
+                self.input.discard(self.input.get_nowait())
                 self.input.task_done()
             except asyncio.QueueEmpty:
                 break
         while not self.output.empty():
             try:
-                self.output.get_nowait()
+                self.output.discard(self.output.get_nowait())
                 self.output.task_done()
             except asyncio.QueueEmpty:
                 break
@@ -1,9 +1,18 @@
 import sys
 from agent.api import AgentAPI
+from http import HTTPStatus
 from library.api import LibraryAPI
+from model.artifacts import artifacts
+from model.backends import active_models, backend
+from model.llm_cache import llm_cache
+from model.manager import model_manager
+from model.scheduler import gpu_scheduler
 from sdk.messages import OutgoingSessionStartMessage
+from server.data.audio import supported_codecs
 from server.client import Client
-from lib import logger
+from lib.metrics import Sample, llm_cache_requests, metrics
+from server.watchdog import LoopWatchdog, tag_task
+from lib import StageStats, executors, load_config, logger, stage_stats
 from beartype import beartype
 from colorama import Fore, Style
 from server.data.redis import Redis
@@ -11,8 +20,6 @@ import websockets
 import asyncio
 import signal
 
-# TODO: cancel agent task if client disconnects
-
 
 @beartype
 class Server:
@@ -29,6 +36,9 @@ class Server:
         self.agent = None
         self.redis_api = None
         self.library_api = None
+        self.metrics_path = load_config().get("server", {}).get("metrics_path")
+        self.watchdog = LoopWatchdog.from_config(load_config())
+        self.register_metrics()
 
     def start(self):
         # Add stopping event
@@ -56,6 +66,18 @@ class Server:
             logger.critical(f"Failed to initialize AgentAPI at server startup: {e}")
             sys.exit(1)
 
+        # Load heavy models in background so the first request does not pay for it
+        preload = active_models(
+            load_config().get("model_manager", {}).get("preload", [])
+        )
+        if preload:
+            model_manager.preload(preload)
+
+        # Same for the LLMs, held by the LLM server with their keep-alive policy
+        warm = load_config().get("ollama", {}).get("warm", [])
+        if warm:
+            executors["io"].submit(backend("llm").warm, warm)
+
         # Run into async thread
         try:
             loop.run_until_complete(self.run())
@@ -73,12 +95,23 @@ class Server:
 
     async def run(self):
         """Run the WebSocket server."""
+        # Any call blocking the loop delays every client, the watchdog reports them
+        self.watchdog.start()
         try:
             await self.redis_api.connect()
 
             # Start serveur and wait to close
+            max_size = (
+                load_config()
+                .get("server", {})
+                .get("max_incoming_frame_size", 10 * 1024 * 1024)
+            )
             self.server = await websockets.serve(
-                self.handler_client, "0.0.0.0", self.port, max_size=10 * 1024 * 1024
+                self.handler_client,
+                "0.0.0.0",
+                self.port,
+                max_size=max_size,
+                process_request=self.process_request,
             )
             logger.info(
                 f"Server running on {Fore.GREEN}ws://{self.host}:{self.port}{Fore.GREEN}"
@@ -96,6 +129,221 @@ class Server:
             print(str(e))
             logger.error(f"Internal error during server run: {e}")
             self.shutdown_event.set()
+        finally:
+            self.watchdog.stop()
+
+    def process_request(
+        self, connection: websockets.ServerConnection, request: websockets.Request
+    ):
+        """Answer plain HTTP scrapes of the metrics path, let websocket handshakes through."""
+        if not self.metrics_path or request.path.split("?")[0] != self.metrics_path:
+            return None
+
+        response = connection.respond(HTTPStatus.OK, metrics.render())
+        del response.headers["Content-Type"]
+        response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+        return response
+
+    def register_metrics(self):
+        """Expose clients, queues, models, caches, GPU, pools and pipeline stages."""
+
+        def clients() -> list[Sample]:
+            active = [client for client in self.list_client if client.is_active]
+            return [("scener_clients_active", {}, len(active))]
+
+        def queue_stat(name: str, key: str):
+            def collect() -> list[Sample]:
+                return [
+                    (
+                        name,
+                        {"client": client.get_uid(), "queue": name},
+                        stats[key],
+                    )
+                    for client in list(self.list_client)
+                    for name, stats in client.queue.stats().items()
+                ]
+
+            return collect
+
+        def model_stat(name: str, key: str):
+            return lambda: [(name, {}, model_manager.stats()[key])]
+
+        def cache_stat(name: str, key: str):
+            return lambda: [(name, {}, llm_cache().stats()[key])]
+
+        def models_resident() -> list[Sample]:
+            return [
+                (
+                    "scener_model_resident",
+                    {"model": model_id, "location": state["location"]},
+                    1,
+                )
+                for model_id, state in model_manager.stats()["models"].items()
+            ]
+
+        def session_requests() -> list[Sample]:
+            samples = []
+            for client in list(self.list_client):
+                labels = {"client": client.get_uid()}
+                running, waiting = client.jobs.running, client.jobs.waiting
+                conversations = max(len(client.requests) - running - waiting, 0)
+                for lane, count in [
+                    ("conversation", conversations),
+                    ("job", running),
+                    ("job_waiting", waiting),
+                ]:
+                    samples.append(
+                        ("scener_session_requests", {**labels, "lane": lane}, count)
+                    )
+            return samples
+
+        def gpu_jobs() -> list[Sample]:
+            samples = []
+            for device, state in gpu_scheduler.stats()["devices"].items():
+                samples.append(
+                    (
+                        "scener_gpu_jobs",
+                        {"device": device, "state": "running"},
+                        state["running"],
+                    )
+                )
+                for priority, count in state["queued"].items():
+                    samples.append(
+                        (
+                            "scener_gpu_jobs",
+                            {"device": device, "state": f"queued_{priority}"},
+                            count,
+                        )
+                    )
+            return samples
+
+        def executor_stat(name: str, key: str):
+            return lambda: [
+                (name, {"pool": pool}, state[key])
+                for pool, state in executors.stats().items()
+            ]
+
+        def executor_tasks() -> list[Sample]:
+            return [
+                ("scener_executor_tasks", {"pool": pool, "state": key}, state[key])
+                for pool, state in executors.stats().items()
+                for key in ("running", "queued")
+            ]
+
+        def executor_saturation() -> list[Sample]:
+            return [
+                ("scener_executor_saturation", {"pool": pool}, saturation(state))
+                for pool, state in executors.stats().items()
+            ]
+
+        def pipeline_stage_tasks() -> list[Sample]:
+            return [
+                (
+                    "scener_pipeline_stage_tasks",
+                    {"stage": name, "state": key},
+                    state[key],
+                )
+                for name, state in stage_stats.stats().items()
+                for key in StageStats.STATES
+            ]
+
+        def pipeline_stage_stat(name: str, key: str):
+            return lambda: [
+                (name, {"stage": stage}, state[key])
+                for stage, state in stage_stats.stats().items()
+            ]
+
+        def saturation(state: dict) -> float:
+            # Above 1 when tasks are queued behind busy workers
+            return (state["running"] + state["queued"]) / max(state["workers"], 1)
+
+        metrics.collector("scener_clients_active", "Connected clients.", clients)
+        metrics.collector(
+            "scener_session_requests",
+            "Requests in progress per client, by lane.",
+            session_requests,
+        )
+        for key, help in [
+            ("items", "Messages waiting in a client queue."),
+            ("bytes", "Bytes waiting in a client queue."),
+            ("high_water_items", "Most messages ever waiting in a client queue."),
+            ("high_water_bytes", "Most bytes ever waiting in a client queue."),
+            ("backlog", "Messages read while a client queue was full, waiting."),
+        ]:
+            name = f"scener_client_queue_{key}"
+            metrics.collector(name, help, queue_stat(name, key))
+        for key, help in [
+            ("dropped", "Messages dropped by a full client queue."),
+            ("rejected", "Messages refused by a full client queue."),
+        ]:
+            name = f"scener_client_queue_{key}_total"
+            metrics.collector(name, help, queue_stat(name, key), kind="counter")
+        for key, help in [
+            ("loads", "Models loaded from disk."),
+            ("load_errors", "Failed model loads."),
+            ("load_seconds", "Time spent loading models."),
+            ("evictions", "Models dropped from memory."),
+            ("offloads", "Models moved from the device to the host."),
+            ("restores", "Models moved back from the host to the device."),
+        ]:
+            name = f"scener_model_{key}_total"
+            metrics.collector(name, help, model_stat(name, key), kind="counter")
+        metrics.collector(
+            "scener_model_resident", "Models currently in memory.", models_resident
+        )
+        metrics.collector(
+            "scener_gpu_jobs", "GPU scheduler jobs, running or queued.", gpu_jobs
+        )
+        metrics.collector(
+            "scener_executor_workers",
+            "Workers of each executor pool.",
+            executor_stat("scener_executor_workers", "workers"),
+        )
+        metrics.collector(
+            "scener_executor_tasks",
+            "Executor pool tasks, running or queued.",
+            executor_tasks,
+        )
+        metrics.collector(
+            "scener_executor_saturation",
+            "Tasks in an executor pool per worker.",
+            executor_saturation,
+        )
+        for key, help in [
+            ("completed", "Executor pool tasks finished."),
+            ("failed", "Executor pool tasks that raised or were cancelled."),
+            ("wait_seconds", "Time executor pool tasks spent queued."),
+            ("busy_seconds", "Time executor pool workers spent running tasks."),
+        ]:
+            name = f"scener_executor_{key}_total"
+            metrics.collector(name, help, executor_stat(name, key), kind="counter")
+        metrics.collector(
+            "scener_artifact_writes_pending",
+            "Generated files handed over in memory and not written to disk yet.",
+            lambda: [("scener_artifact_writes_pending", {}, artifacts.pending())],
+        )
+        metrics.collector(
+            "scener_pipeline_stage_tasks",
+            "Generation pipeline steps by stage: running, waiting for a slot, or "
+            "done with their output waiting for the next stage.",
+            pipeline_stage_tasks,
+        )
+        for key, help in [
+            ("completed", "Generation pipeline steps finished, by stage."),
+            ("busy_seconds", "Time spent running generation pipeline steps, by stage."),
+        ]:
+            name = f"scener_pipeline_stage_{key}_total"
+            collect = pipeline_stage_stat(name, key)
+            metrics.collector(name, help, collect, kind="counter")
+        for key, help in [
+            ("entries", "Completions held by the LLM response cache."),
+            ("bytes", "Size of the completions held by the LLM response cache."),
+        ]:
+            name = f"scener_llm_cache_{key}"
+            metrics.collector(name, help, cache_stat(name, key))
+        llm_cache().on_lookup = lambda stage, hit: llm_cache_requests.inc(
+            stage=stage, result="hit" if hit else "miss"
+        )
 
     async def handler_client(self, websocket: websockets.ServerConnection):
         """Handle an incoming WebSocket client connection."""
@@ -103,11 +351,17 @@ class Server:
         from server.client import Client
 
         client = None
+        tag_task(asyncio.current_task(), message="session_start")
         try:
             # Create client and run it
             client = Client(websocket, self.agent)
+            tag_task(asyncio.current_task(), client=client.get_uid())
             client.start()
-            await client.send_message(OutgoingSessionStartMessage(str(client.uid)))
+            await client.send_message(
+                OutgoingSessionStartMessage(
+                    str(client.uid), audio_codecs=tuple(supported_codecs())
+                )
+            )
 
             self.list_client.append(client)
 
@@ -158,6 +412,9 @@ class Server:
         self.list_client.clear()
 
         logger.info("All client connections processed for shutdown.")
+        # Shutting the pools down cancels queued tasks: write generated files first
+        await executors["compute"].run(artifacts.flush)
+        executors.shutdown(wait=False)
         print("---------------------------------------------")
         logger.success(f"Server shutdown sequence completed.{Style.RESET_ALL}")
 
@@ -0,0 +1,376 @@
+"""Websocket load generator for the server.
+
+Opens many concurrent sessions, each playing a scripted mix of text, audio and scene
+modification requests over the `message_pb2.Content` protocol, and reports throughput
+plus p50/p95/p99 latencies of session start, first response byte and full asset
+delivery. Results are saved as JSON so runs can be compared.
+
+Run the server with the fake backends (`"backends"` in config.json) to benchmark the
+websocket -> agent -> tool -> response path without GPU, then:
+
+    python -m server.test.load --sessions 200 --requests 5 --output results.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import random
+import time
+import wave
+
+from beartype import beartype
+from collections import Counter
+from dataclasses import dataclass, field
+from websockets.asyncio.client import connect
+from websockets.exceptions import WebSocketException
+
+from lib import logger
+from model.backends import BACKENDS, backend_name
+from sdk.messages import IncomingMessageType, OutgoingMessageType
+from sdk.protobuf import message_pb2
+
+# Messages closing a request; asset transfers still running are waited for
+FINAL_TYPES = {
+    OutgoingMessageType.UNRELATED_RESPONSE.value,
+    OutgoingMessageType.GENERATE_IMAGE.value,
+    OutgoingMessageType.GENERATE_3D_OBJECT.value,
+    OutgoingMessageType.GENERATE_3D_SCENE.value,
+    OutgoingMessageType.MODIFY_3D_SCENE.value,
+    OutgoingMessageType.ERROR.value,
+}
+
+TEXT_PROMPTS = [
+    "Generate a 3D scene of a cozy living room with a couch and a sleeping cat",
+    "Generate a 3D scene of a kitchen with a round table and two chairs",
+    "Create a 3D model of a wooden chair",
+    "Create a 3D model of a red vintage car",
+    "Generate an image of a sunset over the sea",
+    "Hello, what can you do?",
+]
+MODIFICATION_PROMPTS = [
+    "Add a lamp on the table",
+    "Add a plant next to the couch",
+    "Remove the cat",
+    "Move the chair to the corner",
+]
+
+DEFAULT_MIX = "text=6,audio=2,modification=2"
+
+
+@dataclass
+class RequestResult:
+    kind: str
+    status: int = 200
+    final_type: str | None = None
+    first_byte: float | None = None  # Seconds from sending to the first frame
+    delivery: float | None = None  # Seconds from sending to the last frame
+    bytes: int = 0
+    frames: int = 0
+    assets: int = 0
+    timed_out: bool = False
+
+
+@dataclass
+class Recorder:
+    """Everything measured during a run."""
+
+    session_starts: list[float] = field(default_factory=list)
+    session_errors: Counter = field(default_factory=Counter)
+    requests: list[RequestResult] = field(default_factory=list)
+
+
+@beartype
+def percentile(values: list[float], q: int | float) -> float | None:
+    """Linearly interpolated percentile, `q` in [0, 100]."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+@beartype
+def latency_summary(values: list[float]) -> dict:
+    """Count, mean, max and percentiles of latencies in seconds, reported in ms."""
+
+    def ms(value: float | None) -> float | None:
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "count": len(values),
+        "mean": ms(sum(values) / len(values)) if values else None,
+        "p50": ms(percentile(values, 50)),
+        "p95": ms(percentile(values, 95)),
+        "p99": ms(percentile(values, 99)),
+        "max": ms(max(values)) if values else None,
+    }
+
+
+@beartype
+def parse_mix(mix: str) -> dict[str, float]:
+    """Parse "text=6,audio=2,modification=2" into request kind weights."""
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in ("text", "audio", "modification"):
+            raise ValueError(f"Unknown request kind '{kind}' in mix '{mix}'")
+        weights[kind] = float(weight or 1)
+    if not any(weights.values()):
+        raise ValueError(f"Mix '{mix}' has no request with a positive weight")
+    return weights
+
+
+@beartype
+def synthetic_wav(rng: random.Random, seconds: int | float) -> bytes:
+    """16 kHz mono tone, different for each draw so fake transcripts vary too."""
+    rate = 16000
+    frequency = rng.uniform(200, 800)
+    samples = bytearray()
+    for index in range(int(rate * seconds)):
+        value = int(8000 * math.sin(2 * math.pi * frequency * index / rate))
+        samples += value.to_bytes(2, "little", signed=True)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(bytes(samples))
+    return buffer.getvalue()
+
+
+@beartype
+def build_request(
+    kind: str, rng: random.Random, has_scene: bool, audio_seconds: int | float
+) -> tuple[str, message_pb2.Content]:
+    """Next scripted request; modifications need a scene, the first one makes it."""
+    if kind == "modification" and not has_scene:
+        kind, text = "text", TEXT_PROMPTS[rng.randrange(2)]
+    elif kind == "modification":
+        text = rng.choice(MODIFICATION_PROMPTS)
+    elif kind == "text":
+        text = rng.choice(TEXT_PROMPTS)
+
+    if kind == "audio":
+        return kind, message_pb2.Content(
+            type=IncomingMessageType.AUDIO.value,
+            assets=[
+                message_pb2.MediaAsset(
+                    id=f"audio_{rng.getrandbits(32):08x}",
+                    filename="audio.wav",
+                    data=synthetic_wav(rng, audio_seconds),
+                )
+            ],
+            status=200,
+        )
+    return kind, message_pb2.Content(
+        type=IncomingMessageType.TEXT.value, text=text, status=200
+    )
+
+
+async def run_request(
+    websocket, kind: str, request: message_pb2.Content, timeout: int | float
+) -> RequestResult:
+    """Send one request and read frames until its final message and assets arrived."""
+    result = RequestResult(kind=kind)
+    transfers = set()
+    final = False
+
+    sent = time.perf_counter()
+    await websocket.send(request.SerializeToString())
+    try:
+        while not final or transfers:
+            remaining = sent + timeout - time.perf_counter()
+            data = await asyncio.wait_for(websocket.recv(), max(remaining, 0))
+            elapsed = time.perf_counter() - sent
+            if result.first_byte is None:
+                result.first_byte = elapsed
+            result.bytes += len(data)
+            result.frames += 1
+
+            frame = message_pb2.Content()
+            frame.ParseFromString(data)
+            match frame.type:
+                case OutgoingMessageType.ASSET_HEADER.value:
+                    transfers.add(frame.chunk.transfer_id)
+                case OutgoingMessageType.ASSET_COMPLETE.value:
+                    transfers.discard(frame.chunk.transfer_id)
+                    result.assets += 1
+                case _:
+                    result.assets += sum(1 for asset in frame.assets if asset.data)
+            if frame.type in FINAL_TYPES:
+                final = True
+                result.final_type = frame.type
+                result.status = frame.status or 200
+            result.delivery = elapsed
+    except asyncio.TimeoutError:
+        result.timed_out = True
+    return result
+
+
+async def run_session(index: int, options: argparse.Namespace, recorder: Recorder):
+    """One client: connect, wait for the session start, then play its script."""
+    rng = random.Random(f"{options.seed}:{index}")
+    mix = parse_mix(options.mix)
+    await asyncio.sleep(options.ramp * index / options.sessions)
+
+    start = time.perf_counter()
+    try:
+        async with connect(
+            options.url, max_size=None, open_timeout=options.timeout
+        ) as websocket:
+            session = message_pb2.Content()
+            session.ParseFromString(
+                await asyncio.wait_for(websocket.recv(), options.timeout)
+            )
+            if session.type != OutgoingMessageType.SESSION_START.value:
+                recorder.session_errors[f"unexpected {session.type}"] += 1
+                return
+            recorder.session_starts.append(time.perf_counter() - start)
+
+            has_scene = False
+            for _ in range(options.requests):
+                kind = rng.choices(list(mix), weights=list(mix.values()))[0]
+                kind, request = build_request(
+                    kind, rng, has_scene, options.audio_seconds
+                )
+                result = await run_request(websocket, kind, request, options.timeout)
+                recorder.requests.append(result)
+                if result.timed_out:
+                    # Late frames would be taken for the next request's
+                    break
+                has_scene = has_scene or (
+                    result.final_type == OutgoingMessageType.GENERATE_3D_SCENE.value
+                )
+                await asyncio.sleep(rng.uniform(0, 2 * options.think_time))
+    except (OSError, WebSocketException, asyncio.TimeoutError) as e:
+        recorder.session_errors[type(e).__name__] += 1
+
+
+@beartype
+def summarize(recorder: Recorder, duration: float, options: dict) -> dict:
+    """JSON-serializable results of a run."""
+    requests = recorder.requests
+    completed = [r for r in requests if not r.timed_out and r.status == 200]
+    by_kind = {}
+    for kind in sorted({r.kind for r in requests}):
+        completed_of_kind = [r for r in completed if r.kind == kind]
+        by_kind[kind] = {
+            "requests": sum(1 for r in requests if r.kind == kind),
+            "completed": len(completed_of_kind),
+            "full_delivery_ms": latency_summary(
+                [r.delivery for r in completed_of_kind]
+            ),
+        }
+
+    return {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "options": options,
+        "duration_s": round(duration, 3),
+        "sessions": {
+            "requested": options["sessions"],
+            "started": len(recorder.session_starts),
+            "errors": dict(recorder.session_errors),
+        },
+        "requests": {
+            "sent": len(requests),
+            "completed": len(completed),
+            "timed_out": sum(1 for r in requests if r.timed_out),
+            "errors": dict(
+                Counter(str(r.status) for r in requests if r.status != 200)
+            ),
+            "by_kind": by_kind,
+        },
+        "throughput": {
+            "requests_per_s": round(len(completed) / duration, 3),
+            "bytes_per_s": round(sum(r.bytes for r in requests) / duration, 1),
+            "frames_per_s": round(sum(r.frames for r in requests) / duration, 1),
+            "assets": sum(r.assets for r in requests),
+        },
+        "latency_ms": {
+            "session_start": latency_summary(recorder.session_starts),
+            "first_byte": latency_summary(
+                [r.first_byte for r in requests if r.first_byte is not None]
+            ),
+            "full_delivery": latency_summary([r.delivery for r in completed]),
+        },
+    }
+
+
+@beartype
+def compare(baseline: dict, results: dict) -> list[str]:
+    """One line per latency and percentile, with the change from `baseline`."""
+    lines = []
+    for name, summary in results["latency_ms"].items():
+        for key in ("p50", "p95", "p99"):
+            old = baseline.get("latency_ms", {}).get(name, {}).get(key)
+            new = summary[key]
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            lines.append(f"{name} {key}: {old:.1f} -> {new:.1f} ms ({change:+.1f}%)")
+    return lines
+
+
+async def run(options: argparse.Namespace) -> dict:
+    recorder = Recorder()
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(run_session(index, options, recorder) for index in range(options.sessions))
+    )
+    return summarize(recorder, time.perf_counter() - start, vars(options))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="ws://localhost:8765")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5, help="Per session.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Request kind weights.")
+    parser.add_argument(
+        "--ramp", type=float, default=10.0, help="Seconds to open all sessions."
+    )
+    parser.add_argument(
+        "--think-time", type=float, default=1.0, help="Mean pause between requests."
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=600.0, help="Per request, in seconds."
+    )
+    parser.add_argument("--audio-seconds", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_results.json")
+    parser.add_argument("--baseline", help="Results of a previous run to compare with.")
+    options = parser.parse_args()
+    parse_mix(options.mix)
+
+    if any(backend_name(kind) != "fake" for kind in BACKENDS):
+        logger.warning(
+            "config.json does not select the fake backends, the server may need a GPU"
+        )
+
+    results = asyncio.run(run(options))
+    with open(options.output, "w") as f:
+        json.dump(results, f, indent=4)
+
+    logger.info(f"Results saved to {options.output}")
+    logger.info(
+        f"{results['requests']['completed']}/{results['requests']['sent']} requests "
+        f"in {results['duration_s']}s, {results['throughput']['requests_per_s']} req/s"
+    )
+    for name, summary in results["latency_ms"].items():
+        logger.info(
+            f"{name}: p50 {summary['p50']} ms, p95 {summary['p95']} ms, "
+            f"p99 {summary['p99']} ms ({summary['count']} samples)"
+        )
+    if options.baseline:
+        with open(options.baseline) as f:
+            for line in compare(json.load(f), results):
+                logger.info(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+from beartype import beartype
+from dataclasses import dataclass
+
+from lib import logger
+from lib.metrics import (
+    event_loop_lag,
+    event_loop_stall_seconds,
+    event_loop_stalls,
+)
+
+# What each task of the loop is handling, read by the watchdog thread on a stall
+task_tags: weakref.WeakKeyDictionary[asyncio.Task, dict[str, str]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def tag_task(task: asyncio.Task | None, **tags: str):
+    """Name what `task` handles (client, message...), for the stalls it causes."""
+    if task is not None:
+        task_tags[task] = {**task_tags.get(task, {}), **tags}
+
+
+@dataclass
+class Stall:
+    """The event loop blocked by one call, as seen from the watchdog thread."""
+
+    tags: dict[str, str]
+    stack: str
+
+
+@beartype
+class LoopWatchdog:
+    """Measure the event loop lag, and catch the calls that block it.
+
+    A heartbeat task sleeps `interval` seconds at a time and records how late it
+    wakes up. A side thread checks that the heartbeat keeps beating: when it is
+    more than `threshold` seconds late, the loop thread's stack is captured while
+    the blocking call is still running, along with the tags of the task it runs.
+    """
+
+    def __init__(
+        self,
+        interval: int | float = 0.1,
+        threshold: int | float = 0.25,
+        max_stack_frames: int = 40,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_stack_frames = max_stack_frames
+
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.loop_thread: int | None = None
+        self.last_beat = time.monotonic()
+        self.stall: Stall | None = None
+        self.task_heartbeat = None
+        self.thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "LoopWatchdog":
+        """Build a watchdog from the `server.watchdog` section of config.json."""
+        section = config.get("server", {}).get("watchdog", {})
+        return cls(
+            interval=section.get("interval", 0.1),
+            threshold=section.get("threshold", 0.25),
+            max_stack_frames=section.get("max_stack_frames", 40),
+        )
+
+    def start(self):
+        """Watch the running loop, from the loop thread."""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._stop.clear()
+        self.task_heartbeat = asyncio.create_task(self.heartbeat())
+        self.thread = threading.Thread(
+            target=self.watch, name="loop-watchdog", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.task_heartbeat is not None:
+            self.task_heartbeat.cancel()
+
+    async def heartbeat(self):
+        """Record how late the loop wakes this task up."""
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - expected, 0.0)
+            with self._lock:
+                self.last_beat = now
+                stall, self.stall = self.stall, None
+            event_loop_lag.observe(lag)
+            if stall is not None:
+                self.report(stall, lag)
+
+    def watch(self):
+        """Capture the loop thread's stack once per stall, from the side thread."""
+        while not self._stop.wait(self.threshold / 2):
+            with self._lock:
+                late = time.monotonic() - self.last_beat - self.interval
+                if late <= self.threshold or self.stall is not None:
+                    continue
+                stall = self.stall = self.capture()
+            logger.warning(
+                f"Event loop blocked for {late * 1000:.0f} ms so far "
+                f"({self.describe(stall.tags)}), in:\n{stall.stack}"
+            )
+
+    def capture(self) -> Stall:
+        """Stack of the loop thread and tags of the task it is running."""
+        frame = sys._current_frames().get(self.loop_thread)
+        stack = traceback.format_stack(frame, limit=-self.max_stack_frames)
+        task = asyncio.current_task(self.loop)
+        tags = task_tags.get(task, {}) if task is not None else {}
+        if not tags and task is not None:
+            tags = {"task": task.get_name()}
+        return Stall(tags=tags, stack="".join(stack))
+
+    def report(self, stall: Stall, lag: float):
+        """Count a stall that has ended, under the client and message it delayed."""
+        labels = {
+            "client": stall.tags.get("client", ""),
+            "message": stall.tags.get("message", ""),
+        }
+        event_loop_stalls.inc(**labels)
+        event_loop_stall_seconds.observe(lag, message=labels["message"])
+        logger.warning(
+            f"Event loop was blocked for {lag * 1000:.0f} ms "
+            f"({self.describe(stall.tags)})"
+        )
+
+    @staticmethod
+    def describe(tags: dict[str, str]) -> str:
+        return ", ".join(f"{key} {value}" for key, value in tags.items()) or "untagged"
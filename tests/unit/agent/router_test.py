@@ -0,0 +1,85 @@
+import re
+
+from agent.router import CHAT, IntentRouter
+from lib.metrics import router_decisions
+
+EXAMPLES = {
+    "generate_image": ["draw a picture of a cat", "paint an image of the sea"],
+    "generate_3d_object": ["3d model of a sword", "3d model of a chair"],
+    "generate_3d_scene": ["3d scene of a forest", "3d scene of a living room"],
+    "clear_database": ["clear the asset database"],
+    CHAT: ["hello", "who are you"],
+}
+
+
+############ MOCK stuff ############
+
+
+# Bag of words over a small vocabulary: texts sharing words are close
+class WordEmbeddings:
+    def __init__(self):
+        texts = [text for texts in EXAMPLES.values() for text in texts]
+        self.vocabulary = sorted(
+            {word for text in texts for word in re.findall(r"\w+", text)}
+        )
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        words = re.findall(r"\w+", text.lower())
+        return [float(words.count(word)) for word in self.vocabulary]
+
+
+def decisions(intent, route):
+    return sum(
+        value
+        for _, labels, value in router_decisions.samples()
+        if labels == {"intent": intent, "route": route}
+    )
+
+
+############ test stuff ############
+class TestIntentRouter:
+    def test_clear_request_goes_to_its_tool(self):
+        router = IntentRouter(WordEmbeddings(), EXAMPLES, threshold=0.5, margin=0.1)
+        before = decisions("generate_3d_scene", "tool")
+
+        route = router.route("a 3d scene of a forest with a river")
+
+        assert route.intent == "generate_3d_scene" and route.direct
+        assert route.confidence >= 0.5 and route.margin >= 0.1
+        assert decisions("generate_3d_scene", "tool") == before + 1
+
+    def test_ambiguous_request_goes_to_the_agent(self):
+        router = IntentRouter(WordEmbeddings(), EXAMPLES, threshold=0.5, margin=0.1)
+
+        # As close to a 3D object as to a 3D scene
+        route = router.route("3d model scene")
+        assert not route.direct and route.margin < 0.1
+
+        # Nothing alike
+        assert not router.route("what time is it").direct
+
+    def test_chat_and_database_stay_with_the_agent(self):
+        router = IntentRouter(WordEmbeddings(), EXAMPLES, threshold=0.5, margin=0.1)
+
+        assert router.route("hello").intent == CHAT
+        route = router.route("clear the asset database")
+        assert route.intent == "clear_database" and route.confidence > 0.99
+        assert not route.direct
+
+    def test_config_adds_examples(self):
+        config = {
+            "agent": {
+                "router": {
+                    "threshold": 0.9,
+                    "examples": {"generate_image": ["sketch a cat"]},
+                }
+            }
+        }
+        router = IntentRouter.from_config(config, WordEmbeddings())
+
+        assert router.threshold == 0.9
+        assert router.intents.count("generate_image") > 1
+        assert "chat" in router.intents
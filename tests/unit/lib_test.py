@@ -0,0 +1,337 @@
+import asyncio
+import pytest
+import threading
+import time
+
+from lib import (
+    CancellationToken,
+    Executors,
+    JobLimit,
+    ManagedExecutor,
+    OperationCancelled,
+    TaskGraph,
+    ToolResults,
+    Trace,
+    job_lane,
+    session_id,
+    span,
+    stage_stats,
+    start_span,
+    tool_result,
+    use_trace,
+)
+from pydantic import BaseModel
+from unittest.mock import patch
+
+
+############ MOCK stuff ############
+
+
+# Heavy structured output of a tool
+class SceneOutput(BaseModel):
+    text: str
+    graph: list[dict]
+
+
+############ test stuff ############
+class TestTrace:
+    def test_spans_nest_under_the_current_one(self):
+        trace = Trace("request")
+        with use_trace(trace):
+            with span("tool"):
+                with span("stage", step=1):
+                    pass
+            with span("other"):
+                pass
+        trace.root.finish()
+
+        tree = trace.to_dict()
+        assert tree["request_id"] == "request"
+        assert [child["name"] for child in tree["children"]] == ["tool", "other"]
+        stage = tree["children"][0]["children"][0]
+        assert stage["name"] == "stage"
+        assert stage["attributes"] == {"step": 1}
+        assert not stage["running"]
+
+    def test_span_outside_a_trace_does_nothing(self):
+        with span("orphan") as orphan:
+            assert orphan is None
+
+    def test_failed_span_records_the_error(self):
+        trace = Trace("request")
+        try:
+            with use_trace(trace), span("failing"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+
+        assert trace.to_dict()["children"][0]["attributes"] == {"error": "ValueError"}
+
+    def test_completes_after_outliving_spans(self):
+        completed = []
+        trace = Trace("request", on_complete=completed.append)
+        with use_trace(trace):
+            delivery = start_span("deliver")
+        trace.root.finish()
+        assert not completed
+
+        delivery.finish(frames=3)
+        assert completed == [trace]
+        assert trace.done
+
+    def test_spans_from_threads(self):
+        trace = Trace("request")
+
+        def work(index):
+            with use_trace(trace), span(f"job{index}"):
+                pass
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        trace.root.finish()
+
+        assert len(trace.to_dict()["children"]) == 8
+        assert trace.done
+
+
+class TestJobLimit:
+    def test_caps_running_jobs(self):
+        limit = JobLimit(2)
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def job():
+            with job_lane({"configurable": {"job_limit": limit}}):
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                time.sleep(0.05)
+                with lock:
+                    running[0] -= 1
+
+        threads = [threading.Thread(target=job) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak[0] == 2
+        assert limit.busy == 0
+
+    def test_cancelled_request_stops_waiting(self):
+        limit = JobLimit(1)
+        token = CancellationToken()
+        limit.acquire()
+
+        threading.Timer(0.05, token.cancel).start()
+        with pytest.raises(OperationCancelled):
+            limit.acquire(token)
+        assert limit.running == 1 and limit.waiting == 0
+
+    def test_runs_without_limit_are_free(self):
+        with job_lane({"configurable": {}}):
+            pass
+
+    def test_session_defaults_to_the_thread(self):
+        assert session_id({"configurable": {"thread_id": "a"}}) == "a"
+        config = {"configurable": {"thread_id": "a:1", "session_id": "a"}}
+        assert session_id(config) == "a"
+
+
+class TestToolResults:
+    def test_agent_only_sees_the_summary(self):
+        results = ToolResults()
+        output = SceneOutput(text="scene", graph=[{"id": str(i)} for i in range(50)])
+        config = {"configurable": {"tool_results": results}}
+
+        assert tool_result(config, "call_1", output, "scene: 50 objects") == (
+            "scene: 50 objects"
+        )
+        assert len(results) == 1
+        assert results.pop("call_1") is output
+        assert results.pop("call_1") is None and len(results) == 0
+
+    def test_runs_without_a_store_get_the_payload(self):
+        output = SceneOutput(text="scene", graph=[{"id": "a"}])
+        content = tool_result({"configurable": {}}, "call_1", output, "scene")
+        assert SceneOutput.model_validate_json(content) == output
+
+
+class TestExecutors:
+    def test_threads_run_in_the_callers_trace(self):
+        def read():
+            with span("read"):
+                pass
+
+        pool = ManagedExecutor("test", workers=2)
+        trace = Trace("request")
+        with use_trace(trace):
+            with span("tool"):
+                pool.call(read)
+        trace.root.finish()
+        pool.shutdown()
+
+        assert trace.to_dict()["children"][0]["children"][0]["name"] == "read"
+
+    def test_stats_count_queued_and_finished_tasks(self):
+        pool = ManagedExecutor("test", workers=1)
+        release = threading.Event()
+        first = pool.submit(release.wait)
+        second = pool.submit(lambda: 1 / 0)
+        time.sleep(0.1)
+
+        stats = pool.stats()
+        assert stats["running"] == 1 and stats["queued"] == 1
+        release.set()
+        first.result()
+        with pytest.raises(ZeroDivisionError):
+            second.result()
+        pool.shutdown()
+
+        stats = pool.stats()
+        assert stats["completed"] == 1 and stats["failed"] == 1
+        assert stats["running"] == 0 and stats["queued"] == 0
+        assert stats["wait_seconds"] >= 0.05 and stats["busy_seconds"] >= 0.05
+
+    def test_worker_calling_its_own_pool_does_not_wait(self):
+        pool = ManagedExecutor("test", workers=1)
+        assert pool.call(pool.call, lambda: 42) == 42
+        pool.shutdown()
+
+    def test_async_run_and_process_pool(self):
+        pool = ManagedExecutor("test", kind="process", workers=1)
+        assert asyncio.run(pool.run(pow, 2, 10)) == 1024
+        pool.shutdown()
+        assert pool.stats()["completed"] == 1
+
+    def test_config_overrides_defaults(self):
+        executors = Executors.from_config(
+            {"executors": {"io": {"workers": 2}, "gpu": {"workers": 1}}}
+        )
+        assert executors["io"].workers == 2 and executors["io"].kind == "thread"
+        assert executors["database"].workers == 1
+        assert executors["process"].kind == "process"
+        assert executors["gpu"].workers == 1 and executors["gpu"].kind == "thread"
+        assert set(executors.stats()) == {"io", "database", "compute", "process", "gpu"}
+
+
+class TestTaskGraph:
+    def test_steps_get_the_results_they_come_after(self):
+        graph = TaskGraph()
+        graph.add("a", lambda: 2)
+        graph.add("b", lambda: 3)
+        graph.add("sum", lambda base, a, b: base + a + b, 10, after=["a", "b"])
+
+        assert graph.run() == {"a": 2, "b": 3, "sum": 15}
+        assert asyncio.run(graph.arun())["sum"] == 15
+
+    def test_independent_steps_overlap(self):
+        barrier = threading.Barrier(3, timeout=2)
+        graph = TaskGraph()
+        for name in "abc":
+            graph.add(name, barrier.wait, pool="io")
+
+        # Would time out if the steps ran one after the other
+        assert len(graph.run()) == 3
+
+    def test_limited_resource(self):
+        lock = threading.Lock()
+        running, peak = [0], [0]
+
+        def gpu_job():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+        graph = TaskGraph(limits={"gpu": 1})
+        for index in range(4):
+            graph.add(f"job:{index}", gpu_job, pool="io", resource="gpu")
+        graph.run()
+
+        assert peak[0] == 1
+
+    def test_held_outputs_wait_in_a_bounded_queue(self):
+        events = []
+
+        def record(name, *inputs):
+            events.append(name)
+            time.sleep(0.02)
+
+        # One image at a time, diffused or waiting for the slow 3D stage
+        graph = TaskGraph(limits={"test_image": 1, "test_3d": 1})
+        for index in range(3):
+            image = graph.add(
+                f"image:{index}",
+                record,
+                f"image:{index}",
+                pool="io",
+                resource="test_image",
+                hold=True,
+            )
+            graph.add(
+                f"3d:{index}",
+                record,
+                f"3d:{index}",
+                after=[image],
+                pool="io",
+                resource="test_3d",
+            )
+        graph.run()
+
+        assert events.index("image:1") > events.index("3d:0")
+        assert events.index("image:2") > events.index("3d:1")
+        stats = stage_stats.stats()
+        assert stats["test_image"]["completed"] == 3
+        assert stats["test_image"]["held"] == stats["test_3d"]["running"] == 0
+        assert stats["test_3d"]["busy_seconds"] >= 0.05
+
+    def test_steps_mapping_over_their_own_pool(self):
+        pools = Executors({"io": {"workers": 2}})
+        graph = TaskGraph()
+        for index in range(5):
+            graph.add(
+                f"send:{index}",
+                lambda: pools["io"].map(lambda x: x * 2, [1, 2, 3]),
+                pool="io",
+            )
+
+        # More ready steps than workers, each waiting on reads in the same pool
+        with patch("lib.task_graph.executors", pools):
+            results = graph.run()
+        pools.shutdown()
+
+        assert list(results.values()) == [[2, 4, 6]] * 5
+
+    def test_failure_stops_the_graph(self):
+        started = []
+        graph = TaskGraph()
+        graph.add("fail", lambda: 1 / 0)
+        graph.add("next", lambda _: started.append("next"), after=["fail"])
+
+        with pytest.raises(ZeroDivisionError):
+            graph.run()
+        assert started == []
+
+    def test_steps_come_after_known_steps(self):
+        graph = TaskGraph()
+        graph.add("a", lambda: 1)
+        with pytest.raises(ValueError):
+            graph.add("a", lambda: 1)
+        with pytest.raises(ValueError):
+            graph.add("b", lambda: 1, after=["c"])
+
+    def test_steps_run_in_the_callers_trace(self):
+        graph = TaskGraph()
+        graph.add("step", lambda: None)
+        trace = Trace("request")
+        with use_trace(trace):
+            graph.run()
+        trace.root.finish()
+
+        assert trace.to_dict()["children"][0]["name"] == "step"
@@ -0,0 +1,61 @@
+import pytest
+import threading
+
+from model.artifacts import ArtifactStore, encode_png
+from PIL import Image
+
+
+############ MOCK stuff ############
+
+
+# Pytest fixture giving each test its own store
+@pytest.fixture
+def store():
+    store = ArtifactStore()
+    yield store
+    store.flush()
+
+
+############ test stuff ############
+class TestArtifactStore:
+    def test_writes_bytes_and_images(self, store, tmp_path):
+        picture = Image.new("RGB", (4, 4), "red")
+        store.save(tmp_path / "a.glb", b"glTF")
+        store.save(tmp_path / "nested" / "a.png", picture)
+        store.flush()
+
+        assert (tmp_path / "a.glb").read_bytes() == b"glTF"
+        assert (tmp_path / "nested" / "a.png").read_bytes() == encode_png(picture)
+        assert store.pending() == 0
+
+    def test_readers_wait_for_the_write(self, store, tmp_path):
+        store.save(tmp_path / "a.glb", b"x" * 1_000_000)
+        store.wait(tmp_path / "a.glb")
+        assert (tmp_path / "a.glb").stat().st_size == 1_000_000
+
+    def test_runs_after_the_writes(self, store, tmp_path):
+        paths = [tmp_path / "a.png", tmp_path / "a.glb"]
+        called = threading.Event()
+        found = []
+
+        def register(*names):
+            found.extend(path.exists() for path in paths)
+            called.set()
+
+        store.save(paths[0], Image.new("RGB", (4, 4)))
+        store.save(paths[1], b"glTF")
+        store.after(paths, register, "a")
+
+        assert called.wait(2)
+        assert found == [True, True]
+
+    def test_skipped_when_a_write_failed(self, store, tmp_path):
+        blocker = tmp_path / "file"
+        blocker.write_bytes(b"")
+        called = []
+
+        store.save(blocker / "a.glb", b"glTF")
+        store.after([blocker / "a.glb"], called.append, "a")
+        store.flush()
+
+        assert called == []
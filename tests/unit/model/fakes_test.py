@@ -0,0 +1,138 @@
+import json
+import numpy as np
+import pytest
+import random
+import struct
+
+from model import fakes
+from model.backends import active_models, backend, backends_config
+from model.fakes import asr, image, image_to_3d, sample_latency
+from model.glb import MB, synthetic_glb
+from unittest.mock import patch
+
+
+############ MOCK stuff ############
+
+
+# Pytest fixture selecting the fake backends with small payloads and no latency
+@pytest.fixture
+def config():
+    config = {
+        "backends": {
+            "image": "fake",
+            "image_to_3d": "fake",
+            "asr": "fake",
+            "fake": {"seed": 0, "image_size": 32, "glb_size_mb": 0.25},
+        }
+    }
+    backends_config.cache_clear()
+    with patch("model.backends.load_config", return_value=config):
+        yield config
+    backends_config.cache_clear()
+
+
+def parse_glb(data):
+    magic, version, length = struct.unpack_from("<III", data, 0)
+    json_length, json_type = struct.unpack_from("<II", data, 12)
+    document = json.loads(data[20 : 20 + json_length])
+    bin_length, bin_type = struct.unpack_from("<II", data, 20 + json_length)
+    return magic, version, length, json_type, document, bin_length, bin_type
+
+
+############ test stuff ############
+
+
+class TestSyntheticGLB:
+    def test_valid_glb_of_requested_size(self):
+        data = synthetic_glb(2 * MB, seed=1)
+        magic, version, length, json_type, document, bin_length, bin_type = (
+            parse_glb(data)
+        )
+
+        assert magic == 0x46546C67 and version == 2 and length == len(data)
+        assert json_type == 0x4E4F534A and bin_type == 0x004E4942
+        assert 2 * MB - 1024 <= len(data) <= 2 * MB
+        accessor = document["accessors"][0]
+        assert accessor["count"] % 3 == 0
+        assert accessor["count"] * 12 == document["bufferViews"][0]["byteLength"]
+        assert document["buffers"][0]["byteLength"] <= bin_length
+
+    def test_deterministic_by_seed(self):
+        assert synthetic_glb(64 * 1024, seed="a") == synthetic_glb(64 * 1024, seed="a")
+        assert synthetic_glb(64 * 1024, seed="a") != synthetic_glb(64 * 1024, seed="b")
+
+
+class TestLatency:
+    def test_distributions(self):
+        rng = random.Random(0)
+        assert sample_latency({}, rng) == 0
+        assert sample_latency({"distribution": "constant", "value": 2}, rng) == 2
+        uniform = {"distribution": "uniform", "low": 1, "high": 2}
+        assert all(1 <= sample_latency(uniform, rng) <= 2 for _ in range(100))
+        normal = {"distribution": "normal", "mean": 0, "stddev": 1}
+        assert all(sample_latency(normal, rng) >= 0 for _ in range(100))
+        lognormal = {"distribution": "lognormal", "median": 1, "sigma": 0.5}
+        assert all(sample_latency(lognormal, rng) > 0 for _ in range(100))
+
+        with pytest.raises(ValueError):
+            sample_latency({"distribution": "pareto"}, rng)
+
+    def test_same_request_same_latency(self, config):
+        spec = {"distribution": "uniform", "low": 0, "high": 10}
+        first = sample_latency(spec, fakes.seeded("llm", "a prompt"))
+        assert first == sample_latency(spec, fakes.seeded("llm", "a prompt"))
+        assert first != sample_latency(spec, fakes.seeded("llm", "another prompt"))
+
+
+class TestFakeBackends:
+    def test_backend_selected_by_config(self, config):
+        assert backend("image") is image
+        assert backend("image_to_3d") is image_to_3d
+        assert backend("asr") is asr
+
+        config["backends"]["asr"] = "unknown"
+        with pytest.raises(ValueError):
+            backend("asr")
+
+    def test_preload_skips_unselected_backends(self, config):
+        models = [
+            "stabilityai/stable-diffusion-3.5-medium",
+            "all-MiniLM-L6-v2",
+            "custom/model",
+        ]
+        assert active_models(models) == ["all-MiniLM-L6-v2", "custom/model"]
+
+    def test_image_to_glb(self, config, tmp_path):
+        image.generate("a cat", str(tmp_path / "cat.png"))
+        image_to_3d.generate(tmp_path / "cat.png", "cat")
+
+        data = (tmp_path / "cat.glb").read_bytes()
+        assert parse_glb(data)[0] == 0x46546C67
+        assert 0.25 * MB - 1024 <= len(data) <= 0.25 * MB
+
+        # Same prompt, same asset
+        image.generate("a cat", str(tmp_path / "cat2.png"))
+        image_to_3d.generate(tmp_path / "cat2.png", "cat2")
+        assert (tmp_path / "cat2.glb").read_bytes() == data
+
+    def test_image_to_glb_in_memory(self, config, tmp_path):
+        image.generate("a cat", str(tmp_path / "cat.png"))
+        image_to_3d.generate(tmp_path / "cat.png", "cat")
+
+        # Same asset without going through files
+        samples = image_to_3d.sample(image.render("a cat"), "cat")
+        assert image_to_3d.export(samples) == (tmp_path / "cat.glb").read_bytes()
+        assert image_to_3d.EXPORT_POOL == "process"
+
+    def test_transcript_stable_for_audio(self, config, tmp_path):
+        audio = tmp_path / "audio.wav"
+        audio.write_bytes(b"RIFF fake audio")
+        text = asr.transcribe(str(audio))
+
+        assert text in asr.DEFAULT_TRANSCRIPTS
+        assert asr.transcribe(str(audio)) == text
+
+        samples = np.linspace(-1, 1, 1600, dtype=np.float32)
+        text = asr.transcribe_samples(samples, 16000)
+        assert text in asr.DEFAULT_TRANSCRIPTS
+        assert asr.transcribe_samples(samples.copy(), 16000) == text
@@ -0,0 +1,90 @@
+import pytest
+
+from model.llm_cache import LLMCache
+from unittest.mock import patch
+
+STAGES = {
+    "improver": {"enabled": True},
+    "rerank": {"enabled": True, "ttl": 60},
+}
+
+
+############ MOCK stuff ############
+
+
+# Pytest fixture that creates a cache file of 1 KB in a temporary directory,
+# recording its lookups as (stage, hit)
+@pytest.fixture
+def cache(tmp_path):
+    lookups = []
+    cache = LLMCache(
+        str(tmp_path / "llm.sqlite"),
+        max_bytes=1024,
+        stages=STAGES,
+        on_lookup=lambda stage, hit: lookups.append((stage, hit)),
+    )
+    cache.lookups = lookups
+    return cache
+
+
+############ test stuff ############
+class TestLLMCache:
+    def test_key_covers_model_prompt_and_params(self):
+        key = LLMCache.key("llama3.1", "User: a chair", {"temperature": 0})
+        assert key == LLMCache.key("llama3.1", "User: a chair", {"temperature": 0})
+        assert key != LLMCache.key("devstral", "User: a chair", {"temperature": 0})
+        assert key != LLMCache.key("llama3.1", "User: a table", {"temperature": 0})
+        assert key != LLMCache.key("llama3.1", "User: a chair", {"temperature": 1})
+
+    def test_hit_and_miss(self, cache):
+        key = LLMCache.key("llama3.1", "User: a chair", {})
+
+        assert cache.get("improver", key) is None
+        cache.put("improver", key, "A wooden chair")
+        assert cache.get("improver", key) == "A wooden chair"
+
+        assert cache.lookups == [("improver", False), ("improver", True)]
+        assert cache.enabled("improver") and not cache.enabled("analysis")
+
+    def test_kept_on_disk(self, cache, tmp_path):
+        cache.put("improver", "key", "A wooden chair")
+
+        reopened = LLMCache(str(tmp_path / "llm.sqlite"), stages=STAGES)
+        assert reopened.get("improver", "key") == "A wooden chair"
+        assert reopened.stats() == {"entries": 1, "bytes": len("A wooden chair")}
+
+    def test_least_recently_used_go_first(self, cache):
+        cache.put("improver", "a", "x" * 400)
+        cache.put("improver", "b", "x" * 400)
+        cache.get("improver", "a")
+        cache.put("improver", "c", "x" * 400)
+
+        assert cache.get("improver", "b") is None
+        assert cache.get("improver", "a") is not None
+        assert cache.stats()["bytes"] <= 1024
+
+        # Larger than the whole cache: not kept
+        cache.put("improver", "d", "x" * 2000)
+        assert cache.get("improver", "d") is None
+
+    def test_ttl(self, cache):
+        with patch("model.llm_cache.time.time", return_value=1000):
+            cache.put("rerank", "key", "{}")
+        with patch("model.llm_cache.time.time", return_value=1030):
+            assert cache.get("rerank", "key") == "{}"
+        with patch("model.llm_cache.time.time", return_value=1100):
+            assert cache.get("rerank", "key") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_template_change_drops_the_stage(self, cache):
+        cache.register_template("improver", "v1")
+        cache.put("improver", "a", "old")
+        cache.put("rerank", "b", "kept")
+
+        cache.register_template("improver", "v1")
+        assert cache.get("improver", "a") == "old"
+
+        cache.register_template("improver", "v2")
+        assert cache.get("improver", "a") is None
+        assert cache.get("rerank", "b") == "kept"
+        assert cache.stats() == {"entries": 1, "bytes": 4}
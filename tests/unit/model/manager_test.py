@@ -0,0 +1,211 @@
+import pytest
+import threading
+
+from model.manager import GB, ModelManager, ModelSpec
+from unittest.mock import patch
+
+
+############ MOCK stuff ############
+
+
+# Fake pipeline recording the devices it was moved to
+class FakePipeline:
+    def __init__(self, name):
+        self.name = name
+        self.device = None
+        self.moves = []
+
+    def to(self, device):
+        self.device = device
+        self.moves.append(device)
+        return self
+
+
+# Pytest fixture that creates a manager on a fake "cuda" device with a 10 GB budget
+@pytest.fixture
+def manager():
+    with patch("model.manager.logger"):
+        manager = ModelManager(
+            device_budget=10 * GB, host_budget=10 * GB, device="cuda"
+        )
+        manager._free_memory = lambda: None  # No torch on the test box
+        manager._start_reaper = lambda: None
+        yield manager
+
+
+def register_fake(manager, model_id, size_gb, pinned=False):
+    loads = []
+
+    def loader():
+        pipeline = FakePipeline(model_id)
+        loads.append(pipeline)
+        return pipeline
+
+    manager.register(
+        model_id, ModelSpec(loader=loader, size=size_gb * GB, pinned=pinned)
+    )
+    return loads
+
+
+############ test stuff ############
+class TestModelManager:
+    def test_load_then_hit(self, manager):
+        """A model is loaded once and reused on the next request"""
+        loads = register_fake(manager, "sd", 4)
+
+        with manager.use("sd") as first:
+            assert first.device == "cuda"
+        with manager.use("sd") as second:
+            assert second is first
+
+        assert len(loads) == 1
+        assert manager.counters["loads"] == 1
+        assert manager.counters["hits"] == 1
+
+    def test_unknown_model(self, manager):
+        with pytest.raises(KeyError):
+            with manager.use("missing"):
+                pass
+
+    def test_lru_offloads_to_host(self, manager):
+        """Exceeding the device budget offloads the least recently used model"""
+        register_fake(manager, "a", 4)
+        register_fake(manager, "b", 4)
+        register_fake(manager, "c", 4)
+
+        with manager.use("a") as a:
+            pass
+        with manager.use("b"):
+            pass
+        with manager.use("c"):
+            pass
+
+        assert a.device == "cpu"
+        assert manager.counters["offloads"] == 1
+        assert manager.stats()["models"]["a"]["location"] == "cpu"
+        assert manager.stats()["device_bytes"] == 8 * GB
+
+        # Using it again restores it and offloads the next LRU entry (b)
+        with manager.use("a") as restored:
+            assert restored.device == "cuda"
+        assert manager.counters["restores"] == 1
+        assert manager.stats()["models"]["b"]["location"] == "cpu"
+
+    def test_evicts_when_offload_disabled(self, manager):
+        manager.offload_idle = False
+        register_fake(manager, "a", 6)
+        register_fake(manager, "b", 6)
+
+        with manager.use("a"):
+            pass
+        with manager.use("b"):
+            pass
+
+        assert "a" not in manager.stats()["models"]
+        assert manager.counters["evictions"] == 1
+
+    def test_in_use_and_pinned_are_not_evicted(self, manager):
+        manager.offload_idle = False
+        register_fake(manager, "pinned", 4, pinned=True)
+        register_fake(manager, "busy", 4)
+        register_fake(manager, "new", 4)
+
+        manager.get("pinned")
+        with manager.use("busy"):
+            with manager.use("new"):
+                pass
+
+        models = manager.stats()["models"]
+        assert set(models) == {"pinned", "busy", "new"}
+        assert manager.counters["evictions"] == 0
+
+    def test_offload_idle_models(self, manager):
+        manager.idle_timeout = 0
+        register_fake(manager, "a", 2)
+
+        with manager.use("a") as a:
+            pass
+        manager.offload_idle_models()
+
+        assert a.device == "cpu"
+
+    def test_concurrent_requests_load_once(self, manager):
+        release = threading.Event()
+        loads = []
+
+        def slow_loader():
+            release.wait()
+            pipeline = FakePipeline("slow")
+            loads.append(pipeline)
+            return pipeline
+
+        manager.register("slow", ModelSpec(loader=slow_loader, size=GB))
+
+        results = []
+
+        def worker():
+            with manager.use("slow") as pipeline:
+                results.append(pipeline)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(loads) == 1
+        assert all(result is loads[0] for result in results)
+        assert manager.counters["hits"] == 3
+
+    def test_preload(self, manager):
+        loads = register_fake(manager, "sd", 2)
+
+        manager.preload(["sd", "missing"]).join()
+
+        assert len(loads) == 1
+        assert manager.stats()["models"]["sd"]["in_use"] == 0
+
+    def test_size_override_from_config(self):
+        with patch("model.manager.logger"):
+            manager = ModelManager.from_config(
+                {"model_manager": {"device_budget_gb": 1, "sizes_gb": {"sd": 0.5}}}
+            )
+        register_fake(manager, "sd", 16)
+
+        assert manager._specs["sd"].size == GB // 2
+
+    def test_ollama_reservation_from_config(self):
+        with patch("model.manager.logger"):
+            manager = ModelManager.from_config(
+                {"model_manager": {"device_budget_gb": 32, "ollama_reserved_gb": 14}}
+            )
+
+        assert manager.device_budget == 18 * GB
+
+    def test_stats_during_a_move(self, manager):
+        """Moving a model does not hold the lock stats() and other models need"""
+        manager.idle_timeout = 0
+        register_fake(manager, "b", 2)
+        moving, release = threading.Event(), threading.Event()
+
+        def slow_mover(model, device):
+            moving.set()
+            release.wait()
+            return model.to(device)
+
+        with manager.use("b"):
+            pass
+        manager._specs["b"].mover = slow_mover
+
+        offloading = threading.Thread(target=manager.offload_idle_models)
+        offloading.start()
+        assert moving.wait(1)
+
+        stats = manager.stats()
+        assert stats["models"]["b"]["moving"] == "cpu"
+        assert stats["device_bytes"] == 2 * GB
+        release.set()
+        offloading.join()
+
+        assert manager.stats()["models"]["b"]["location"] == "cpu"
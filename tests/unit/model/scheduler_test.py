@@ -0,0 +1,174 @@
+import pytest
+import threading
+import time
+
+from lib import CancellationToken, OperationCancelled
+from model.scheduler import GPUScheduler, Priority, checkpoint
+from unittest.mock import patch
+
+
+############ MOCK stuff ############
+
+
+# Pytest fixture that creates a scheduler with a single slot on a fake "cuda" device
+@pytest.fixture
+def scheduler():
+    with patch("model.scheduler.logger"):
+        yield GPUScheduler(slots={"cuda": 1})
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.005)
+
+
+def queued(scheduler):
+    return sum(scheduler.stats()["devices"]["cuda"]["queued"].values())
+
+
+def run_jobs(scheduler, jobs):
+    """Hold the only slot, queue `jobs` (session, priority, name) in order, then release it"""
+    order = []
+    release = threading.Event()
+
+    def blocker():
+        with scheduler.context("blocker"):
+            scheduler.submit(release.wait, device="cuda")
+
+    def worker(session, priority, name):
+        with scheduler.context(session, priority):
+            scheduler.submit(order.append, name, device="cuda")
+
+    threads = [threading.Thread(target=blocker)]
+    threads[0].start()
+    wait_until(lambda: scheduler.stats()["devices"]["cuda"]["running"] == 1)
+
+    for index, job in enumerate(jobs):
+        thread = threading.Thread(target=worker, args=job)
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: queued(scheduler) == index + 1)
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    return order
+
+
+############ test stuff ############
+class TestGPUScheduler:
+    def test_submit_returns_result(self, scheduler):
+        assert scheduler.submit(lambda x: x * 2, 21, device="cuda") == 42
+        assert scheduler.stats()["completed"] == 1
+
+    def test_submit_propagates_errors(self, scheduler):
+        def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            scheduler.submit(fail, device="cuda")
+
+        stats = scheduler.stats()
+        assert stats["failed"] == 1
+        assert stats["devices"]["cuda"]["running"] == 0
+
+    def test_round_robin_between_sessions(self, scheduler):
+        """A session queuing many jobs does not starve the others"""
+        jobs = [
+            ("a", Priority.INTERACTIVE, "a1"),
+            ("a", Priority.INTERACTIVE, "a2"),
+            ("a", Priority.INTERACTIVE, "a3"),
+            ("b", Priority.INTERACTIVE, "b1"),
+            ("c", Priority.INTERACTIVE, "c1"),
+        ]
+
+        assert run_jobs(scheduler, jobs) == ["a1", "b1", "c1", "a2", "a3"]
+
+    def test_interactive_before_bulk(self, scheduler):
+        jobs = [
+            ("scene", Priority.BULK, "object1"),
+            ("scene", Priority.BULK, "object2"),
+            ("single", Priority.INTERACTIVE, "single"),
+        ]
+
+        assert run_jobs(scheduler, jobs) == ["single", "object1", "object2"]
+
+    def test_slots_limit_concurrency(self):
+        with patch("model.scheduler.logger"):
+            scheduler = GPUScheduler(slots={"cuda": 2})
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def job():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+        threads = [
+            threading.Thread(target=scheduler.submit, args=(job,), kwargs={"device": "cuda"})
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert max(peak) == 2
+        stats = scheduler.stats()
+        assert stats["completed"] == 6
+        assert stats["wait_count"] == 6
+        assert stats["wait_max"] > 0
+
+    def test_cancelled_job_leaves_the_queue(self, scheduler):
+        release = threading.Event()
+        token = CancellationToken()
+        errors = []
+
+        def blocker():
+            scheduler.submit(release.wait, device="cuda")
+
+        def worker():
+            with scheduler.context("cancelled", token=token):
+                try:
+                    scheduler.submit(lambda: None, device="cuda")
+                except OperationCancelled as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=blocker), threading.Thread(target=worker)]
+        threads[0].start()
+        wait_until(lambda: scheduler.stats()["devices"]["cuda"]["running"] == 1)
+        threads[1].start()
+        wait_until(lambda: queued(scheduler) == 1)
+
+        token.cancel("cancelled by client")
+        threads[1].join(timeout=2)
+        release.set()
+        threads[0].join()
+
+        assert len(errors) == 1
+        stats = scheduler.stats()
+        assert stats["cancelled"] == 1
+        assert queued(scheduler) == 0
+
+    def test_cancelled_job_frees_its_slot(self, scheduler):
+        token = CancellationToken()
+
+        def steps():
+            for _ in range(100):
+                checkpoint()
+                token.cancel()
+
+        with scheduler.context("cancelled", token=token):
+            with pytest.raises(OperationCancelled):
+                scheduler.submit(steps, device="cuda")
+
+        assert scheduler.submit(lambda: "next", device="cuda") == "next"
+        stats = scheduler.stats()
+        assert stats["cancelled"] == 1
+        assert stats["devices"]["cuda"]["running"] == 0
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import zlib
+
+from sdk.messages import (
+    AppMediaAsset,
+    IIncomingMessage,
+    IncomingAudioChunkMessage,
+    IncomingAudioStartMessage,
+    IncomingSessionConfigMessage,
+    OutgoingConvertedSpeechMessage,
+    OutgoingGenerated3DSceneMessage,
+    OutgoingMessageType,
+    OutgoingSceneLayoutMessage,
+    OutgoingSceneObjectMessage,
+    OutgoingSessionStartMessage,
+    OutgoingUnrelatedMessage,
+    chunk_content,
+    content_hash,
+)
+from sdk.protobuf import message_pb2
+
+
+############ test stuff ############
+class TestChunkContent:
+    def scene_message(self, *sizes):
+        return OutgoingGenerated3DSceneMessage(
+            text="scene",
+            json_scene={"name": "scene"},
+            assets=[
+                AppMediaAsset(
+                    id=f"asset{index}",
+                    filename=f"asset{index}.glb",
+                    data=bytes([index]) * size,
+                )
+                for index, size in enumerate(sizes)
+            ],
+        ).to_proto()
+
+    def test_small_message_is_unchanged(self):
+        message = OutgoingUnrelatedMessage(text="hello").to_proto()
+
+        assert list(chunk_content(message, 4096)) == [message]
+
+    def test_frames_respect_max_size(self):
+        frames = list(chunk_content(self.scene_message(10_000, 3_000), 2048))
+
+        assert all(frame.ByteSize() <= 2048 for frame in frames)
+
+    def test_transfer_sequence_and_reassembly(self):
+        message = self.scene_message(10_000, 3_000)
+        frames = list(chunk_content(message, 2048))
+
+        received = {}
+        for frame in frames[:-1]:
+            chunk = frame.chunk
+            if frame.type == OutgoingMessageType.ASSET_HEADER.value:
+                assert frame.assets[0].chunked
+                received[chunk.asset_id] = bytearray()
+            elif frame.type == OutgoingMessageType.ASSET_CHUNK.value:
+                assert chunk.offset == len(received[chunk.asset_id])
+                assert chunk.checksum == f"{zlib.crc32(chunk.data):08x}"
+                received[chunk.asset_id] += chunk.data
+            else:
+                assert frame.type == OutgoingMessageType.ASSET_COMPLETE.value
+                data = bytes(received[chunk.asset_id])
+                assert len(data) == chunk.total
+                assert hashlib.sha256(data).hexdigest() == chunk.checksum
+
+        for asset in message.assets:
+            assert bytes(received[asset.id]) == asset.data
+
+        # The message itself comes last, without the inline data
+        envelope = frames[-1]
+        assert envelope.type == OutgoingMessageType.GENERATE_3D_SCENE.value
+        assert envelope.metadata == message.metadata
+        assert [asset.id for asset in envelope.assets] == ["asset0", "asset1"]
+        assert all(asset.chunked and not asset.data for asset in envelope.assets)
+
+    def test_frames_keep_the_request_id(self):
+        message = self.scene_message(10_000)
+        message.request_id = "request"
+
+        frames = list(chunk_content(message, 2048))
+
+        assert all(frame.request_id == "request" for frame in frames)
+
+    def test_original_message_is_not_modified(self):
+        message = self.scene_message(10_000)
+
+        list(chunk_content(message, 2048))
+
+        assert len(message.assets[0].data) == 10_000
+
+
+class TestSceneMessages:
+    def test_layout_lists_placeholders(self):
+        message = OutgoingSceneLayoutMessage(
+            text="layout", json_scene={"name": "scene"}, placeholders=["a", "b"]
+        ).to_proto()
+
+        assert message.type == OutgoingMessageType.SCENE_LAYOUT.value
+        assert [asset.id for asset in message.assets] == ["a", "b"]
+        assert not any(asset.data for asset in message.assets)
+        assert json.loads(message.metadata) == {"name": "scene"}
+
+    def test_object_references_its_placeholder(self):
+        message = OutgoingSceneObjectMessage(
+            text="object",
+            placeholder_id="a",
+            asset=AppMediaAsset(id="asset", filename="asset.glb", data=b"glb"),
+        ).to_proto()
+
+        assert message.type == OutgoingMessageType.SCENE_OBJECT.value
+        assert message.assets[0].data == b"glb"
+        assert json.loads(message.metadata) == {"placeholder_id": "a"}
+
+
+class TestAudioStreamMessages:
+    def test_start_and_chunk(self):
+        start = message_pb2.Content(
+            type="audio_start", request_id="r1", metadata='{"sample_rate": 48000}'
+        )
+        assert IIncomingMessage.from_proto(start) == IncomingAudioStartMessage(
+            request_id="r1", sample_rate=48000
+        )
+
+        chunk = message_pb2.Content(
+            type="audio_chunk",
+            request_id="r1",
+            assets=[message_pb2.MediaAsset(data=b"pcm")],
+        )
+        assert IIncomingMessage.from_proto(chunk) == IncomingAudioChunkMessage(
+            request_id="r1", data=b"pcm"
+        )
+
+    def test_partial_transcript_status(self):
+        partial = OutgoingConvertedSpeechMessage("hello", partial=True).to_proto()
+        final = OutgoingConvertedSpeechMessage("hello world").to_proto()
+
+        assert (partial.status, final.status) == (206, 200)
+
+
+class TestSessionMessages:
+    def test_codecs_offered_and_picked(self):
+        start = OutgoingSessionStartMessage("id", audio_codecs=("flac", "wav"))
+        metadata = json.loads(start.to_proto().metadata)
+        assert metadata == {"audio_codecs": ["flac", "wav"]}
+
+        config = message_pb2.Content(
+            type="session_config", metadata='{"audio_codec": "flac"}'
+        )
+        assert IIncomingMessage.from_proto(config) == IncomingSessionConfigMessage(
+            audio_codec="flac"
+        )
+
+    def test_client_announces_held_assets(self):
+        config = message_pb2.Content(
+            type="session_config", metadata='{"asset_hashes": ["a", "b"]}'
+        )
+        assert IIncomingMessage.from_proto(config) == IncomingSessionConfigMessage(
+            asset_hashes=("a", "b")
+        )
+
+
+class TestContentHash:
+    def test_hash_travels_with_the_asset(self):
+        data = b"glb" * 1000
+        asset = AppMediaAsset(
+            id="a", filename="a.glb", data=data, hash=content_hash(data)
+        )
+        message = OutgoingSceneObjectMessage(
+            text="object", placeholder_id="p", asset=asset
+        ).to_proto()
+
+        assert message.assets[0].hash == hashlib.sha256(data).hexdigest()
+        header = next(iter(chunk_content(message, 2048)))
+        assert header.chunk.checksum == message.assets[0].hash
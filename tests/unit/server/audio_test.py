@@ -0,0 +1,172 @@
+import asyncio
+import io
+import numpy as np
+import pytest
+import wave
+
+from lib import ManagedExecutor
+from server.data.audio import (
+    AudioStream,
+    AudioStreamError,
+    VoiceActivityDetector,
+    decode_audio,
+    decode_wav,
+    supported_codecs,
+)
+
+RATE = 16000
+
+
+############ MOCK stuff ############
+
+
+# 16 bit PCM of a tone (voice) or near silence, `seconds` long
+def pcm(seconds, loud=True):
+    t = np.arange(int(seconds * RATE)) / RATE
+    amplitude = 0.3 if loud else 0.0005
+    return (amplitude * np.sin(2 * np.pi * 220 * t) * 32767).astype("<i2").tobytes()
+
+
+def chunks(data, size=3200):
+    return [data[index : index + size] for index in range(0, len(data), size)]
+
+
+def wav_file(data, rate=RATE):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(data)
+    return buffer.getvalue()
+
+
+async def collect(stream):
+    return [segment async for segment in stream.segments()]
+
+
+############ test stuff ############
+class TestVoiceActivityDetector:
+    def test_segments_split_on_pauses(self):
+        vad = VoiceActivityDetector(RATE)
+        audio = pcm(1) + pcm(0.6, loud=False) + pcm(0.5) + pcm(0.6, loud=False)
+        samples = np.frombuffer(audio, dtype="<i2").astype(np.float32) / 32768
+
+        segments = vad.push(samples) + vad.flush()
+
+        assert len(segments) == 2
+        # Voice, plus the padding before it and the pause after it
+        assert 1.0 <= len(segments[0]) / RATE <= 1.8
+        assert 0.5 <= len(segments[1]) / RATE <= 1.3
+
+    def test_noise_and_long_speech(self):
+        vad = VoiceActivityDetector(RATE, max_segment_seconds=2)
+        silence = np.frombuffer(pcm(1, loud=False), dtype="<i2") / 32768
+        assert vad.push(silence.astype(np.float32)) + vad.flush() == []
+
+        speech = np.frombuffer(pcm(5), dtype="<i2").astype(np.float32) / 32768
+        segments = vad.push(speech) + vad.flush()
+        assert [round(len(segment) / RATE) for segment in segments] == [2, 2, 1]
+
+
+class TestAudioStream:
+    def test_segments_ready_before_the_end(self):
+        async def scenario():
+            stream = AudioStream(RATE)
+            for chunk in chunks(pcm(1) + pcm(0.6, loud=False)):
+                stream.feed(chunk)
+            # The first sentence is complete while the user keeps talking
+            first = await asyncio.wait_for(anext(stream.segments()), 1)
+            for chunk in chunks(pcm(0.5)):
+                stream.feed(chunk)
+            stream.end()
+            return first, await collect(stream)
+
+        first, rest = asyncio.run(scenario())
+        assert len(first) / RATE >= 1.0
+        assert len(rest) == 1
+
+    def test_odd_chunks_and_stereo(self):
+        async def scenario():
+            stream = AudioStream(RATE, channels=2)
+            mono = np.frombuffer(pcm(1), dtype="<i2")
+            stereo = np.repeat(mono, 2).astype("<i2").tobytes()
+            for chunk in chunks(stereo, 1001):
+                stream.feed(chunk)
+            stream.end()
+            return stream.samples, await collect(stream)
+
+        samples, segments = asyncio.run(scenario())
+        assert samples == RATE
+        assert len(segments) == 1
+
+    def test_limits(self):
+        with pytest.raises(AudioStreamError) as error:
+            AudioStream(RATE, encoding="mp3")
+        assert error.value.status == 415
+
+        async def too_long():
+            stream = AudioStream(RATE, max_seconds=1)
+            for chunk in chunks(pcm(2)):
+                stream.feed(chunk)
+            return await collect(stream)
+
+        with pytest.raises(AudioStreamError) as error:
+            asyncio.run(too_long())
+        assert error.value.status == 413
+
+        async def idle():
+            return await collect(AudioStream(RATE, idle_timeout=0.05))
+
+        with pytest.raises(AudioStreamError) as error:
+            asyncio.run(idle())
+        assert error.value.status == 408
+
+    def test_idle_timeout_counts_from_the_last_chunk(self):
+        """Chunks keep arriving during a long segment: the stream is not idle"""
+
+        async def scenario():
+            stream = AudioStream(RATE, idle_timeout=0.2)
+            collecting = asyncio.create_task(collect(stream))
+            for chunk in chunks(pcm(0.5), 320):
+                stream.feed(chunk)
+                await asyncio.sleep(0.01)
+            stream.end()
+            return await collecting
+
+        assert len(asyncio.run(scenario())) == 1
+
+
+class TestDecodeAudio:
+    def test_wav_in_memory(self):
+        samples, rate = decode_wav(wav_file(pcm(0.5)))
+        assert rate == RATE and len(samples) == RATE // 2
+        assert samples.dtype == np.float32 and np.abs(samples).max() <= 1
+
+        with pytest.raises(wave.Error):
+            decode_wav(b"OggS not a wav file")
+
+    def test_codec_checks(self):
+        assert "wav" in supported_codecs()
+        with pytest.raises(ValueError):
+            decode_audio(b"", "mp3")
+        with pytest.raises(ValueError):
+            decode_audio(b"OggS not a wav file", "wav")
+
+    def test_decoded_in_a_worker_thread(self):
+        pool = ManagedExecutor("compute", workers=1)
+        samples, rate = asyncio.run(
+            pool.run(decode_audio, wav_file(pcm(0.25), 8000), "wav")
+        )
+        pool.shutdown()
+        assert rate == 8000 and len(samples) == RATE // 4
+
+    def test_flac(self):
+        soundfile = pytest.importorskip("soundfile")
+        buffer = io.BytesIO()
+        tone = np.frombuffer(pcm(0.5), dtype="<i2")
+        soundfile.write(buffer, tone, RATE, format="FLAC")
+
+        samples, rate = decode_audio(buffer.getvalue(), "flac")
+        assert rate == RATE and len(samples) == RATE // 2
+        assert len(buffer.getvalue()) < len(pcm(0.5))
@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import pytest
+import random
+
+from sdk.messages import (
+    AppMediaAsset,
+    OutgoingGenerated3DObjectsMessage,
+    OutgoingSessionStartMessage,
+    chunk_content,
+)
+from sdk.protobuf import message_pb2
+from server.test.load import (
+    Recorder,
+    RequestResult,
+    build_request,
+    parse_mix,
+    percentile,
+    run_session,
+    summarize,
+)
+from websockets.asyncio.server import serve
+
+
+############ MOCK stuff ############
+
+
+# Server answering every request with one 3D object, split into 2 KiB frames
+async def fake_server(websocket):
+    start = OutgoingSessionStartMessage("1").to_proto()
+    await websocket.send(start.SerializeToString())
+    async for data in websocket:
+        request = message_pb2.Content()
+        request.ParseFromString(data)
+        response = OutgoingGenerated3DObjectsMessage(
+            text=request.text,
+            assets=[AppMediaAsset(id="a", filename="a.glb", data=b"x" * 10_000)],
+        ).to_proto()
+        for frame in chunk_content(response, 2048):
+            await websocket.send(frame.SerializeToString())
+
+
+def options(url, **overrides):
+    return argparse.Namespace(
+        **{
+            "url": url,
+            "sessions": 3,
+            "requests": 2,
+            "mix": "text=1,audio=1,modification=1",
+            "ramp": 0.0,
+            "think_time": 0.0,
+            "timeout": 5.0,
+            "audio_seconds": 0.1,
+            "seed": 0,
+            **overrides,
+        }
+    )
+
+
+############ test stuff ############
+
+
+class TestLoadHelpers:
+    def test_percentile(self):
+        values = [float(value) for value in range(1, 101)]
+        assert percentile(values, 50) == pytest.approx(50.5)
+        assert percentile(values, 99) == pytest.approx(99.01)
+        assert percentile([3.0], 95) == 3.0
+        assert percentile([], 50) is None
+
+    def test_parse_mix(self):
+        assert parse_mix("text=6,audio=2") == {"text": 6.0, "audio": 2.0}
+        with pytest.raises(ValueError):
+            parse_mix("gesture=1")
+        with pytest.raises(ValueError):
+            parse_mix("text=0")
+
+    def test_modification_needs_a_scene(self):
+        kind, request = build_request("modification", random.Random(0), False, 0.1)
+        assert kind == "text" and "scene" in request.text
+
+        kind, request = build_request("audio", random.Random(0), False, 0.1)
+        assert kind == "audio" and request.assets[0].data[:4] == b"RIFF"
+
+    def test_summary_excludes_failures_from_delivery(self):
+        recorder = Recorder(session_starts=[0.01, 0.02])
+        recorder.requests = [
+            RequestResult("text", first_byte=0.1, delivery=1.0, bytes=10),
+            RequestResult("text", status=500, first_byte=0.1, delivery=0.2),
+            RequestResult("audio", timed_out=True),
+        ]
+        results = summarize(recorder, 2.0, {"sessions": 2})
+
+        assert results["requests"]["completed"] == 1
+        assert results["requests"]["timed_out"] == 1
+        assert results["requests"]["errors"] == {"500": 1}
+        assert results["latency_ms"]["full_delivery"]["p50"] == 1000.0
+        assert results["latency_ms"]["first_byte"]["count"] == 2
+        assert results["throughput"]["requests_per_s"] == 0.5
+
+
+class TestLoadRun:
+    def test_sessions_against_server(self):
+        async def scenario():
+            async with serve(fake_server, "localhost", 0) as server:
+                port = server.sockets[0].getsockname()[1]
+                recorder = Recorder()
+                await asyncio.gather(
+                    *(
+                        run_session(index, options(f"ws://localhost:{port}"), recorder)
+                        for index in range(3)
+                    )
+                )
+                return recorder
+
+        recorder = asyncio.run(scenario())
+
+        assert len(recorder.session_starts) == 3
+        assert len(recorder.requests) == 6
+        for result in recorder.requests:
+            assert not result.timed_out and result.status == 200
+            assert result.assets == 1 and result.frames > 5
+            assert 0 < result.first_byte <= result.delivery
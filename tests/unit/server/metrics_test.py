@@ -0,0 +1,51 @@
+import pytest
+
+from lib.metrics import MetricsRegistry
+
+
+############ MOCK stuff ############
+
+
+# Pytest fixture that creates an empty registry, isolated from the server's one
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+############ test stuff ############
+class TestMetricsRegistry:
+    def test_counter_by_label(self, registry):
+        counter = registry.counter("messages_total", "Messages.")
+        counter.inc(type="text")
+        counter.inc(type="text")
+        counter.inc(type="audio")
+
+        text = registry.render()
+        assert "# TYPE messages_total counter" in text
+        assert 'messages_total{type="text"} 2' in text
+        assert 'messages_total{type="audio"} 1' in text
+
+    def test_histogram_is_cumulative(self, registry):
+        histogram = registry.histogram("run_seconds", "Runs.", buckets=(1, 10))
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        text = registry.render()
+        assert 'run_seconds_bucket{le="1"} 1' in text
+        assert 'run_seconds_bucket{le="10"} 2' in text
+        assert 'run_seconds_bucket{le="+Inf"} 2' in text
+        assert "run_seconds_sum 5.5" in text
+        assert "run_seconds_count 2" in text
+
+    def test_collector_and_failing_collector(self, registry):
+        registry.collector("clients", "Clients.", lambda: [("clients", {}, 3)])
+        registry.collector("broken", "Broken.", lambda: 1 / 0)
+
+        text = registry.render()
+        assert "clients 3" in text
+        assert "broken" not in text
+
+    def test_label_escaping(self, registry):
+        registry.counter("escaped_total", "Escaped.").inc(name='a "b"\n')
+
+        assert 'escaped_total{name="a \\"b\\"\\n"} 1' in registry.render()
@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+
+from sdk.protobuf import message_pb2
+from server.io.queue import BoundedQueue, FrameStreams, QueuePolicy, QueueRejected
+
+
+############ MOCK stuff ############
+
+
+def message(text, size=0):
+    return message_pb2.Content(type="text", text=text, metadata="x" * size)
+
+
+############ test stuff ############
+class TestBoundedQueue:
+    def run_coroutine(self, coroutine):
+        """Helper method to run async coroutines in sync context"""
+        return asyncio.run(coroutine)
+
+    def test_byte_accounting(self):
+        async def scenario():
+            queue = BoundedQueue("output")
+            first, second = message("a", 100), message("b", 300)
+            await queue.push(first)
+            await queue.push(second)
+            assert queue.bytes == first.ByteSize() + second.ByteSize()
+
+            await queue.get()
+            assert queue.bytes == second.ByteSize()
+            assert queue.high_water_bytes == first.ByteSize() + second.ByteSize()
+            assert queue.high_water_items == 2
+
+        self.run_coroutine(scenario())
+
+    def test_full_on_bytes(self):
+        async def scenario():
+            queue = BoundedQueue("output", max_bytes=500)
+            await queue.push(message("big", 1000))  # Accepted when empty
+            assert queue.full()
+
+        self.run_coroutine(scenario())
+
+    def test_block_waits_for_room(self):
+        async def scenario():
+            queue = BoundedQueue("output", max_items=1)
+            await queue.push(message("a"))
+            pending = asyncio.create_task(queue.push(message("b")))
+            await asyncio.sleep(0)
+            assert not pending.done()
+
+            assert (await queue.get()).text == "a"
+            await pending
+            assert (await queue.get()).text == "b"
+
+        self.run_coroutine(scenario())
+
+    def test_offer_keeps_the_reader_going(self):
+        async def scenario():
+            queue = BoundedQueue("input", max_items=1)
+            queue.offer(message("a"))
+            queue.offer(message("b"))  # Waits for room, the reader goes on
+            with pytest.raises(QueueRejected):
+                queue.offer(message("c"))
+            assert queue.stats()["backlog"] == 1
+
+            assert [(await queue.get()).text for _ in range(2)] == ["a", "b"]
+            assert not queue.backlog and queue.rejected == 1
+
+        self.run_coroutine(scenario())
+
+    def test_drop_oldest(self):
+        async def scenario():
+            queue = BoundedQueue("output", max_items=2, policy=QueuePolicy.DROP_OLDEST)
+            for text in "abc":
+                await queue.push(message(text))
+
+            assert [queue.get_nowait().text for _ in range(2)] == ["b", "c"]
+            assert queue.dropped == 1
+
+        self.run_coroutine(scenario())
+
+    def test_reject(self):
+        async def scenario():
+            queue = BoundedQueue("input", max_items=1, policy=QueuePolicy.REJECT)
+            await queue.push(message("a"))
+            with pytest.raises(QueueRejected):
+                await queue.push(message("b"))
+            assert queue.rejected == 1
+
+            queue.push_urgent(message("error"))
+            assert queue.qsize() == 2
+
+        self.run_coroutine(scenario())
+
+
+class TestFrameStreams:
+    def frames(self, name, count):
+        return iter([message(f"{name}:{index}") for index in range(count)])
+
+    def drain(self, streams):
+        sent = []
+        while len(streams):
+            frame = streams.next_frame()
+            if frame is not None:
+                sent.append(frame.text)
+        return sent
+
+    def test_requests_interleave(self):
+        streams = FrameStreams()
+        streams.add("scene", self.frames("asset", 3))
+        streams.add("chat", self.frames("hello", 1))
+
+        sent = self.drain(streams)
+        assert sent.index("hello:0") < sent.index("asset:2")
+
+    def test_messages_of_a_request_keep_their_order(self):
+        streams = FrameStreams()
+        streams.add("scene", self.frames("asset", 3))
+        streams.add("chat", self.frames("hello", 2))
+        streams.add("scene", self.frames("final", 1))
+
+        sent = self.drain(streams)
+        assert sent.index("final:0") > sent.index("asset:2")
+        assert [text for text in sent if text.startswith("hello")] == [
+            "hello:0",
+            "hello:1",
+        ]
+        assert len(streams) == 0 and streams.next_frame() is None
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from lib.metrics import event_loop_lag, event_loop_stalls
+from server.watchdog import LoopWatchdog, tag_task
+
+
+############ MOCK stuff ############
+
+
+# Handler making the mistake the watchdog is there to catch
+async def blocking_handler():
+    await asyncio.sleep(0.05)
+    time.sleep(0.4)
+
+
+def stalls_of(client):
+    return sum(
+        value
+        for _, labels, value in event_loop_stalls.samples()
+        if labels["client"] == client
+    )
+
+
+def lag_count():
+    samples = {name: value for name, _, value in event_loop_lag.samples()}
+    return samples.get("scener_event_loop_lag_seconds_count", 0)
+
+
+############ test stuff ############
+class TestLoopWatchdog:
+    def test_catches_the_blocking_call(self):
+        watchdog = LoopWatchdog(interval=0.02, threshold=0.1)
+        stalls = []
+        watchdog.report = lambda stall, lag: stalls.append((stall, lag))
+
+        async def scenario():
+            watchdog.start()
+            task = asyncio.create_task(blocking_handler())
+            tag_task(task, client="c1", message="text")
+            await task
+            await asyncio.sleep(0.1)
+            watchdog.stop()
+
+        asyncio.run(scenario())
+
+        assert len(stalls) == 1
+        stall, lag = stalls[0]
+        assert stall.tags == {"client": "c1", "message": "text"}
+        assert "blocking_handler" in stall.stack and "time.sleep" in stall.stack
+        assert lag >= 0.3
+
+    def test_stall_metrics(self):
+        before, lags_before = stalls_of("c2"), lag_count()
+
+        async def scenario():
+            watchdog = LoopWatchdog(interval=0.02, threshold=0.1)
+            watchdog.start()
+            task = asyncio.create_task(blocking_handler())
+            tag_task(task, client="c2", message="audio")
+            await task
+            await asyncio.sleep(0.1)
+            watchdog.stop()
+
+        asyncio.run(scenario())
+
+        assert stalls_of("c2") == before + 1
+        assert lag_count() > lags_before
+
+    def test_quiet_loop_has_no_stall(self):
+        watchdog = LoopWatchdog(interval=0.02, threshold=0.1)
+        stalls = []
+        watchdog.report = lambda stall, lag: stalls.append(stall)
+
+        async def scenario():
+            watchdog.start()
+            await asyncio.sleep(0.3)
+            watchdog.stop()
+
+        asyncio.run(scenario())
+        assert stalls == [] and watchdog.stall is None